@@ -0,0 +1,130 @@
+"""
+Concurrent ask benchmark: thread-per-request PDF_Pal_App vs. AsyncPDF_Pal_App on one event loop.
+
+Indexes a few synthetic chunks per session (hashing embedder, no model download), then fires one
+ask per session at once against the local fake LLM server and reports wall time, latency
+percentiles and the peak number of threads each approach needed.
+
+Usage:
+    python -m benchmarks.bench_async --sessions 300 --latency 0.5
+"""
+
+import time
+import asyncio
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from groq import Groq, AsyncGroq, DefaultAsyncHttpxClient
+import httpx
+
+from benchmarks.fake_embeddings import make_rag_memory
+from benchmarks.fake_llm_server import Fake_LLM_Server
+from src.PDF_Pal import PDF_Pal_App, Text_Chunk
+from src.async_app import AsyncPDF_Pal_App
+
+
+def client_threads() -> int:
+    # The fake server runs in-process; its per-connection handler threads aren't PDF-Pal's cost
+    return sum(1 for thread in threading.enumerate() if "process_request" not in thread.name)
+
+
+class Thread_Peak:
+    """
+    Samples the live client-side thread count in the background and keeps the maximum.
+    """
+    def __init__(self) -> None:
+        self.peak = client_threads()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            self.peak = max(self.peak, client_threads())
+            time.sleep(0.005)
+
+    def __enter__(self) -> "Thread_Peak":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def build_app(sessions: int, base_url: str) -> PDF_Pal_App:
+    app = PDF_Pal_App()
+    app.brain.client = Groq(api_key="fake-key", base_url=base_url)
+    app.rag = app.sessions.rag = make_rag_memory()
+    for index in range(sessions):
+        chunks = [Text_Chunk(f"Session {index} section {part} discusses revenue, risks and outlook. " * 8) for part in range(4)]
+        app.rag.index(chunks, session_id=f"s{index}", file_name="report.pdf")
+    return app
+
+
+def run_threads(app: PDF_Pal_App, sessions: int):
+    def ask(index):
+        start = time.perf_counter()
+        app.ask(f"What does section 2 say about risks? ({index})", session_id=f"s{index}", file_names=["report.pdf"])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with Thread_Peak() as threads, ThreadPoolExecutor(max_workers=sessions) as pool:
+        latencies = list(pool.map(ask, range(sessions)))
+    return time.perf_counter() - start, latencies, threads.peak
+
+
+def run_async(app: PDF_Pal_App, sessions: int, base_url: str, executor_workers: int):
+    async def main():
+        client = AsyncGroq(api_key="fake-key", base_url=base_url, http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+        ))
+        async_app = AsyncPDF_Pal_App(app=app, client=client, executor_workers=executor_workers)
+
+        async def ask(index):
+            start = time.perf_counter()
+            await async_app.ask(f"What does section 2 say about risks? ({index})", session_id=f"s{index}", file_names=["report.pdf"])
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with Thread_Peak() as threads:
+            latencies = await asyncio.gather(*(ask(index) for index in range(sessions)))
+        elapsed = time.perf_counter() - start
+        await async_app.aclose()
+        return elapsed, latencies, threads.peak
+
+    return asyncio.run(main())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300, help="Concurrent sessions, one ask each.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM latency per request (s).")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Fake LLM latency jitter (s).")
+    parser.add_argument("--executor-workers", type=int, default=8, help="AsyncPDF_Pal_App executor threads.")
+    args = parser.parse_args()
+
+    from src.logger import logger
+    logger.remove()
+
+    with Fake_LLM_Server(latency=args.latency, jitter=args.jitter) as server:
+        app = build_app(args.sessions, server.base_url)
+        results = {
+            "thread per request": run_threads(app, args.sessions),
+            "async event loop": run_async(app, args.sessions, server.base_url, args.executor_workers),
+        }
+
+    print(f"{args.sessions} concurrent asks, {args.latency}s +/- {args.jitter}s LLM latency")
+    print(f"{'mode':<20} {'wall':>8} {'asks/s':>8} {'p50':>8} {'p95':>8} {'threads':>8}")
+    for mode, (elapsed, latencies, threads) in results.items():
+        print(f"{mode:<20} {elapsed:7.2f}s {len(latencies) / elapsed:8.1f} {statistics.median(latencies):7.2f}s "
+              f"{percentile(latencies, 0.95):7.2f}s {threads:8d}")
+
+
+if __name__ == "__main__":
+    main()
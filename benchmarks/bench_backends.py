@@ -0,0 +1,65 @@
+"""
+Extraction backend benchmark: pages/sec and peak memory per backend over a synthetic corpus.
+
+The corpus mixes prose PDFs and table-heavy PDFs (many short text runs per page). Each backend
+runs in a fresh child process so its peak RSS is not polluted by the others; the peak is reported
+relative to the child's RSS before extraction. Backends that aren't installed (e.g. pdfium without
+`pypdfium2`) are listed and skipped. Two more rows show the default fallback chain with a per-page
+timeout, and a re-extraction served by the page cache.
+
+Usage:
+    python -m benchmarks.bench_backends --pages 100 --files 2
+"""
+
+import time
+import argparse
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic_pdfs import make_text_pdf, make_table_pdf
+from src.extraction import EXTRACTION_BACKENDS, Page_Cache, Parallel_PDF_Extractor
+
+
+def run(corpus, backends, timeout, warm_cache):
+    from src.logger import logger
+    logger.remove()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    engine = Parallel_PDF_Extractor(max_workers=1, backends=backends, page_timeout=timeout,
+                                    cache=Page_Cache(100000) if warm_cache else None)
+    if warm_cache:
+        engine.extract_pages_from_pdfs(corpus)
+    start = time.perf_counter()
+    pages = engine.extract_pages_from_pdfs(corpus)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return elapsed, sum(len(doc) for doc in pages), sum(len(page) for doc in pages for page in doc), (peak - baseline) / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100, help="Pages per synthetic PDF.")
+    parser.add_argument("--files", type=int, default=2, help="PDFs of each kind (prose, tables).")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-page timeout of the fallback-chain row.")
+    args = parser.parse_args()
+
+    corpus = [make_text_pdf(args.pages, seed=i) for i in range(args.files)] + [make_table_pdf(args.pages, seed=i) for i in range(args.files)]
+    print(f"Corpus: {args.files} prose + {args.files} table PDFs x {args.pages} pages")
+    print(f"{'backend':<28} {'seconds':>8} {'pages/sec':>10} {'chars':>10} {'peak MB':>8}")
+
+    runs = [(name, (name,), 0, False) for name, backend in EXTRACTION_BACKENDS.items() if backend.available()]
+    runs += [(f"pypdf,pdfium + {args.timeout:g}s timeout", ("pypdf", "pdfium"), args.timeout, False),
+             ("page cache (warm)", ("pypdf",), 0, True)]
+    for name, backend in EXTRACTION_BACKENDS.items():
+        if not backend.available():
+            print(f"{name:<28} {'not installed':>8}")
+
+    context = multiprocessing.get_context("spawn")
+    for label, backends, timeout, warm_cache in runs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            elapsed, pages, chars, peak = pool.submit(run, corpus, backends, timeout, warm_cache).result()
+        print(f"{label:<28} {elapsed:8.2f} {pages / elapsed:10.1f} {chars:10d} {peak:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
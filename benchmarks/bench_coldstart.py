@@ -0,0 +1,114 @@
+"""
+Cold-start benchmark: import time and time to first request.
+
+Every measurement runs in a fresh interpreter. First `python -X importtime -c "import src.PDF_Pal"`
+is parsed to report the module's total import time and its heaviest direct imports. Then a child
+process boots the engine and serves a first request (index a few chunks, then build the context
+for a question) in three modes:
+
+- eager: chromadb, groq, pypdf and chonkie are imported up front, as before lazy loading.
+- lazy: nothing heavy loads until the first request needs it.
+- lazy + warm-up: `PDF_Pal_App.warm_up()` runs in the background while the UI would render
+  (`--ui-seconds`), so the first request finds Chroma and the embedder ready.
+
+The hashing embedder stands in for the embedding model, so no model download is involved.
+
+Usage:
+    python -m benchmarks.bench_coldstart --runs 3 --ui-seconds 1.0
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+MODES = ("eager", "lazy", "lazy + warm-up")
+IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def child(mode: str, ui_seconds: float) -> None:
+    start = time.perf_counter()
+    if mode == "eager":
+        import chromadb, groq, pypdf, chonkie  # noqa: F401,E401
+    import src.PDF_Pal as pal
+    from src.logger import logger
+    logger.remove()
+    imported = time.perf_counter()
+
+    # The default embedder, swapped for the hashing one but still created on first use like the real model
+    def cached_hashing(**kwargs):
+        from src.embeddings import Cached_Embedding_Function
+        from benchmarks.fake_embeddings import Hashing_Embedding_Function
+        return Cached_Embedding_Function(inner=Hashing_Embedding_Function(256), model_name="hashing-256")
+    pal.Cached_Embedding_Function = cached_hashing
+
+    app = pal.PDF_Pal_App()
+    if mode == "lazy + warm-up":
+        app.warm_up()
+    ready = time.perf_counter()
+
+    # Stand-in for the page render and the user picking a file
+    time.sleep(ui_seconds)
+    request = time.perf_counter()
+    chunks = [pal.Text_Chunk(f"Clause {index}: the supplier delivers unit {index} within {index + 3} days.") for index in range(20)]
+    app.rag.index(chunks, session_id="bench", file_name="contract.pdf")
+    app.build_context("When is unit 7 delivered?", session_id="bench", file_names=["contract.pdf"])
+    done = time.perf_counter()
+
+    print(json.dumps({
+        "import": imported - start,
+        "ready": ready - start,
+        "first_request": done - request,
+        "to_first_response": done - start - ui_seconds,
+    }))
+
+
+def import_profile(env) -> tuple:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.PDF_Pal"], env=env,
+                            capture_output=True, text=True, check=True)
+    rows = [IMPORTTIME.match(line) for line in result.stderr.splitlines()]
+    rows = [(int(cumulative), len(indent), name) for _, cumulative, indent, name in (row.groups() for row in rows if row)]
+    # A module's imports are listed before it, one level deeper, back to the previous top-level line
+    end = next(position for position, (_, _, name) in enumerate(rows) if name == "src.PDF_Pal")
+    begin = max((position for position, (_, indent, _) in enumerate(rows[:end]) if indent == 1), default=-1) + 1
+    direct = sorted(((cumulative, name) for cumulative, indent, name in rows[begin:end] if indent == 3), reverse=True)
+    return rows[end][0] / 1e6, direct
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per mode (medians are reported).")
+    parser.add_argument("--ui-seconds", type=float, default=1.0, help="Simulated time between engine start and the first request.")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest direct imports of src.PDF_Pal to list.")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.ui_seconds)
+        return
+
+    env = dict(os.environ)
+    env.setdefault("GROQ", json.dumps({"API_KEY": "benchmark"}))
+
+    total, direct = import_profile(env)
+    print(f"import src.PDF_Pal: {total:.3f}s (python -X importtime); heaviest direct imports:")
+    for cumulative, name in direct[:args.top]:
+        print(f"  {name:<28} {cumulative / 1e6:7.3f}s")
+
+    print(f"\n{'mode':<16} {'import':>8} {'ready':>8} {'1st req':>8} {'to 1st resp':>12}   (medians of {args.runs}, UI time {args.ui_seconds:g}s excluded)")
+    for mode in MODES:
+        samples = []
+        for _ in range(args.runs):
+            result = subprocess.run([sys.executable, "-m", "benchmarks.bench_coldstart", "--child", mode, "--ui-seconds", str(args.ui_seconds)],
+                                    env=env, capture_output=True, text=True, check=True)
+            samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+        median = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+        print(f"{mode:<16} {median['import']:8.3f} {median['ready']:8.3f} {median['first_request']:8.3f} {median['to_first_response']:12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+End-to-end benchmark suite: ingest throughput, retrieval and ask latency, and peak memory.
+
+For every (kind, pages) scenario a fresh process generates a deterministic synthetic PDF
+(text-heavy prose or table-heavy grids, 10 to 2000 pages), ingests it through
+`PDF_Pal_App.process_pdfs`, waits for the background summary, then times `RAG_Memory.retrieve`
+and `PDF_Pal_App.ask` over a fixed set of questions. The LLM is the local fake Groq-compatible
+server with configurable latency and jitter, and the hashing embedder stands in for the model,
+so the numbers measure PDF-Pal itself. Each scenario reports pages/sec, retrieval and ask
+p50/p99, peak RSS and the mean time per pipeline stage from `src.metrics`.
+
+Results are written as JSON (`--output`). Given a previous results file (`--baseline`), every
+gated metric is compared and the run exits with status 1 if any got worse by more than
+`--tolerance`, so the suite can guard a commit in CI.
+
+Usage:
+    python -m benchmarks.bench_e2e --pages 10,200,2000 --kinds text,table --latency 0.2 --jitter 0.1 --output bench-results.json
+    python -m benchmarks.bench_e2e --pages 10,200 --baseline bench-main.json --tolerance 0.2
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import resource
+import argparse
+import subprocess
+from datetime import datetime, timezone
+
+from benchmarks.fake_llm_server import Fake_LLM_Server
+
+# Metric name -> whether higher is better; only these are checked against the baseline
+GATED = {
+    "ingest_pages_per_sec": True,
+    "retrieve_p50_ms": False,
+    "retrieve_p99_ms": False,
+    "ask_p50_ms": False,
+    "ask_p99_ms": False,
+    "peak_rss_mb": False,
+}
+KINDS = ("text", "table")
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def questions(kind: str, pages: int, count: int, seed: int) -> list:
+    from benchmarks.synthetic_pdfs import WORDS
+    rng = random.Random(seed)
+    if kind == "table":
+        return [f"What is the {rng.choice(WORDS)} value in table {rng.randint(1, pages)}?" for _ in range(count)]
+    return [f"What does section {rng.randint(1, pages // 10 + 1)} say about {rng.choice(WORDS)} and {rng.choice(WORDS)}?" for _ in range(count)]
+
+
+def run_scenario(kind: str, pages: int, queries: int, seed: int, streaming: bool) -> dict:
+    from benchmarks.fake_embeddings import make_rag_memory
+    from benchmarks.synthetic_pdfs import make_table_pdf, make_text_pdf
+    from src.PDF_Pal import PDF_Pal_App
+    from src.logger import logger
+    from src.metrics import metrics
+    logger.remove()
+
+    pdf = io.BytesIO((make_table_pdf if kind == "table" else make_text_pdf)(pages, seed=seed))
+    pdf.name = f"{kind}-{pages}.pdf"
+    app = PDF_Pal_App()
+    app.rag = app.sessions.rag = make_rag_memory()
+    # Cold start has its own benchmark (bench_coldstart); here Chroma and the embedder are loaded up front
+    app.warm_up(background=False)
+    metrics.reset()
+
+    start = time.perf_counter()
+    app.process_pdfs([pdf], session_id="bench", streaming=streaming)
+    ingest = time.perf_counter() - start
+    # Summaries go to the fake server in the background; measuring while they run would mix the two
+    start = time.perf_counter()
+    while any(status in ("queued", "running") for status in app.summary_status("bench").values()):
+        time.sleep(0.01)
+    summary = time.perf_counter() - start
+
+    asked = questions(kind, pages, queries, seed)
+    retrieve = []
+    for question in asked:
+        start = time.perf_counter()
+        app.rag.retrieve(question, session_id="bench", n_results=3)
+        retrieve.append(time.perf_counter() - start)
+    ask = []
+    for question in asked:
+        start = time.perf_counter()
+        app.ask(question, session_id="bench", file_names=[pdf.name])
+        ask.append(time.perf_counter() - start)
+
+    stages = {entry["labels"]["stage"]: round(entry["sum"] / entry["count"] * 1000, 3)
+              for entry in metrics.snapshot()["histograms"].get("stage_seconds", []) if entry["count"]}
+    return {
+        "pages": pages,
+        "chunks": app.rag.session_footprint("bench")["chunks"],
+        "ingest_seconds": round(ingest, 4),
+        "ingest_pages_per_sec": round(pages / ingest, 2),
+        "summary_seconds": round(summary, 4),
+        "retrieve_p50_ms": round(percentile(retrieve, 0.5) * 1000, 3),
+        "retrieve_p99_ms": round(percentile(retrieve, 0.99) * 1000, 3),
+        "ask_p50_ms": round(percentile(ask, 0.5) * 1000, 3),
+        "ask_p99_ms": round(percentile(ask, 0.99) * 1000, 3),
+        # Linux reports KiB; the whole process, including the generated PDF
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stage_mean_ms": stages,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float, noise_ms: float = 0.0) -> list:
+    """
+    Returns (scenario, metric, baseline, current, change) for every gated metric worse than the tolerance allows.
+    Latencies that moved by less than `noise_ms` are never flagged, since a few milliseconds is
+    scheduler noise rather than a regression.
+    """
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in GATED.items():
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if metric.endswith("_ms") and abs(after - before) < noise_ms:
+                continue
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append((name, metric, before, after, change))
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="10,200", help="Comma-separated page counts (10 to 2000).")
+    parser.add_argument("--kinds", default="text,table", help=f"Comma-separated PDF kinds: {', '.join(KINDS)}.")
+    parser.add_argument("--queries", type=int, default=30, help="Questions per scenario for retrieval and ask timings.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM base latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Fake LLM extra latency, uniform in [0, jitter] seconds.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the PDFs, the questions and the jitter.")
+    parser.add_argument("--streaming", action="store_true", help="Ingest with the streaming path instead of the batch one.")
+    parser.add_argument("--output", default="bench-results.json", help="Where to write the JSON results.")
+    parser.add_argument("--baseline", help="Results file of an earlier run to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative worsening of a gated metric (0.2 = 20%%).")
+    parser.add_argument("--noise-ms", type=float, default=2.0, help="Latency changes smaller than this never count as regressions.")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        kind, pages = args.scenario.split(":")
+        print(json.dumps(run_scenario(kind, int(pages), args.queries, args.seed, args.streaming)))
+        return
+
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    if any(kind not in KINDS for kind in kinds):
+        parser.error(f"--kinds must be drawn from {', '.join(KINDS)}")
+    page_counts = [int(pages) for pages in args.pages.split(",") if pages.strip()]
+    if any(not 10 <= pages <= 2000 for pages in page_counts):
+        parser.error("--pages must be between 10 and 2000")
+
+    results = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("scenario", "output", "baseline")},
+        "scenarios": {},
+    }
+    print(f"{'scenario':<12} {'chunks':>7} {'pages/s':>9} {'retr p50':>9} {'retr p99':>9} {'ask p50':>9} {'ask p99':>9} {'peak RSS':>9}")
+    with Fake_LLM_Server(latency=args.latency, jitter=args.jitter, seed=args.seed) as server:
+        # One process per scenario, so peak RSS is the scenario's own
+        env = {**os.environ, "GROQ_BASE_URL": server.base_url}
+        env.setdefault("GROQ", json.dumps({"API_KEY": "benchmark"}))
+        for kind in kinds:
+            for pages in page_counts:
+                command = [sys.executable, "-m", "benchmarks.bench_e2e", "--scenario", f"{kind}:{pages}", "--queries", str(args.queries),
+                           "--seed", str(args.seed)] + (["--streaming"] if args.streaming else [])
+                output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+                row = results["scenarios"][f"{kind}-{pages}"] = json.loads(output.strip().splitlines()[-1])
+                print(f"{kind + '-' + str(pages):<12} {row['chunks']:7d} {row['ingest_pages_per_sec']:9.1f} {row['retrieve_p50_ms']:7.2f}ms "
+                      f"{row['retrieve_p99_ms']:7.2f}ms {row['ask_p50_ms']:7.1f}ms {row['ask_p99_ms']:7.1f}ms {row['peak_rss_mb']:7.0f}MB")
+
+    with open(args.output, "w") as handle:
+        json.dump(results, handle, indent=2)
+    print(f"\nResults written to {args.output} (commit {results['commit']}).")
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline, args.tolerance, args.noise_ms)
+        print(f"Compared with {args.baseline} (commit {baseline.get('commit', 'unknown')}), tolerance {args.tolerance:.0%}:")
+        for name, metric, before, after, change in regressions:
+            print(f"  REGRESSION {name} {metric}: {before} -> {after} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print("  no regressions")
+
+
+if __name__ == "__main__":
+    main()
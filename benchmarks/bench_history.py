@@ -0,0 +1,68 @@
+"""
+History store benchmark: resident memory of many long conversations.
+
+Plays the same synthetic conversation into every session three ways: the old dict-of-lists of
+{"role", "content"} dicts, `History_Store` without a cap, and `History_Store` with a token cap.
+Reports traced memory after each third of the turns, so growth (or the lack of it) is visible,
+and the time to assemble a prompt window from the store.
+
+Usage:
+    python -m benchmarks.bench_history --sessions 10000 --turns 30 --max-tokens 400
+"""
+
+import time
+import argparse
+import tracemalloc
+
+from src.history import History_Store
+
+
+def play(sessions: int, turns: int, append, checkpoints):
+    memory = []
+    for turn in range(turns):
+        for index in range(sessions):
+            append(f"session-{index}", "user", f"What does section {turn % 9} say about item {turn}?")
+            append(f"session-{index}", "assistant", f"Section {turn % 9} lists item {turn} at {turn * 7} units, see table {turn % 4}.")
+        if turn + 1 in checkpoints:
+            memory.append(tracemalloc.get_traced_memory()[0])
+    return memory
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000, help="Concurrent conversations.")
+    parser.add_argument("--turns", type=int, default=30, help="Question/answer pairs per conversation.")
+    parser.add_argument("--max-tokens", type=int, default=400, help="Token cap of the capped store.")
+    args = parser.parse_args()
+
+    checkpoints = {args.turns // 3, 2 * args.turns // 3, args.turns}
+    print(f"{args.sessions} sessions x {args.turns} turns; traced MB after each third of the turns")
+    print(f"{'store':<22} {'1/3':>8} {'2/3':>8} {'3/3':>8}")
+
+    def dict_append(history):
+        return lambda session_id, role, content: history.setdefault(session_id, []).append({"role": role, "content": content})
+
+    def store_append(store):
+        return lambda session_id, role, content: store.setdefault(session_id).append(role, content)
+
+    stores = {}
+    for name, make in (("dict of lists", lambda: ({}, dict_append)),
+                       ("History_Store", lambda: (History_Store(), store_append)),
+                       (f"History_Store cap {args.max_tokens}", lambda: (History_Store(max_tokens=args.max_tokens), store_append))):
+        tracemalloc.start()
+        history, wrap = make()
+        memory = play(args.sessions, args.turns, wrap(history), checkpoints)
+        tracemalloc.stop()
+        stores[name] = history
+        print(f"{name:<22} " + " ".join(f"{value / 2**20:8.1f}" for value in memory))
+
+    capped = stores[f"History_Store cap {args.max_tokens}"]
+    start = time.perf_counter()
+    for index in range(args.sessions):
+        history = capped[f"session-{index}"]
+        history.window(max(len(history) - 8, 0)).as_dicts()
+    print(f"prompt window (last 8 messages): {(time.perf_counter() - start) / args.sessions * 1e6:.2f}us per session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Instrumentation overhead benchmark.
+
+Times what the pipeline now does on every stage and request: an empty `metrics.span`, a counter
+increment and a histogram observation, with the registry enabled and disabled. Then compares a
+payload log line filtered out by the log level written as an eager f-string (the old
+`logger.success(f"LLM responded with: {output}")` / per-chunk `logger.trace` style) against the
+lazy `logger.opt(lazy=True)` form, and reports the time to render a Prometheus export.
+
+Usage:
+    python -m benchmarks.bench_metrics --iterations 100000 --payload-chars 4000
+"""
+
+import sys
+import time
+import argparse
+
+from src.logger import logger
+from src.metrics import Metrics_Registry
+
+
+def per_call(function, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000, help="Calls per measurement.")
+    parser.add_argument("--payload-chars", type=int, default=4000, help="Size of the logged payload (e.g. an LLM answer).")
+    args = parser.parse_args()
+
+    print(f"{'operation':<34} {'us/call':>9}")
+    for enabled in (True, False):
+        registry = Metrics_Registry(enabled=enabled)
+        state = "enabled" if enabled else "disabled"
+
+        def span():
+            with registry.span("retrieve"):
+                pass
+
+        print(f"{'span (' + state + ')':<34} {per_call(span, args.iterations):9.3f}")
+        print(f"{'increment (' + state + ')':<34} {per_call(lambda: registry.increment('chunks_indexed', 8, type='content'), args.iterations):9.3f}")
+        print(f"{'observe (' + state + ')':<34} {per_call(lambda: registry.observe('prompt_tokens', 1500), args.iterations):9.3f}")
+
+    # Only INFO and above reach a sink, as in production
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    payload = "The contract requires delivery within thirty days. " * (args.payload_chars // 52 + 1)
+    eager = per_call(lambda: logger.debug(f"LLM response: {payload.upper()}"), args.iterations // 10)
+    lazy = per_call(lambda: logger.opt(lazy=True).debug("LLM response: {}", lambda: payload.upper()), args.iterations // 10)
+    print(f"{'filtered f-string log':<34} {eager:9.3f}")
+    print(f"{'filtered lazy log':<34} {lazy:9.3f}")
+
+    registry = Metrics_Registry()
+    for stage in ("extract", "chunk", "embed", "index", "retrieve", "prompt", "llm"):
+        for value in range(200):
+            registry.observe("stage_seconds", value / 1000, stage=stage)
+        registry.increment("pages_extracted", 40)
+    print(f"{'prometheus export (7 stages)':<34} {per_call(registry.export_prometheus, 1000):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Vector storage benchmark: process memory and recall@k of the HNSW collection vs. flat float32, float16 and int8 matrices.
+
+Each variant runs in its own subprocess, which indexes one session through `RAG_Memory` (hashing
+embedder, so no download is needed) and asks it the same questions through `search_many` with
+hybrid fusion and MMR off:
+
+- hnsw: FLAT_INDEX_MAX_CHUNKS=0, the baseline; Chroma holds the float32 vectors and the HNSW graph
+- flat: the session's rows are stored in Chroma without their vectors, which live only in the flat matrix
+- dtype: float32 (exact), float16 or int8 (per-row scalar quantization)
+- rescore: 0 ranks by the compact scores alone; N rescores the best N x k from a finer copy
+- storage: 'ram' keeps the matrices in process memory (int8 rescores from a float16 copy, float16
+  can't rescore); 'mmap' memory-maps them, plus float32 originals, under a temporary directory (FLAT_INDEX_DIR)
+
+It reports the growth of the child's resident set (VmRSS) from before indexing to after the
+queries, in total and per vector, next to the flat index's own bytes in RAM and in mapped files,
+plus p50/p99 search latency and recall@k against exact float32 search, so FLAT_INDEX_DTYPE /
+FLAT_INDEX_RESCORE / FLAT_INDEX_DIR can be chosen per deployment.
+
+Usage:
+    python -m benchmarks.bench_quantization --chunks 4000 --queries 200 --k 5 --rescore 0,2,4,8
+"""
+
+import sys
+import json
+import ctypes
+import time
+import random
+import tempfile
+import argparse
+import subprocess
+
+import numpy as np
+
+from benchmarks.fake_embeddings import Hashing_Embedding_Function, make_rag_memory
+from benchmarks.bench_sessions import rss_mb
+from benchmarks.bench_tenants import percentile, texts
+from src.logger import logger
+from src.PDF_Pal import Text_Chunk
+from src.document_store import content_hash
+from src.vector_index import DTYPES, Flat_Vector_Index
+
+
+def trimmed_rss_mb() -> float:
+    # glibc keeps freed heap pages (e.g. a grown matrix's old copy) mapped; return them first so RSS reflects live data
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+    return rss_mb()
+
+
+def run_variant(tier: str, dtype: str, depth: int, where: str, args: argparse.Namespace) -> dict:
+    logger.remove()
+    rng = random.Random(args.seed)
+    corpus, questions = texts(rng, args.chunks), texts(rng, args.queries)
+    with tempfile.TemporaryDirectory() as storage:
+        rag = make_rag_memory()
+        # Connected and warmed up before the baseline reading, and without the LRU tier, so the growth is the stored session
+        rag.embedder.max_entries = 0
+        rag.warm_up()
+        rag.vectors = Flat_Vector_Index(max_vectors=0 if tier == "hnsw" else args.chunks, dtype=dtype, rescore=depth,
+                                        storage_dir=storage if where == "mmap" else None)
+        baseline = trimmed_rss_mb()
+        for batch in range(0, len(corpus), 256):
+            rag.index([Text_Chunk(text) for text in corpus[batch:batch + 256]], session_id="bench", file_name="bench.pdf")
+        query_vectors = rag.embedder(questions)
+        latencies, found = [], []
+        for vector in query_vectors:
+            start = time.perf_counter()
+            rows = rag.search_many(["q"], "bench", n_results=args.k, hybrid=False, rerank=False, query_embeddings=[vector])[0]
+            latencies.append(time.perf_counter() - start)
+            found.append({row["id"] for row in rows})
+        grown = trimmed_rss_mb() - baseline
+        stats = rag.vectors.stats()
+
+    # Exact float32 ranking, computed after the memory reading
+    ids = [content_hash("bench", "bench.pdf", "content", content_hash(text)) for text in corpus]
+    matrix = np.asarray(Hashing_Embedding_Function()(corpus))
+    hits = 0
+    for vector, rows in zip(query_vectors, found):
+        hits += len(rows & {ids[index] for index in np.argsort(-(matrix @ np.asarray(vector)))[:args.k]})
+    return {
+        "tier": tier, "dtype": dtype, "rescore": rag.vectors.rescore, "storage": where, "rss_mb": grown,
+        "bytes": stats["bytes"], "mapped_bytes": stats["mapped_bytes"],
+        "p50": percentile(latencies, 0.5), "p99": percentile(latencies, 0.99), "recall": hits / (args.k * len(found)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=4000, help="Chunks in the searched session.")
+    parser.add_argument("--queries", type=int, default=200, help="Questions asked per variant.")
+    parser.add_argument("--k", type=int, default=5, help="Results per question.")
+    parser.add_argument("--rescore", default="0,2,4,8", help="Comma-separated rescoring depths (multiples of k) for compact dtypes.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        tier, dtype, depth, where = args.variant.split(",")
+        print(json.dumps(run_variant(tier, dtype, int(depth), where, args)))
+        return
+
+    depths = sorted(int(depth) for depth in args.rescore.split(","))
+    variants = [("hnsw", "float32", 0, "ram")]
+    for dtype in DTYPES:
+        for where in ("ram", "mmap"):
+            # float16 in RAM has no finer copy to rescore from
+            rescorable = dtype == "int8" or (dtype == "float16" and where == "mmap")
+            variants += [("flat", dtype, depth, where) for depth in (depths if rescorable else [0])]
+
+    print(f"session: {args.chunks} chunks; {args.queries} queries, k={args.k}; RSS is the child's growth while indexing and searching")
+    print(f"{'tier':<5} {'dtype':<8} {'rescore':>7} {'storage':<7} {'RSS MB':>7} {'RSS B/vec':>10} {'flat RAM B/vec':>15} "
+          f"{'mapped B/vec':>13} {'p50':>9} {'p99':>9} {'recall@k':>9}")
+    for tier, dtype, depth, where in variants:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_quantization", "--variant", f"{tier},{dtype},{depth},{where}",
+             "--chunks", str(args.chunks), "--queries", str(args.queries), "--k", str(args.k), "--seed", str(args.seed)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        row = json.loads(output.strip().splitlines()[-1])
+        print(f"{row['tier']:<5} {row['dtype']:<8} {row['rescore']:7d} {row['storage']:<7} {row['rss_mb']:7.1f} "
+              f"{row['rss_mb'] * 1024 * 1024 / args.chunks:10.0f} {row['bytes'] / args.chunks:15.0f} {row['mapped_bytes'] / args.chunks:13.0f} "
+              f"{row['p50'] * 1000:7.2f}ms {row['p99'] * 1000:7.2f}ms {row['recall']:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Reranking benchmark: context size and fact coverage with and without MMR deduplication (and early stopping).
+
+Builds a synthetic manual whose chunks overlap heavily: a sliding window of three sentences moving
+one sentence at a time, uploaded twice under different file names (a re-exported copy). Every
+question asks about two facts stated in different parts of the manual, so a good context carries
+both. Reports, per answer, the context tokens, how many of the two facts the context contains and
+how many sentences in it are repeats. The hashing embedder stands in for the embedding model.
+
+Usage:
+    python -m benchmarks.bench_rerank --facts 400 --questions 200 --k 3
+"""
+
+import time
+import random
+import argparse
+import statistics
+
+from benchmarks.fake_embeddings import make_rag_memory
+from src.PDF_Pal import Text_Chunk
+from src.config import load
+from src.tokens import Token_Counter
+
+PARTS = "valve pump gasket bearing filter seal coupling sensor impeller rotor housing nozzle".split()
+ACTIONS = "replaced inspected lubricated recalibrated tightened flushed cleaned".split()
+
+
+def build_manual(facts: int, seed: int):
+    rng = random.Random(seed)
+    sentences, codes = [], []
+    for index in range(facts):
+        code = f"U{index:04d}"
+        codes.append(code)
+        sentences.append(f"The {rng.choice(PARTS)} on unit {code} must be {rng.choice(ACTIONS)} every {rng.randint(2, 90) * 10} operating hours.")
+    # Three-sentence windows advancing one sentence at a time: each fact appears in three overlapping chunks
+    windows = [" ".join(sentences[start:start + 3]) for start in range(len(sentences) - 2)]
+    return sentences, codes, windows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--facts", type=int, default=400, help="Fact sentences in the manual.")
+    parser.add_argument("--questions", type=int, default=200, help="Two-fact questions asked.")
+    parser.add_argument("--k", type=int, default=3, help="Chunks retrieved per question.")
+    parser.add_argument("--dim", type=int, default=256, help="Hashing embedder dimensions.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from src.logger import logger
+    logger.remove()
+
+    sentences, codes, windows = build_manual(args.facts, args.seed)
+    rag = make_rag_memory(dim=args.dim)
+    for file_name in ("manual.pdf", "manual (exported).pdf"):
+        rag.index([Text_Chunk(text) for text in windows], session_id="bench", file_name=file_name)
+
+    rng = random.Random(args.seed + 1)
+    questions = []
+    for _ in range(args.questions):
+        first, second = rng.sample(range(args.facts), 2)
+        questions.append(((first, second), f"How often is unit {codes[first]} serviced, and unit {codes[second]}?"))
+
+    counter = Token_Counter()
+    print(f"{len(windows)} overlapping chunks x 2 copies, {args.questions} two-fact questions, k={args.k}, {args.dim}-dim hashing embedder")
+    print(f"{'mode':<12} {'tokens':>8} {'chunks':>7} {'facts':>7} {'repeats':>8} {'p50':>9}")
+    # 'MMR early' sets MMR_STOP_EARLY: fewer than k chunks once the rest mostly repeat what was picked
+    for mode, rerank, stop_early in (("top-k", False, False), ("MMR", True, False), ("MMR early", True, True)):
+        load.MMR_STOP_EARLY = stop_early
+        tokens, chunks, coverage, repeats, latencies = [], [], [], [], []
+        for (first, second), question in questions:
+            start = time.perf_counter()
+            results = rag.retrieve(question, "bench", n_results=args.k, rerank=rerank)
+            latencies.append(time.perf_counter() - start)
+            context = "\n\n".join(results)
+            tokens.append(counter.count(context))
+            chunks.append(len(results))
+            coverage.append(sum(sentences[fact] in context for fact in (first, second)) / 2)
+            found = [sentence for result in results for sentence in sentences if sentence in result]
+            repeats.append(len(found) - len(set(found)))
+        print(f"{mode:<12} {statistics.mean(tokens):8.1f} {statistics.mean(chunks):7.2f} {statistics.mean(coverage):7.1%} "
+              f"{statistics.mean(repeats):8.2f} {statistics.median(latencies) * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
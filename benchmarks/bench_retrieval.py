@@ -0,0 +1,118 @@
+"""
+Retrieval latency and recall benchmark: vector-only vs. BM25-only vs. hybrid (RRF) retrieval.
+
+Builds a synthetic manual-like corpus in which every chunk carries one exact identifier (part
+number, clause ID or person name) inside generic maintenance prose, then asks one question per
+sampled identifier and checks whether the chunk holding it is in the top k. The hashing embedder
+stands in for the embedding model (no download needed); a small `--dim` mimics how dense vectors
+blur rare tokens, so absolute recall differs from a neural model but the comparison holds.
+Also times the same questions through one `retrieve_many` batch and reports the lexical index's
+postings memory.
+
+Usage:
+    python -m benchmarks.bench_retrieval --chunks 5000 --queries 200 --k 3
+"""
+
+import time
+import random
+import argparse
+import statistics
+
+from benchmarks.fake_embeddings import make_rag_memory
+from src.PDF_Pal import Text_Chunk
+
+WORDS = ("inspect replace torque seal valve pump housing bearing gasket filter pressure schedule "
+         "hydraulic assembly lubricate calibrate sensor tolerance coupling fastener module panel "
+         "warranty operator cycle interval procedure component vibration alignment clearance").split()
+NAMES = ("Okafor Lindqvist Haruki Moreau Castellanos Petrova Nakamura Oyelaran Fitzgerald Sandoval "
+         "Kowalski Abernathy Ishikawa Delacroix Varga Thorsen").split()
+
+
+def identifier(rng: random.Random, index: int) -> str:
+    kind = index % 3
+    if kind == 0:
+        return f"PN-{rng.randint(10000, 99999)}"
+    if kind == 1:
+        return f"clause {rng.randint(1, 30)}.{rng.randint(1, 20)}.{index}"
+    return f"{rng.choice(NAMES)}-{index}"
+
+
+def build_corpus(chunks: int, seed: int):
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(chunks):
+        ident = identifier(rng, index)
+        before = " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 60)))
+        after = " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 60)))
+        corpus.append((ident, f"{before.capitalize()}. Refer to {ident} for {after}."))
+    return corpus
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000, help="Chunks in the synthetic corpus.")
+    parser.add_argument("--queries", type=int, default=200, help="Questions asked.")
+    parser.add_argument("--k", type=int, default=3, help="Results retrieved per question.")
+    parser.add_argument("--dim", type=int, default=64, help="Hashing embedder dimensions.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from src.logger import logger
+    logger.remove()
+
+    corpus = build_corpus(args.chunks, args.seed)
+    rag = make_rag_memory(dim=args.dim)
+    start = time.perf_counter()
+    for batch in range(0, len(corpus), 256):
+        rag.index([Text_Chunk(text) for _, text in corpus[batch:batch + 256]], session_id="bench", file_name="manual.pdf")
+    index_time = time.perf_counter() - start
+
+    rng = random.Random(args.seed + 1)
+    questions = []
+    for ident, text in rng.sample(corpus, args.queries):
+        context_words = rng.sample(text.lower().rstrip(".").split()[:10], 2)
+        questions.append((ident, f"What does the manual say about {ident} regarding {' '.join(context_words)}?"))
+
+    def lexical_only(question):
+        ids = [chunk_id for chunk_id, _ in rag.lexical.search("bench", question, "content", k=args.k)]
+        found = rag.get_rows(["documents"], ids=ids)
+        documents = dict(zip(found["ids"], found["documents"]))
+        return [documents[chunk_id] for chunk_id in ids if chunk_id in documents]
+
+    # MMR is off throughout: this corpus draws every chunk from the same few words, so at low --dim all
+    # embeddings are near-duplicates and reranking would measure that instead of the fusion
+    modes = {
+        "vector only": lambda question: rag.retrieve(question, "bench", n_results=args.k, hybrid=False, rerank=False),
+        "BM25 only": lexical_only,
+        "hybrid (RRF)": lambda question: rag.retrieve(question, "bench", n_results=args.k, hybrid=True, rerank=False),
+    }
+    print(f"{args.chunks} chunks indexed in {index_time:.2f}s, {args.queries} questions, recall@{args.k}, {args.dim}-dim hashing embedder")
+    print(f"{'mode':<14} {'recall':>8} {'p50':>9} {'p95':>9}")
+    for mode, retrieve in modes.items():
+        hits, latencies = 0, []
+        for ident, question in questions:
+            start = time.perf_counter()
+            results = retrieve(question)
+            latencies.append(time.perf_counter() - start)
+            hits += any(f"Refer to {ident} for" in result for result in results)
+        print(f"{mode:<14} {hits / len(questions):8.1%} {statistics.median(latencies) * 1000:7.2f}ms {percentile(latencies, 0.95) * 1000:7.2f}ms")
+
+    # Offline evaluation path: every question in one retrieve_many call, latency amortized per question
+    start = time.perf_counter()
+    batched = rag.retrieve_many([question for _, question in questions], "bench", n_results=args.k, hybrid=True, rerank=False)
+    per_query = (time.perf_counter() - start) / len(questions)
+    hits = sum(any(f"Refer to {ident} for" in result for result in results) for (ident, _), results in zip(questions, batched))
+    print(f"{'hybrid batch':<14} {hits / len(questions):8.1%} {per_query * 1000:7.2f}ms {'(amortized)':>10}")
+
+    stats = rag.lexical.stats()
+    print(f"lexical index: {stats['postings']} postings, {stats['vocabulary']} terms, "
+          f"{stats['postings_bytes'] / 1024:.0f} KiB ({stats['bytes_per_posting']} bytes/posting)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Concurrent browser-session load test: one PDF_Pal_App per session vs. one shared engine.
+
+Starts N sessions at once on threads (as Streamlit does), each obtaining its app and ingesting a
+small synthetic PDF, and reports per-session startup latency, resident memory and thread count.
+Each mode runs in its own subprocess so their memory doesn't mix. The embedding model can't be
+assumed present offline, so the hashing embedder stands in for it, carrying `--model-mb` of
+ballast to mimic the weights every per-session app would load (all-MiniLM-L6-v2 is ~90 MB).
+
+Usage:
+    python -m benchmarks.bench_sessions --sessions 20 --model-mb 90
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import threading
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.fake_llm_server import Fake_LLM_Server
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak rather than current RSS, but the best portable fallback
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_engine(model_mb: int):
+    from benchmarks.fake_embeddings import Hashing_Embedding_Function, make_rag_memory
+    from src.PDF_Pal import PDF_Pal_App
+    app = PDF_Pal_App()
+    app.rag = app.sessions.rag = make_rag_memory()
+    # Touch every page so the ballast is resident, like loaded model weights
+    app.rag.embedder._inner.weights = np.ones(model_mb * 1024 * 1024 // 8)
+    return app
+
+
+def run_mode(mode: str, sessions: int, model_mb: int) -> dict:
+    from benchmarks.synthetic_pdfs import make_text_pdf
+    from src.logger import logger
+    logger.remove()
+
+    pdfs = [make_text_pdf(pages=2, seed=index) for index in range(sessions)]
+    baseline = rss_mb()
+    shared, shared_lock = [], threading.Lock()
+
+    def get_app():
+        if mode == "per-session":
+            return make_engine(model_mb)
+        # st.cache_resource semantics: the first caller builds the engine, everyone else reuses it
+        with shared_lock:
+            if not shared:
+                shared.append(make_engine(model_mb))
+            return shared[0]
+
+    def start_session(index: int) -> float:
+        start = time.perf_counter()
+        app = get_app()
+        app.process_pdfs([pdfs[index]], session_id=f"session-{index}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        latencies = list(pool.map(start_session, range(sessions)))
+    return {
+        "mode": mode,
+        "startup_p50": statistics.median(latencies),
+        "startup_max": max(latencies),
+        "rss_mb": rss_mb() - baseline,
+        "threads": threading.active_count(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent browser sessions.")
+    parser.add_argument("--model-mb", type=int, default=90, help="Simulated embedding model size per engine (MB).")
+    parser.add_argument("--mode", choices=["per-session", "shared"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.sessions, args.model_mb)))
+        return
+
+    rows = []
+    with Fake_LLM_Server(latency=0.05) as server:
+        # Background summaries fire LLM calls; route them to the fake server
+        env = {**os.environ, "GROQ_BASE_URL": server.base_url}
+        for mode in ("per-session", "shared"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_sessions", "--mode", mode,
+                 "--sessions", str(args.sessions), "--model-mb", str(args.model_mb)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+            rows.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{args.sessions} concurrent sessions, {args.model_mb} MB simulated embedding model")
+    print(f"{'mode':<12} {'startup p50':>12} {'startup max':>12} {'RSS delta':>10} {'threads':>8}")
+    for row in rows:
+        print(f"{row['mode']:<12} {row['startup_p50']:11.3f}s {row['startup_max']:11.3f}s {row['rss_mb']:8.0f}MB {row['threads']:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Multi-tenant retrieval benchmark: per-session flat index vs. the shared, session-filtered HNSW graph.
+
+Indexes one target session, then keeps loading other tenants into the shared HNSW collection.
+After each step it asks the same questions of the target session two ways, through
+`RAG_Memory.search_many` with hybrid fusion and MMR off so only the vector search is compared:
+
+- flat: the session's own NumPy matrix, exact top-k (FLAT_INDEX_MAX_CHUNKS above the session size)
+- hnsw: the global collection with a `where` filter on session and type (FLAT_INDEX_MAX_CHUNKS=0)
+
+It reports p50/p99 latency and recall@k against exact brute-force search. The hashing embedder
+stands in for the model, so no download is needed.
+
+Usage:
+    python -m benchmarks.bench_tenants --tenants 0,20,100 --chunks 300 --queries 100 --k 5
+"""
+
+import time
+import random
+import argparse
+
+import numpy as np
+
+from benchmarks.fake_embeddings import make_rag_memory
+from src.logger import logger
+from src.PDF_Pal import Text_Chunk
+from src.vector_index import Flat_Vector_Index
+
+WORDS = ("inspect replace torque seal valve pump housing bearing gasket filter pressure schedule hydraulic "
+         "assembly lubricate calibrate sensor tolerance coupling fastener module panel warranty operator "
+         "cycle interval procedure component vibration alignment clearance revenue invoice contract").split()
+
+
+def texts(rng: random.Random, count: int) -> list:
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))) for _ in range(count)]
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", default="0,20,100", help="Comma-separated counts of other sessions loaded at each step.")
+    parser.add_argument("--chunks", type=int, default=300, help="Chunks per session, the target included.")
+    parser.add_argument("--queries", type=int, default=100, help="Questions asked of the target session per step.")
+    parser.add_argument("--k", type=int, default=5, help="Results per question.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logger.remove()
+
+    rng = random.Random(args.seed)
+    flat = make_rag_memory()
+    flat.vectors = Flat_Vector_Index(max_vectors=args.chunks * 2)
+    # A second RAG_Memory over the same in-memory collections, without a flat tier; the other tenants load through it
+    hnsw = make_rag_memory()
+    hnsw.vectors = Flat_Vector_Index(max_vectors=0)
+
+    flat.index([Text_Chunk(text) for text in texts(rng, args.chunks)], session_id="target", file_name="target.pdf")
+    # The flat tier keeps the target's vectors out of Chroma; the HNSW side gets a copy of the same rows
+    stored = flat.export_session("target")
+    hnsw.import_session("target", stored)
+    ids, matrix = stored["ids"], stored["embeddings"] / np.linalg.norm(stored["embeddings"], axis=1, keepdims=True)
+    questions = texts(rng, args.queries)
+    query_vectors = [np.asarray(vector, dtype=np.float32) for vector in flat.embedder(questions)]
+    truth = [set(ids[index] for index in np.argsort(-(matrix @ (vector / np.linalg.norm(vector))))[:args.k]) for vector in query_vectors]
+
+    print(f"target session: {args.chunks} chunks; {args.queries} queries, k={args.k}; other tenants {args.chunks} chunks each")
+    print(f"{'tenants':>8} {'rows':>8} {'tier':<5} {'p50':>9} {'p99':>9} {'recall@k':>9}")
+    loaded = 0
+    for tenants in sorted(int(count) for count in args.tenants.split(",")):
+        for tenant in range(loaded, tenants):
+            hnsw.index([Text_Chunk(text) for text in texts(rng, args.chunks)], session_id=f"tenant-{tenant}", file_name="other.pdf")
+        loaded = max(loaded, tenants)
+        rows = hnsw.collection.count()
+        for tier, rag in (("flat", flat), ("hnsw", hnsw)):
+            latencies, hits = [], 0
+            for vector, expected in zip(query_vectors, truth):
+                start = time.perf_counter()
+                found = rag.search_many(["q"], "target", n_results=args.k, hybrid=False, rerank=False, query_embeddings=[vector])[0]
+                latencies.append(time.perf_counter() - start)
+                hits += len(expected & {row["id"] for row in found})
+            print(f"{tenants:8d} {rows:8d} {tier:<5} {percentile(latencies, 0.5) * 1000:7.2f}ms {percentile(latencies, 0.99) * 1000:7.2f}ms "
+                  f"{hits / (args.k * len(truth)):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Time-to-first-token benchmark against a local fake streaming LLM server.
+
+Times how long a user waits before seeing any answer text with the blocking `PDF_Pal_Brain.chat`
+(the whole completion) and with `PDF_Pal_Brain.chat_stream` (the first streamed piece), along
+with total response time for both.
+
+Usage:
+    python -m benchmarks.bench_ttft --queries 20 --latency 0.3 --token-interval 0.02 --answer-words 150
+"""
+
+import time
+import argparse
+import statistics
+from groq import Groq
+
+from benchmarks.fake_llm_server import Fake_LLM_Server
+from src.PDF_Pal import PDF_Pal_Brain
+
+
+def percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def measure(brain: PDF_Pal_Brain, queries: int, context: str, streaming: bool):
+    first, total = [], []
+    for index in range(queries):
+        # A fresh session per query keeps prompt size constant across samples
+        session_id = f"bench-{streaming}-{index}"
+        start = time.perf_counter()
+        if streaming:
+            ttft = None
+            for _ in brain.chat_stream(query=f"Question {index}?", context=context, session_id=session_id):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+        else:
+            brain.chat(query=f"Question {index}?", context=context, session_id=session_id)
+            ttft = time.perf_counter() - start
+        first.append(ttft)
+        total.append(time.perf_counter() - start)
+    return first, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20, help="Questions asked per mode.")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM time to first token (s).")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Fake LLM latency jitter (s).")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="Delay between streamed words (s).")
+    parser.add_argument("--answer-words", type=int, default=150, help="Answer length in words.")
+    args = parser.parse_args()
+
+    context = "Retrieved chunk text. " * 300
+    with Fake_LLM_Server(latency=args.latency, jitter=args.jitter,
+                         token_interval=args.token_interval, answer_words=args.answer_words) as server:
+        brain = PDF_Pal_Brain()
+        brain.client = Groq(api_key="fake-key", base_url=server.base_url)
+        results = {
+            "blocking chat": measure(brain, args.queries, context, streaming=False),
+            "chat_stream": measure(brain, args.queries, context, streaming=True),
+        }
+
+    print(f"{args.queries} queries, {args.latency}s to first token, {args.answer_words} words at {args.token_interval}s/word")
+    print(f"{'mode':<16} {'TTFT p50':>10} {'TTFT p95':>10} {'total p50':>10}")
+    for mode, (first, total) in results.items():
+        print(f"{mode:<16} {statistics.median(first):9.3f}s {percentile(first, 0.95):9.3f}s {statistics.median(total):9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
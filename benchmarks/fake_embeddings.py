@@ -0,0 +1,42 @@
+"""
+Deterministic, model-free embeddings for benchmarks.
+
+Hashes words into a fixed number of buckets (a bag-of-words feature-hashing vector), so
+benchmarks get stable retrieval behaviour without downloading the embedding model. Wrap it in
+`Cached_Embedding_Function(inner=...)` to hand it to RAG_Memory.
+"""
+
+import zlib
+import numpy as np
+from typing import List
+
+
+class Hashing_Embedding_Function:
+    """
+    This class embeds texts as L2-normalized feature-hashed word counts.
+    """
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+
+    @staticmethod
+    def name() -> str:
+        return "hashing"
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in text.lower().split():
+                vector[zlib.crc32(word.encode("utf-8")) % self.dim] += 1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+
+def make_rag_memory(dim: int = 384):
+    """
+    Returns an in-memory RAG_Memory backed by the hashing embedder.
+    """
+    from src.PDF_Pal import RAG_Memory
+    from src.embeddings import Cached_Embedding_Function
+    return RAG_Memory(embedding_function=Cached_Embedding_Function(inner=Hashing_Embedding_Function(dim), model_name=f"hashing-{dim}"))
@@ -0,0 +1,168 @@
+"""
+Local fake Groq/OpenAI-compatible chat completions server for benchmarks.
+
+Serves POST /openai/v1/chat/completions with a canned answer after an injected latency,
+so benchmarks measure PDF-Pal's own overhead and concurrency rather than the network.
+Requests with `"stream": true` get server-sent events: the first token after the latency,
+then one word every `token_interval` seconds, like a real streaming provider.
+Point a Groq client at it with `base_url=server.base_url` (or GROQ_BASE_URL).
+
+Usage (standalone):
+    python -m benchmarks.fake_llm_server --port 8765 --latency 0.5 --jitter 0.1
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    # Concurrency benchmarks open hundreds of connections at once; the default backlog of 5 would drop them
+    request_queue_size = 1024
+
+
+class Fake_LLM_Server:
+    """
+    This class runs the fake completions endpoint on a background thread.
+    """
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, port: int = 0, seed: int = 0,
+                 token_interval: float = 0.0, answer_words: int = 8) -> None:
+        """
+        Args:
+            latency (float, optional): Base response delay in seconds (time to first token when streaming).
+            jitter (float, optional): Uniform random extra delay in seconds, in [0, jitter].
+            port (int, optional): Port to bind. 0 picks a free port.
+            seed (int, optional): Seed for the jitter generator.
+            token_interval (float, optional): Delay between streamed words in seconds. Non-streaming
+                                              responses wait for the whole answer, as a real server would.
+            answer_words (int, optional): Minimum length of the canned answer in words.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.token_interval = token_interval
+        self.answer_words = answer_words
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _delay(self) -> float:
+        with self._lock:
+            self.requests += 1
+            return self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _answer(self, prompt_chars: int) -> list:
+        words = f"Fake answer covering {prompt_chars} prompt characters.".split()
+        return words + ["lorem"] * max(0, self.answer_words - len(words))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                time.sleep(server._delay())
+                prompt_chars = sum(len(str(message.get("content", ""))) for message in body.get("messages", []))
+                words = server._answer(prompt_chars)
+                usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(words), "total_tokens": prompt_chars // 4 + len(words)}
+                if body.get("stream"):
+                    self._stream(body, words, usage)
+                    return
+                time.sleep(server.token_interval * (len(words) - 1))
+                payload = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake-model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(words)},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": usage
+                }
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body, words, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                for index, word in enumerate(words):
+                    if index:
+                        time.sleep(server.token_interval)
+                    delta = {"role": "assistant", "content": word} if index == 0 else {"content": " " + word}
+                    self._event(body, delta, None)
+                # Groq puts usage on the final chunk under x_groq
+                self._event(body, {}, "stop", {"x_groq": {"id": "req-fake", "usage": usage}})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _event(self, body, delta, finish_reason, extra=None):
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake-model"),
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    **(extra or {})
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "Fake_LLM_Server":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "Fake_LLM_Server":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--token-interval", type=float, default=0.0)
+    parser.add_argument("--answer-words", type=int, default=8)
+    args = parser.parse_args()
+
+    server = Fake_LLM_Server(latency=args.latency, jitter=args.jitter, port=args.port,
+                             token_interval=args.token_interval, answer_words=args.answer_words).start()
+    print(f"Fake LLM server listening on {server.base_url} (set GROQ_BASE_URL to use it)")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Deterministic synthetic PDF generator used by the benchmarks.
+
+The same (pages, seed) pair always produces the same document, so throughput numbers
+are comparable across runs and commits.
+"""
+
+import io
+import random
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+WORDS = (
+    "contract clause section party liability payment invoice delivery schedule warranty "
+    "termination notice agreement obligation supplier customer revenue quarter report "
+    "analysis system module component engine pressure valve sensor calibration protocol"
+).split()
+
+LINES_PER_PAGE = 45
+WORDS_PER_LINE = 12
+
+
+def make_text_pdf(pages: int, seed: int = 0) -> bytes:
+    """
+    Builds a text-heavy PDF with `pages` pages of pseudo-random prose.
+
+    Args:
+        pages (int): Number of pages to generate.
+        seed (int, optional): Random seed controlling the page contents.
+
+    Returns:
+        bytes: The rendered PDF file.
+    """
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(pages):
+        y = 750
+        pdf.drawString(72, y, f"Page {page + 1} - Section {page // 10 + 1}")
+        for _ in range(LINES_PER_PAGE):
+            y -= 15
+            pdf.drawString(72, y, " ".join(rng.choice(WORDS) for _ in range(WORDS_PER_LINE)))
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def make_table_pdf(pages: int, seed: int = 0, rows: int = 40, columns: int = 7) -> bytes:
+    """
+    Builds a table-heavy PDF: each page is a ruled grid of short cells drawn one string per cell,
+    which is far more text operators per page than prose and stresses layout reconstruction.
+
+    Args:
+        pages (int): Number of pages to generate.
+        seed (int, optional): Random seed controlling the cell contents.
+        rows (int, optional): Table rows per page.
+        columns (int, optional): Table columns per page.
+
+    Returns:
+        bytes: The rendered PDF file.
+    """
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    width = (letter[0] - 144) / columns
+    for page in range(pages):
+        pdf.drawString(72, 750, f"Table {page + 1}: measured values")
+        pdf.setFont("Helvetica", 8)
+        for row in range(rows):
+            y = 730 - row * 17
+            pdf.line(72, y - 4, letter[0] - 72, y - 4)
+            for column in range(columns):
+                cell = rng.choice(WORDS) if column == 0 else f"{rng.uniform(0, 1000):.2f}"
+                pdf.drawString(74 + column * width, y, cell)
+        pdf.setFont("Helvetica", 12)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
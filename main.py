@@ -13,12 +13,31 @@ from pathlib import Path
 from src.PDF_Pal import PDF_Pal_App
 from src.logger import logger
 
+# Sidebar labels for the background summary job of each uploaded file
+SUMMARY_BADGES = {
+    "queued": "⏳ _summary queued_",
+    "running": "🔄 _summarizing_",
+    "done": "✅ _summary ready_",
+    "failed": "⚠️ _summary failed_",
+}
+
+@st.cache_resource(show_spinner=False)
+def get_engine() -> PDF_Pal_App:
+    # Built once per server process and shared by every browser session: one Groq connection pool,
+    # one Chroma collection partitioned by session_id, one embedding model and one job scheduler.
+    # Per-user state (chat list, names, files) stays in st.session_state.
+    logger.info("Creating the process-wide PDF_Pal_App engine.")
+    engine = PDF_Pal_App()
+    # Chroma and the embedding model load on a background thread while the page renders
+    engine.warm_up()
+    return engine
+
 def initialize_session_state() -> None:
-    # Initialize global app instance
+    # Attach the shared engine to this browser session
     if "pdf_pal_app" not in st.session_state:
         try:
-            st.session_state.pdf_pal_app = PDF_Pal_App()
-            logger.info("PDF_Pal_App instance created and stored in session state.")
+            st.session_state.pdf_pal_app = get_engine()
+            logger.info("Shared PDF_Pal_App engine attached to session state.")
         except Exception as e:
             st.error(f"Error initializing app: {e}")
             logger.error(f"Error initializing app: {e}")
@@ -101,6 +120,13 @@ def main() -> None:
         st.divider()
         st.subheader("Recent Chats")
         
+        # Without a persistent store, idle expiry deletes a chat's documents; its files must be uploaded again
+        for sid, sdata in st.session_state.sessions.items():
+            if st.session_state.pdf_pal_app.sessions.acknowledge_expiry(sid):
+                sdata["docs_processed"] = False
+                sdata["files"] = []
+                logger.info(f"Session {sid} expired after inactivity; cleared its processed files.")
+
         # Session List
         sessions_sorted = sorted(st.session_state.sessions.items(), key=lambda x: x[1]['created_at'], reverse=True)
         for sid, sdata in sessions_sorted:
@@ -127,6 +153,8 @@ def main() -> None:
             with col_del:
                 if st.button("🗑️", key=f"del_btn_{sid}", help="Delete chat", type="tertiary"):
                     deleted_name = st.session_state.sessions[sid]["name"]
+                    # Cancel the chat's background jobs and free its vectors and history in the shared engine
+                    st.session_state.pdf_pal_app.sessions.delete_session(sid)
                     del st.session_state.sessions[sid]
                     # If active session was deleted, switch context
                     if st.session_state.current_session_id == sid:
@@ -159,8 +187,10 @@ def main() -> None:
                     session_files = sdata.get("files", [])
                     if session_files:
                         st.markdown("**Uploaded Files:**")
+                        summary_status = st.session_state.pdf_pal_app.summary_status(sid)
                         for f in session_files:
-                            st.markdown(f"- `{f}`")
+                            badge = SUMMARY_BADGES.get(summary_status.get(f), "")
+                            st.markdown(f"- `{f}` {badge}")
                     else:
                         st.markdown("_No files uploaded._")
                         
@@ -226,6 +256,13 @@ def main() -> None:
     if not current_session.get("docs_processed", False) and len(current_session["history"]) == 0:
         st.info("👈 Click the '📂' button next to this chat in the sidebar to upload a PDF.")
 
+    pending_summaries = [
+        name for name, status in st.session_state.pdf_pal_app.summary_status(current_session_id).items()
+        if status in ("queued", "running")
+    ]
+    if pending_summaries:
+        st.caption(f"🔄 Document summary in progress for {', '.join(pending_summaries)}. Overview questions will use excerpts until it's ready.")
+
     # Render Chat History for Active Session
     for message in current_session["history"]:
         with st.chat_message(message["role"]):
@@ -246,25 +283,23 @@ def main() -> None:
             short_q = user_question if len(user_question) <= 20 else user_question[:17] + "..."
             current_session["name"] = short_q
             
-        # 4. Generate AI response
+        # 4. Stream the AI response token by token as it is generated
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    response = st.session_state.pdf_pal_app.ask(
-                        query=user_question,
-                        session_id=current_session_id,
-                        context_window=10,
-                        file_names=current_session.get("files", [])
-                    )
-                    if response:
-                        st.markdown(response)
-                        current_session["history"].append({"role": "assistant", "content": response})
-                        # Explicit rerun to update the sidebar if name changed
-                        st.rerun()
-                except Exception as e:
-                    st.session_state.flash_msg = ("error", f"❌ Error generating response: {str(e)}")
-                    logger.error(f"Chat generation error: {e}")
+            try:
+                response = st.write_stream(st.session_state.pdf_pal_app.ask_stream(
+                    query=user_question,
+                    session_id=current_session_id,
+                    context_window=10,
+                    file_names=current_session.get("files", [])
+                ))
+                if response:
+                    current_session["history"].append({"role": "assistant", "content": response})
+                    # Explicit rerun to update the sidebar if name changed
                     st.rerun()
+            except Exception as e:
+                st.session_state.flash_msg = ("error", f"❌ Error generating response: {str(e)}")
+                logger.error(f"Chat generation error: {e}")
+                st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,15 +1,60 @@
 from src.schemas import Promptschema
-from src.config import config, load
+from src.config import load
 from src.logger import logger
+from src.extraction import Parallel_PDF_Extractor, Page_Cache, iter_pdf_pages, read_pdf_bytes
+from src.document_store import Document_Store, content_hash
+from src.summarizer import Map_Reduce_Summarizer, Streaming_Map, level_granularity, load_prompt
+from src.tokens import Token_Counter, Token_Budget, MESSAGE_OVERHEAD_TOKENS
+from src.history import History_Store
+from src.streaming import strip_markers
+from src.scheduler import Job_Scheduler, QUEUED, RUNNING
+from src.sessions import Session_Manager
+from src.lexical import BM25_Index, reciprocal_rank_fusion
+from src.vector_index import Flat_Vector_Index
+from src.answer_cache import Semantic_Answer_Cache
+from src.rerank import maximal_marginal_relevance
+from src.router import Intent_Router, SUMMARY, LOOKUP, COMPARISON, FOLLOWUP
+from src.lazy import lazy_import
+from src.metrics import metrics, TOKEN_BUCKETS
 
 import json
+import time
+import threading
+import numpy as np
 from pathlib import Path
-from groq import Groq
-import chromadb
-import uuid
-from pypdf import PdfReader
-from typing import List, Any
-from chonkie import RecursiveChunker
+from typing import List, Any, Iterable, Iterator, Optional, Dict, Tuple, Union
+
+# Heavy dependencies load on first use, so importing this module stays fast (see benchmarks/bench_coldstart.py)
+httpx = lazy_import("httpx")
+Groq = lazy_import("groq", "Groq")
+DefaultHttpxClient = lazy_import("groq", "DefaultHttpxClient")
+chromadb = lazy_import("chromadb")
+PdfReader = lazy_import("pypdf", "PdfReader")
+RecursiveChunker = lazy_import("chonkie", "RecursiveChunker")
+Cached_Embedding_Function = lazy_import("src.embeddings", "Cached_Embedding_Function")
+
+_CHROMA_CLIENT_LOCK = threading.Lock()
+# Opens the system message carrying the rolling summary of compacted turns
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+# Section and chapter summary nodes sent after the document roots for whole-document questions
+SUMMARY_SECTION_ROWS = 2
+# Outcomes of attaching an uploaded PDF from the document store: attached by reference, not stored (to be
+# ingested), or stored but refused by the session's memory quota (ingesting it again would be refused too)
+ATTACHED, UNKNOWN, REJECTED = "attached", "unknown", "rejected"
+# Flat-tier rows are stored in their own collection with this stand-in vector; their real vectors live in the flat
+# index (and, with a persistent backend, the document store), and Chroma requires one per row
+FLAT_ROW_EMBEDDING = [1.0]
+
+class Text_Chunk:
+    """
+    Lightweight chunk container exposing the same `text` / `token_count` attributes as chonkie chunks.
+    Used for synthetic chunks (summaries, chunks restored from the document store) that bypass the chunker.
+    Optional `extra_metadata` is merged into the chunk's ChromaDB metadata when indexed.
+    """
+    def __init__(self, text: str, token_count: int = None, extra_metadata: Dict[str, Any] = None) -> None:
+        self.text = text
+        self.token_count = token_count if token_count is not None else len(text) // 4
+        self.extra_metadata = extra_metadata or {}
 
 class PDF_Pal_Brain:
     """
@@ -19,13 +64,52 @@ class PDF_Pal_Brain:
     """
     def __init__(self)-> None  :
         logger.info("Initializing PDF_Pal_Brain class.")
-        self.client = Groq(api_key=config.GROQ_API_KEY)
+        # Secrets are read here, on first use, rather than when the config module is imported
+        from src.config import config
+        # One pooled HTTP client serves every session's chat and summary calls
+        self.client = Groq(
+            api_key=config.GROQ_API_KEY,
+            http_client=DefaultHttpxClient(limits=httpx.Limits(
+                max_connections=load.LLM_CONNECTIONS,
+                max_keepalive_connections=load.LLM_CONNECTIONS
+            ))
+        )
         self.system_prompt = Path(Path(__file__).resolve().parent / "prompts" / "PDF_Pal_prompt.md").read_text()
         
-        # Modified to handle multiple sessions mapped by ID
-        self.history = {}
+        self.counter = Token_Counter(load.TOKENIZER_NAME)
+        # Per-session ring buffers of messages, capped by tokens, with evicted turns optionally spilled to SQLite
+        self.history = History_Store(self.counter, max_tokens=load.HISTORY_MAX_TOKENS, spill_path=load.HISTORY_SPILL_PATH or None)
+        # Rolling summaries of turns compacted out of the prompt: {session_id: {"text": str, "upto": int}}
+        self.history_summaries = {}
+        # Sessions whose last prompt left turns out, with the (history budget, context window) to compact them for
+        self._compaction_due: Dict[str, Tuple[int, Optional[int]]] = {}
+        # Runs compaction in the background once set (PDF_Pal_App sets it); without one it runs after the answer
+        self.scheduler = None
+        # Prompt-token breakdown of each session's most recent request
+        self.last_usage = {}
+        # What the context in each session's system message was retrieved for, so follow-ups can reuse it:
+        # {session_id: {"ids": [...], "vectors": np.ndarray, "route": str, "fingerprint": str}}
+        self.last_context = {}
+        # One lock per session so a session's turns never interleave when the brain is shared across threads
+        self._session_locks = {}
+        self._locks_guard = threading.Lock()
+        self.budget = Token_Budget(
+            self.counter,
+            total=load.PROMPT_TOKEN_BUDGET,
+            context_share=load.CONTEXT_TOKEN_SHARE,
+            summary_share=load.HISTORY_SUMMARY_SHARE
+        )
         logger.success("PDF_Pal_Brain class initialized successfully.")
 
+    def session_lock(self, session_id: str) -> threading.Lock:
+        """
+        Returns the lock serializing a session's chat turns, creating it on first use.
+        """
+        with self._locks_guard:
+            if session_id not in self._session_locks:
+                self._session_locks[session_id] = threading.Lock()
+            return self._session_locks[session_id]
+
     def clear_history(self, session_id: str = "default")-> None:
         """
         Clears the conversation history for a specific session.
@@ -39,74 +123,309 @@ class PDF_Pal_Brain:
         """
         logger.info(f"Clearing conversation history for session: {session_id}")
         if session_id in self.history:
-            self.history[session_id] = []
+            self.history[session_id].clear()
+        self.history_summaries.pop(session_id, None)
+        self._compaction_due.pop(session_id, None)
+        self.last_usage.pop(session_id, None)
+        self.last_context.pop(session_id, None)
         logger.success(f"Conversation history cleared for session: {session_id}")
 
+    def forget_session(self, session_id: str) -> None:
+        """
+        Drops every trace of a session: its history, rolling summary, usage record, context record and lock.
+        """
+        self.history.pop(session_id, None)
+        self.history_summaries.pop(session_id, None)
+        self._compaction_due.pop(session_id, None)
+        self.last_usage.pop(session_id, None)
+        self.last_context.pop(session_id, None)
+        with self._locks_guard:
+            self._session_locks.pop(session_id, None)
+
     def chat(self,query: str, context: str = None , temperature: float = None, context_window: int = None, session_id: str = "default") -> str:
         """
         This function is used to call the LLM with the given query and context. 
         It also maintains a history of the conversation per session.
+        The prompt is kept within PROMPT_TOKEN_BUDGET: the context is trimmed to its share and turns
+        that no longer fit are folded into a rolling summary instead of being dropped. The summary call
+        runs after the answer is committed (see `schedule_compaction`), never before the request.
         
         Args:
             query (str): The user query to be sent to the LLM.
             context (str, optional): The retrieved RAG context to be sent to the LLM to ground its knowledge.
             temperature (float, optional): The creativity/randomness setting to be used for the LLM response.
-            context_window (int, optional): The max number of previous messages to be sent as history context.
-                                            Used to prevent exceeding context window limits.
+            context_window (int, optional): The max number of previous messages to be sent verbatim as history context.
+                                            Older messages are compacted into the rolling summary.
             session_id (str, optional): The unique identifier for the user session to map conversation history.
                                         Defaults to "default".
                                         
         Returns:
             str: The text response generated from the LLM.
         """
-        logger.info(f"Calling LLM with query: {query} for session: {session_id}")
+        logger.info("Calling LLM for session: {}", session_id)
+        logger.opt(lazy=True).debug("LLM query: {}", lambda: query)
         
-        # Initialize history for this session if it doesn't exist
-        if session_id not in self.history:
-            self.history[session_id] = []
+        with self.session_lock(session_id):
+            history_to_send, usage = self.prepare_messages(query, context, context_window, session_id)
 
-        current_history = self.history[session_id]
+            kwargs = {
+                "model": load.LLM_MODEL,
+                "messages": history_to_send 
+            }
+            if temperature:
+                kwargs["temperature"] = temperature
+
+            with metrics.span("llm", mode="blocking"):
+                chat = self.client.chat.completions.create(**kwargs)
+            output = str(chat.choices[0].message.content)
+        
+            # Clean output in case the model leaks chat tags
+            output = output.replace("<|im_start|>", "").replace("<|im_end|>", "")
+        
+            self.commit_answer(session_id, output, usage, getattr(chat, "usage", None))
+        self.schedule_compaction(session_id)
+        return output
+
+    def chat_stream(self, query: str, context: str = None, temperature: float = None, context_window: int = None, session_id: str = "default") -> Iterator[str]:
+        """
+        Streaming variant of `chat`: yields the response text as the LLM produces it, with leaked chat
+        tags stripped on the fly. The full answer is committed to the session history once the stream
+        ends, or with whatever was received if the consumer stops early.
+        
+        Args:
+            query (str): The user query to be sent to the LLM.
+            context (str, optional): The retrieved RAG context to be sent to the LLM to ground its knowledge.
+            temperature (float, optional): The creativity/randomness setting to be used for the LLM response.
+            context_window (int, optional): The max number of previous messages to be sent verbatim as history context.
+            session_id (str, optional): The unique identifier for the user session to map conversation history.
+            
+        Yields:
+            str: Consecutive pieces of the response text.
+        """
+        logger.info("Streaming LLM response for session: {}", session_id)
+        logger.opt(lazy=True).debug("LLM query: {}", lambda: query)
+        
+        try:
+            # Held until the stream ends so the next turn sees this answer in history
+            with self.session_lock(session_id):
+                history_to_send, usage = self.prepare_messages(query, context, context_window, session_id)
+
+                kwargs = {
+                    "model": load.LLM_MODEL,
+                    "messages": history_to_send,
+                    "stream": True
+                }
+                if temperature:
+                    kwargs["temperature"] = temperature
+
+                start = time.perf_counter()
+                stream = self.client.chat.completions.create(**kwargs)
+                parts, provider = [], {}
+                try:
+                    for text in strip_markers(self._stream_deltas(stream, provider)):
+                        if not parts:
+                            metrics.observe("stage_seconds", time.perf_counter() - start, stage="llm_first_token")
+                        parts.append(text)
+                        yield text
+                finally:
+                    metrics.observe("stage_seconds", time.perf_counter() - start, stage="llm", mode="stream")
+                    close = getattr(stream, "close", None)
+                    if callable(close):
+                        close()
+                    if parts:
+                        self.commit_answer(session_id, "".join(parts), usage, provider.get("usage"))
+        finally:
+            self.schedule_compaction(session_id)
+
+    @staticmethod
+    def _stream_deltas(stream: Iterable[Any], provider: Dict[str, Any]) -> Iterator[str]:
+        for chunk in stream:
+            # Groq reports usage on the final chunk under x_groq; OpenAI-style servers use chunk.usage
+            chunk_usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None)
+            if chunk_usage is not None:
+                provider["usage"] = chunk_usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def commit_answer(self, session_id: str, output: str, usage: Dict[str, int], provider_usage: Any = None) -> None:
+        """
+        Appends the assistant's answer to the session history and records the request's prompt-token usage.
+        
+        Args:
+            session_id (str): The unique identifier for the user session.
+            output (str): The cleaned response text.
+            usage (Dict[str, int]): The prompt-token breakdown returned by `prepare_messages`.
+            provider_usage (Any, optional): The usage object reported by the provider, if any.
+        """
+        self.history[session_id].append("assistant", output)
+        self._record_usage(session_id, usage, provider_usage)
+        logger.success("LLM responded for session {} ({} characters).", session_id, len(output))
+        logger.opt(lazy=True).debug("LLM response: {}", lambda: output)
+
+    def record_turn(self, session_id: str, query: str, answer: str) -> None:
+        """
+        Appends a question and an answer produced without an LLM call (e.g. from the answer cache) to the session history.
+        """
+        with self.session_lock(session_id):
+            current_history = self.history.setdefault(session_id)
+            if not current_history:
+                current_history.set_system(self.system_prompt.format(context=""))
+            current_history.append("user", query)
+            current_history.append("assistant", answer)
+
+    def prepare_messages(self, query: str, context: str = None, context_window: int = None, session_id: str = "default") -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+        """
+        Records the user turn in the session history and assembles the token-budgeted message list for it.
+        
+        Args:
+            query (str): The user query.
+            context (str, optional): The retrieved RAG context. None keeps the previous turn's system message unchanged.
+            context_window (int, optional): The max number of previous messages to send verbatim.
+            session_id (str, optional): The unique identifier for the user session.
+            
+        Returns:
+            Tuple[List[Dict[str, str]], Dict[str, int]]: The messages to send and their prompt-token breakdown.
+        """
+        started = time.perf_counter()
+        current_history = self.history.setdefault(session_id)
+
+        template_tokens = self.counter.count(self.system_prompt.format(context=""))
+        # Without new context the previous turn's system message is kept byte for byte, so provider prompt caching can match it
+        kept = context is None and bool(current_history)
+        if kept:
+            context_tokens = max(self.counter.count(current_history[0].content) - template_tokens, 0)
+        else:
+            context_tokens = self.counter.count(context) if context else 0
+        context_budget, history_budget = self.budget.split(template_tokens, context_tokens, self.counter.count(query))
+        if kept:
+            # A kept context can't be trimmed, so history gets only what the context actually leaves
+            history_budget = max(context_budget + history_budget - context_tokens, 0)
+        if context:
+            trimmed = self.counter.truncate(context, context_budget)
+            if len(trimmed) < len(context):
+                logger.warning(f"Retrieved context trimmed to {context_budget} tokens to fit the prompt budget.")
+            context = trimmed
 
         if not current_history:
-            current_history = Promptschema(
+            current_history.extend(Promptschema(
                 system=self.system_prompt,
                 user=query,
                 context=context
-            ).format()
+            ).format())
         else:
             # Update the system prompt (first message) with the new context for the current turn
-            if context and len(current_history) > 0 and current_history[0].get("role") == "system":
-                current_history[0]["content"] = self.system_prompt.format(context=context)
-                
-            current_history.append({"role": "user", "content": query})
+            if context:
+                current_history.set_system(self.system_prompt.format(context=context))
 
-        history_to_send = []
+            current_history.append("user", query)
 
-        if context_window and len(current_history) > context_window:
-            history_to_send = [current_history[0]] + current_history[-context_window:]
-        else:
-            history_to_send = current_history
+        start, summary = self._history_window(session_id, history_budget, context_window)
+        window = current_history.window(start)
+        history_to_send = [current_history[0].as_dict()]
+        if summary:
+            history_to_send.append({"role": "system", "content": f"{SUMMARY_HEADER}{summary}"})
+        history_to_send.extend(window.as_dicts())
 
-        kwargs = {
-            "model": load.LLM_MODEL,
-            "messages": history_to_send 
+        # Every stored message carries its token count, so the breakdown needs no recounting
+        usage = {
+            "system": current_history[0].tokens,
+            "summary": self.counter.count_messages(history_to_send[1:2]) if summary else 0,
+            "history": window.tokens - current_history[-1].tokens,
+            "query": current_history[-1].tokens,
         }
-        if temperature:
-            kwargs["temperature"] = temperature
+        usage["prompt_tokens"] = sum(usage.values())
+        metrics.observe("stage_seconds", time.perf_counter() - started, stage="prompt")
+        metrics.observe("prompt_tokens", usage["prompt_tokens"], buckets=TOKEN_BUCKETS)
+        return history_to_send, usage
 
-        chat = self.client.chat.completions.create(**kwargs)
-        output = str(chat.choices[0].message.content)
-        
-        # Clean output in case the model leaks chat tags
-        output = output.replace("<|im_start|>", "").replace("<|im_end|>", "")
-        
-        current_history.append({"role": "assistant", "content": output})
-        
-        # Save it back to the dictionary
-        self.history[session_id] = current_history
-        
-        logger.success(f"LLM responded with: {output}")
-        return output
+    def _history_window(self, session_id: str, budget: int, context_window: int = None) -> Tuple[int, str]:
+        # Returns the index of the oldest turn sent verbatim and the rolling summary of everything before it. Turns
+        # that no longer fit are left out here and marked for compaction, so the request never waits on a summary call
+        current_history = self.history[session_id]
+        state = self.history_summaries.get(session_id, {"text": "", "upto": 1})
+        # The watermark counts every message ever added; turns evicted from the store shift positions down
+        start, end = max(state["upto"] - current_history.dropped, 1), len(current_history) - 1
+        prior = current_history.window(start, end)
+
+        summary_budget = int(budget * self.budget.summary_share)
+        # With a summary to send, its share and the header and role markers framing it come off the history allowance
+        framing = self.counter.count(SUMMARY_HEADER) + MESSAGE_OVERHEAD_TOKENS
+        cut = start + self.budget.select_history(prior, budget - summary_budget - framing if state["text"] else budget)
+        if context_window:
+            cut = max(cut, end - (context_window - 1))
+        if cut > start:
+            self._compaction_due[session_id] = (budget, context_window)
+        return cut, self.counter.truncate(state["text"], summary_budget) if state["text"] else ""
+
+    def schedule_compaction(self, session_id: str) -> None:
+        """
+        Folds the turns the last prompt had to leave out into the session's rolling summary: as a background
+        job when a scheduler is set, otherwise right away. Call it after the answer is committed and the
+        session lock released. No-op when nothing is due.
+        """
+        if session_id not in self._compaction_due:
+            return
+        if self.scheduler is None:
+            self.compact_history(session_id)
+        else:
+            self.scheduler.submit(self.compact_history, session_id, session_id=session_id, name="compact-history")
+
+    def compact_history(self, session_id: str) -> None:
+        """
+        Summarizes a session's oldest unsummarized turns into its rolling summary. The LLM call runs without
+        the session lock; the result is dropped if another compaction got there first or the session was cleared.
+        """
+        with self.session_lock(session_id):
+            due = self._compaction_due.pop(session_id, None)
+            current_history = self.history.get(session_id)
+            if due is None or not current_history:
+                return
+            budget, context_window = due
+            state = self.history_summaries.get(session_id, {"text": "", "upto": 1})
+            offset = current_history.dropped
+            start, end = max(state["upto"] - offset, 1), len(current_history)
+            summary_budget = int(budget * self.budget.summary_share)
+            # Compact down to half the remaining allowance so the summary call runs every few turns, not every turn
+            cut = start + self.budget.select_history(current_history.window(start, end), (budget - summary_budget) // 2)
+            if context_window:
+                cut = max(cut, end - (context_window - 1))
+            if cut <= start:
+                return
+            turns = current_history[start:cut]
+
+        text = self._summarize_turns(state["text"], turns)
+        with self.session_lock(session_id):
+            if self.history_summaries.get(session_id, {"text": "", "upto": 1}) == state and session_id in self.history:
+                self.history_summaries[session_id] = {"text": text, "upto": cut + offset}
+
+    def _summarize_turns(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        logger.info(f"Compacting {len(turns)} older messages into the rolling conversation summary.")
+        try:
+            response = self.client.chat.completions.create(
+                model=load.SUMMARY_MODEL,
+                messages=[{"role": "user", "content": load_prompt("history_summary_prompt.md").format(
+                    summary=summary or "(none yet)", turns=transcript
+                )}],
+                temperature=0.3
+            )
+            return str(response.choices[0].message.content)
+        except Exception as e:
+            # Losing the oldest turns is the pre-budget behaviour; better than failing the user's question
+            logger.warning(f"History compaction failed ({e}); dropping {len(turns)} older messages.")
+            return summary
+
+    def _record_usage(self, session_id: str, usage: Dict[str, int], provider_usage: Any = None) -> None:
+        reported = getattr(provider_usage, "prompt_tokens", None)
+        usage["provider_prompt_tokens"] = reported if isinstance(reported, int) else None
+        self.last_usage[session_id] = usage
+        metrics.increment("llm_requests")
+        if usage["provider_prompt_tokens"] is not None:
+            metrics.increment("llm_tokens", usage["provider_prompt_tokens"], kind="prompt")
+        completion = getattr(provider_usage, "completion_tokens", None)
+        if isinstance(completion, int):
+            metrics.increment("llm_tokens", completion, kind="completion")
+        logger.info("Prompt tokens for session {}: {} of {} budgeted ({}).", session_id, usage["prompt_tokens"], self.budget.total, usage)
 
 
 class RAG_Memory:
@@ -114,24 +433,152 @@ class RAG_Memory:
     This class is responsible for managing the RAG (Retrieval-Augmented Generation) memory using ChromaDB.
     It initializes the ChromaDB client and sets up a collection for storing conversation history and retrieved documents.
     """
-    def __init__(self):
-        self.client = chromadb.Client()
-        # Create a collection configured for cosine similarity via HNSW
-        self.collection = self.client.get_or_create_collection(
-            name="pdf_pal_memory",
-            metadata={"hnsw:space": "cosine"}
+    def __init__(self, persist_dir: str = None, embedding_function: Any = None):
+        """
+        Args:
+            persist_dir (str, optional): Local directory for a persistent ChromaDB backend and document store.
+                                         Defaults to the PERSIST_DIR setting; an empty value keeps everything in memory.
+            embedding_function (Any, optional): Embedding function for the collections. Defaults to ChromaDB's
+                                                model wrapped in the LRU/disk embedding cache.
+        """
+        persist_dir = persist_dir if persist_dir is not None else load.PERSIST_DIR
+        self.persist_dir = persist_dir
+        # The Chroma client, collection, document store and embedding model are created on first use (or by
+        # `warm_up`), so constructing the engine doesn't wait for chromadb to import and start
+        self._embedder = embedding_function
+        self._client = None
+        self._collection = None
+        self._flat_collection = None
+        self._store = None
+        self._connect_lock = threading.Lock()
+        # Live chunk count and estimated bytes per session, maintained as rows are added and removed
+        self.footprints: Dict[str, Dict[str, int]] = {}
+        self._footprint_lock = threading.Lock()
+        # Bytes per stored vector; starts at the default model's 384 float32 dimensions and is refined from real embeddings
+        self.embedding_bytes = 384 * 4
+        # BM25 postings fused with vector scores at retrieval time, so exact identifiers aren't missed
+        self.lexical = BM25_Index()
+        # Small sessions are searched exactly in their own NumPy matrix instead of the shared, session-filtered HNSW graph
+        self.vectors = Flat_Vector_Index(
+            max_vectors=load.FLAT_INDEX_MAX_CHUNKS,
+            dtype=load.FLAT_INDEX_DTYPE,
+            rescore=load.FLAT_INDEX_RESCORE,
+            storage_dir=load.FLAT_INDEX_DIR or None
         )
+        self._hydrated = set()
+        # Serializes writes to a session's rows, so a promotion can't interleave with an add to the flat tier
+        self._write_locks: Dict[str, threading.RLock] = {}
+        self._write_locks_guard = threading.Lock()
+        # Order-independent XOR of each session's (file, content chunk) hashes, identifying its document set
+        self._fingerprints: Dict[str, int] = {}
+
+    @property
+    def embedder(self) -> Any:
+        if self._embedder is None:
+            with self._connect_lock:
+                if self._embedder is None:
+                    # Every query and chunk embedding goes through the cache, so repeated texts skip model inference
+                    self._embedder = Cached_Embedding_Function(
+                        max_entries=load.EMBEDDING_CACHE_SIZE,
+                        cache_dir=load.EMBEDDING_CACHE_DIR or None
+                    )
+        return self._embedder
+
+    @embedder.setter
+    def embedder(self, embedder: Any) -> None:
+        self._embedder = embedder
+
+    def embedding_cache_stats(self) -> Dict[str, Any]:
+        """
+        Returns the embedding cache's hit and miss statistics. Empty until the embedder has been created
+        (reading them never loads the model) or when a custom embedder keeps none.
+        """
+        stats = getattr(self._embedder, "stats", None)
+        return stats() if callable(stats) else {}
+
+    def _connect(self) -> None:
+        if self._collection is not None:
+            return
+        embedder = self.embedder
+        with self._connect_lock:
+            if self._collection is not None:
+                return
+            # ChromaDB's shared system cache isn't safe against concurrent client construction
+            with _CHROMA_CLIENT_LOCK:
+                client = chromadb.PersistentClient(path=self.persist_dir) if self.persist_dir else chromadb.Client()
+            # Content-addressed chunk store so re-uploaded documents skip re-embedding (persistent backend only)
+            self._store = Document_Store(client, self.persist_dir, embedder) if self.persist_dir else None
+            self._client = client
+            # Rows of flat-tier sessions, without their vectors (see FLAT_ROW_EMBEDDING)
+            self._flat_collection = client.get_or_create_collection(name="pdf_pal_flat_rows", embedding_function=None)
+            # Create a collection configured for cosine similarity via HNSW; assigned last, as the "connected" flag
+            self._collection = client.get_or_create_collection(
+                name="pdf_pal_memory",
+                metadata={"hnsw:space": "cosine"},
+                embedding_function=embedder
+            )
+
+    @property
+    def client(self) -> Any:
+        self._connect()
+        return self._client
 
-    def index(self, chunks: List[Any], session_id: str, file_name: str = "Unknown", chunk_type: str = "content") -> None:
+    @property
+    def collection(self) -> Any:
+        self._connect()
+        return self._collection
+
+    @collection.setter
+    def collection(self, collection: Any) -> None:
+        self._collection = collection
+
+    @property
+    def flat_collection(self) -> Any:
+        self._connect()
+        return self._flat_collection
+
+    @flat_collection.setter
+    def flat_collection(self, collection: Any) -> None:
+        self._flat_collection = collection
+
+    @property
+    def store(self) -> Optional[Document_Store]:
+        self._connect()
+        return self._store
+
+    @store.setter
+    def store(self, store: Optional[Document_Store]) -> None:
+        self._store = store
+
+    def warm_up(self) -> None:
+        """
+        Creates the Chroma collection and loads the embedding model ahead of the first request.
+        """
+        start = time.perf_counter()
+        self._connect()
+        self.embedder(["warm-up"])
+        logger.info(f"RAG memory warmed up in {time.perf_counter() - start:.2f}s.")
+
+    @staticmethod
+    def document_hash(pdf: Any) -> str:
+        """
+        Computes the content hash identifying an uploaded PDF by its raw bytes.
+        """
+        return content_hash(read_pdf_bytes(pdf))
+
+    def index(self, chunks: List[Any], session_id: str, file_name: str = "Unknown", chunk_type: str = "content", doc_hash: str = None) -> None:
         """
         Indexes a list of chunks into the ChromaDB collection.
         This operation acts as saving to the in-memory RAG.
+        Chunk IDs are derived from the chunk content, so re-indexing an identical chunk is a no-op.
         
         Args:
             chunks (List[Any]): A list of chunk objects generated by the Semantic Chunker.
             session_id (str): The unique identifier for the user session uploading the document.
             file_name (str, optional): The name of the file these chunks originated from.
             chunk_type (str, optional): The classification of chunk (e.g., 'content' or 'summary').
+            doc_hash (str, optional): Content hash of the source PDF. When a document store is configured,
+                                      chunks are recorded against it so later uploads can be attached by reference.
         
         Returns:
             None
@@ -140,65 +587,567 @@ class RAG_Memory:
             logger.warning("No chunks to index in ChromaDB.")
             return
 
-        logger.info(f"Indexing {len(chunks)} chunks into ChromaDB for session {session_id} from {file_name} (Type: {chunk_type}).")
+        logger.info("Indexing {} chunks into ChromaDB for session {} from {} (Type: {}).", len(chunks), session_id, file_name, chunk_type)
+        started = time.perf_counter()
         documents = [chunk.text for chunk in chunks]
-        # Generate a unique ID for each chunk to prevent overwriting
-        ids = [str(uuid.uuid4()) for _ in range(len(chunks))]
-        # Safely extract token_count if it exists, otherwise estimate it, and deploy metadata payload
-        metadatas = [
-            {
-                "token_count": getattr(chunk, "token_count", len(chunk.text) // 4), 
+        hashes = [content_hash(text) for text in documents]
+        # Safely extract token_count if it exists, otherwise estimate it
+        token_counts = [getattr(chunk, "token_count", len(chunk.text) // 4) for chunk in chunks]
+
+        extras = [getattr(chunk, "extra_metadata", None) or {} for chunk in chunks]
+
+        embeddings = None
+        # A flat-tier session's rows keep no vectors in Chroma, so theirs go to the store too and survive a restart
+        if self.store is not None and (doc_hash or self.vectors.accepts(session_id)):
+            embeddings = self.store.put_chunks(documents, hashes, token_counts, extras)
+            if doc_hash:
+                self.store.record_chunks(doc_hash, chunk_type, hashes, file_name)
+
+        self._add_session_rows(documents, hashes, token_counts, session_id, file_name, chunk_type, doc_hash, embeddings, extras)
+        # Includes embedding the new chunks, which the embed stage also reports on its own
+        metrics.observe("stage_seconds", time.perf_counter() - started, stage="index")
+        metrics.increment("chunks_indexed", len(chunks), type=chunk_type)
+        logger.success("Successfully indexed chunks into RAG memory.")
+
+    def _add_session_rows(self, documents: List[str], hashes: List[str], token_counts: List[int], session_id: str,
+                          file_name: str, chunk_type: str, doc_hash: str = None, embeddings: List[Any] = None,
+                          extras: List[Dict[str, Any]] = None) -> None:
+        self._hydrate_session(session_id)
+        # Content-addressed IDs scoped to the session and file, so identical chunks are never stored twice
+        ids = [content_hash(session_id, file_name, chunk_type, chunk_hash) for chunk_hash in hashes]
+        existing = set(self.get_rows([], ids=list(set(ids)))["ids"])
+
+        rows = {}
+        for position, chunk_id in enumerate(ids):
+            if chunk_id not in existing and chunk_id not in rows:
+                rows[chunk_id] = position
+        if not rows:
+            logger.info("All chunks already indexed for this session; nothing to add.")
+            return
+
+        metadatas = []
+        for position in rows.values():
+            metadata = {
+                "token_count": token_counts[position], 
                 "session_id": session_id, 
                 "file_name": file_name, 
                 "type": chunk_type
-            } 
-            for chunk in chunks
-        ]
+            }
+            if doc_hash:
+                metadata["doc_hash"] = doc_hash
+            if extras:
+                metadata.update(extras[position])
+            metadatas.append(metadata)
+
+        added = [documents[position] for position in rows.values()]
+        if embeddings is not None:
+            # Reuse stored embeddings so ChromaDB doesn't run the embedding model again
+            embeddings = [embeddings[position] for position in rows.values()]
+        elif self.vectors.accepts(session_id):
+            # Embedded here rather than inside Chroma, outside the write lock, since the flat index keeps the vectors
+            embeddings = self.embedder(added)
+
+        with self._write_lock(session_id):
+            self._store_rows(session_id, list(rows), added, metadatas, embeddings)
+        self.lexical.add(session_id, file_name, chunk_type, list(rows), added)
+        # Counted after the rows found their tier, so each is charged for the vector copy it has
+        self._account(session_id, len(added), self.estimate_bytes(added, session_id))
+        if chunk_type == "content":
+            self._fold_fingerprint(session_id, file_name, [hashes[position] for position in rows.values()])
+
+    def _index_lexical_rows(self, session_id: str, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        # Rows read back from Chroma arrive mixed; the lexical index is partitioned by file and type
+        groups: Dict[Tuple[str, str], Tuple[List[str], List[str]]] = {}
+        for chunk_id, text, metadata in zip(ids, documents, metadatas):
+            key = (metadata.get("file_name", "Unknown"), metadata.get("type", "content"))
+            group = groups.setdefault(key, ([], []))
+            group[0].append(chunk_id)
+            group[1].append(text)
+        for (file_name, chunk_type), (group_ids, texts) in groups.items():
+            self.lexical.add(session_id, file_name, chunk_type, group_ids, texts)
+
+    def _index_vector_rows(self, session_id: str, ids: List[str], metadatas: List[Dict[str, Any]], embeddings: Any) -> None:
+        groups: Dict[str, Tuple[List[str], List[Any]]] = {}
+        for chunk_id, metadata, embedding in zip(ids, metadatas, embeddings):
+            group = groups.setdefault(metadata.get("type", "content"), ([], []))
+            group[0].append(chunk_id)
+            group[1].append(embedding)
+        for chunk_type, (group_ids, vectors) in groups.items():
+            self.vectors.add(session_id, chunk_type, group_ids, vectors)
 
-        # Use the add method to insert chunk documents and their metadata
+    def _write_lock(self, session_id: str) -> threading.RLock:
+        with self._write_locks_guard:
+            if session_id not in self._write_locks:
+                self._write_locks[session_id] = threading.RLock()
+            return self._write_locks[session_id]
+
+    def _store_rows(self, session_id: str, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+                    embeddings: Any = None) -> None:
+        # Under the session's write lock. A flat-tier session's rows go to the flat collection and their vectors to
+        # the flat index only; rows that don't fit promote the session first, and then go to the HNSW collection
+        if embeddings is not None and len(embeddings):
+            self.embedding_bytes = len(embeddings[0]) * 4
+        if self.vectors.accepts(session_id) and len(ids) > self.vectors.room(session_id):
+            self._promote(session_id)
+        if not self.vectors.accepts(session_id):
+            kwargs = {"embeddings": embeddings} if embeddings is not None else {}
+            self.collection.add(ids=ids, documents=documents, metadatas=metadatas, **kwargs)
+            return
+        if embeddings is None:
+            embeddings = self.embedder(documents)
+        self.flat_collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=[FLAT_ROW_EMBEDDING] * len(ids))
+        self._index_vector_rows(session_id, ids, metadatas, embeddings)
+
+    def _promote(self, session_id: str) -> None:
+        # Under the session's write lock: the session leaves the flat tier and its rows move to the HNSW collection
+        rows = self.flat_collection.get(where={"session_id": session_id}, include=["documents", "metadatas"])
+        flat_bytes = self.vector_bytes(session_id)
+        held = self.vectors.promote(session_id)
+        if not rows["ids"]:
+            return
+        # Rows the flat index doesn't hold (not rebuilt since a restart) are read back from the store
+        missing = [position for position, chunk_id in enumerate(rows["ids"]) if chunk_id not in held]
+        if missing:
+            held.update(zip([rows["ids"][position] for position in missing],
+                            self._stored_vectors([rows["documents"][position] for position in missing])))
         self.collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
+            ids=rows["ids"],
+            documents=rows["documents"],
+            metadatas=rows["metadatas"],
+            embeddings=[held[chunk_id] for chunk_id in rows["ids"]]
         )
-        logger.success("Successfully indexed chunks into RAG memory.")
+        self.flat_collection.delete(ids=rows["ids"])
+        # Only rows that were in the flat index were charged for its copy
+        charged = len(rows["ids"]) - len(missing)
+        self._account(session_id, 0, charged * (self.embedding_bytes - flat_bytes))
+
+    def _stored_vectors(self, documents: List[str]) -> List[Any]:
+        # Flat-tier rows are stored without their vectors; the document store keeps each chunk's float32 embedding
+        # under its content hash, so only chunks it lacks (e.g. rows written before it was configured) are embedded
+        hashes = [content_hash(text) for text in documents]
+        known = self.store.get_embeddings(hashes) if self.store is not None else {}
+        missing = list(dict.fromkeys(text for text, chunk_hash in zip(documents, hashes) if chunk_hash not in known))
+        if missing:
+            known.update(zip([content_hash(text) for text in missing], self.embedder(missing)))
+        return [known[chunk_hash] for chunk_hash in hashes]
+
+    def _hydrate_session(self, session_id: str) -> None:
+        # A persistent collection outlives the process but the lexical and flat indexes don't; rebuild a session's on first use
+        if not self.persist_dir or session_id in self._hydrated:
+            return
+        with self._write_lock(session_id):
+            if session_id in self._hydrated:
+                return
+            if not self.lexical.has_session(session_id):
+                where = {"session_id": session_id}
+                stored = self.collection.get(where=where, include=["documents", "metadatas"])
+                flat = self.flat_collection.get(where=where, include=["documents", "metadatas"])
+                for rows in (stored, flat):
+                    if rows["ids"]:
+                        self._index_lexical_rows(session_id, rows["ids"], rows["documents"], rows["metadatas"])
+                if stored["ids"] or len(flat["ids"]) > self.vectors.room(session_id):
+                    # Promoted before the restart (flat rows left by an interrupted promotion follow), or too large now
+                    self._promote(session_id)
+                elif flat["ids"]:
+                    self._index_vector_rows(session_id, flat["ids"], flat["metadatas"], self._stored_vectors(flat["documents"]))
+                if stored["ids"] or flat["ids"]:
+                    logger.info(f"Rebuilt lexical and vector indexes for session {session_id} from "
+                                f"{len(stored['ids']) + len(flat['ids'])} stored chunks.")
+            self._hydrated.add(session_id)
+
+    def get_rows(self, include: List[str], ids: List[str] = None, where: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Reads rows by ID and/or metadata filter from both the HNSW and the flat-tier collection, shaped like a
+        Chroma `get` result. Flat-tier embeddings come from the flat index (None for a session not rebuilt yet).
+
+        Args:
+            include (List[str]): Fields to return: 'documents', 'metadatas' and/or 'embeddings'.
+            ids (List[str], optional): Row IDs to read.
+            where (Dict[str, Any], optional): Metadata filter.
+
+        Returns:
+            Dict[str, Any]: The row 'ids' and one list per included field, in the same order.
+        """
+        merged: Dict[str, Any] = {"ids": [], **{field: [] for field in include}}
+        if ids is not None and not ids:
+            return merged
+        kwargs = {key: value for key, value in (("ids", ids), ("where", where)) if value is not None}
+        flat_fields = [field for field in include if field != "embeddings"]
+        if "embeddings" in include and "metadatas" not in flat_fields:
+            flat_fields.append("metadatas")
+        for collection, fields in ((self.collection, include), (self.flat_collection, flat_fields)):
+            rows = collection.get(include=fields, **kwargs)
+            if not rows["ids"]:
+                continue
+            if collection is self.flat_collection and "embeddings" in include:
+                sessions: Dict[str, List[str]] = {}
+                for chunk_id, metadata in zip(rows["ids"], rows["metadatas"]):
+                    sessions.setdefault(metadata.get("session_id"), []).append(chunk_id)
+                held = {}
+                for session_id, session_ids in sessions.items():
+                    held.update(self.vectors.vectors(session_id, session_ids))
+                rows["embeddings"] = [held.get(chunk_id) for chunk_id in rows["ids"]]
+            merged["ids"].extend(rows["ids"])
+            for field in include:
+                merged[field].extend(rows[field])
+        return merged
+
+    def vector_bytes(self, session_id: str = None) -> int:
+        """
+        Estimates the memory one stored vector takes: the flat index's copy (and the collection's stand-in) while
+        the session is (or would be) in the flat tier, otherwise the collection's float32 copy.
+        """
+        if session_id is not None and self.vectors.accepts(session_id):
+            return self.vectors.vector_bytes(self.embedding_bytes // 4) + 4 * len(FLAT_ROW_EMBEDDING)
+        return self.embedding_bytes
+
+    def estimate_bytes(self, documents: List[str], session_id: str = None) -> int:
+        """
+        Estimates the memory held by a set of chunks: their UTF-8 text plus their vectors (see `vector_bytes`).
+        Without a session the collection's float32 copy is counted.
+        """
+        return sum(len(text.encode("utf-8")) for text in documents) + len(documents) * self.vector_bytes(session_id)
+
+    def _account(self, session_id: str, chunks: int, nbytes: int) -> None:
+        with self._footprint_lock:
+            footprint = self.footprints.setdefault(session_id, {"chunks": 0, "bytes": 0})
+            footprint["chunks"] += chunks
+            footprint["bytes"] += nbytes
 
-    def retrieve(self, query: str, session_id: str, n_results: int = 3, chunk_type: str = "content") -> List[str]:
+    def _fold_fingerprint(self, session_id: str, file_name: str, chunk_hashes: List[str]) -> None:
+        # XOR is order independent, so the same files indexed in any order (or attached by reference) match
+        folded = 0
+        for chunk_hash in chunk_hashes:
+            folded ^= int(content_hash(file_name, chunk_hash)[:32], 16)
+        with self._footprint_lock:
+            self._fingerprints[session_id] = self._fingerprints.get(session_id, 0) ^ folded
+
+    def document_fingerprint(self, session_id: str) -> str:
+        """
+        Returns a fingerprint of the files and content chunks a session holds, equal across sessions with the
+        same document set and changing whenever content is indexed. Empty if the session holds no content.
+        """
+        with self._footprint_lock:
+            fingerprint = self._fingerprints.get(session_id, 0)
+        return f"{fingerprint:032x}" if fingerprint else ""
+
+    def session_footprint(self, session_id: str) -> Dict[str, int]:
+        """
+        Returns the chunk count and estimated bytes a session currently holds in the collection.
+        """
+        with self._footprint_lock:
+            return dict(self.footprints.get(session_id, {"chunks": 0, "bytes": 0}))
+
+    def delete_session(self, session_id: str) -> int:
         """
-        Retrieves the top 'n_results' most relevant chunks for the given query using cosine similarity.
+        Removes every chunk (content and summary) belonging to a session from both collections.
+        Shared document-store records are kept, so other sessions and re-uploads are unaffected.
+        
+        Args:
+            session_id (str): The unique identifier for the user session.
+            
+        Returns:
+            int: The number of chunks removed.
+        """
+        ids = []
+        with self._write_lock(session_id):
+            for collection in (self.collection, self.flat_collection):
+                found = collection.get(where={"session_id": session_id}, include=[])["ids"]
+                if found:
+                    collection.delete(ids=found)
+                    ids.extend(found)
+            self.lexical.delete_session(session_id)
+            self.vectors.delete_session(session_id)
+            self._hydrated.discard(session_id)
+        with self._write_locks_guard:
+            self._write_locks.pop(session_id, None)
+        with self._footprint_lock:
+            self.footprints.pop(session_id, None)
+            self._fingerprints.pop(session_id, None)
+        logger.info(f"Removed {len(ids)} chunks of session {session_id} from RAG memory.")
+        return len(ids)
+
+    def export_session(self, session_id: str) -> Dict[str, Any]:
+        """
+        Returns every row of a session with its embedding, in a form `import_session` can restore
+        without running the embedding model.
+        """
+        self._hydrate_session(session_id)
+        rows = self.get_rows(["documents", "metadatas", "embeddings"], where={"session_id": session_id})
+        return {
+            "ids": rows["ids"],
+            "documents": rows["documents"],
+            "metadatas": rows["metadatas"],
+            "embeddings": np.asarray(rows["embeddings"], dtype=np.float32) if rows["ids"] else np.zeros((0, 0), dtype=np.float32),
+        }
+
+    def import_session(self, session_id: str, rows: Dict[str, Any]) -> None:
+        """
+        Restores rows previously returned by `export_session`.
+        """
+        if not rows["ids"]:
+            return
+        with self._write_lock(session_id):
+            self._store_rows(session_id, list(rows["ids"]), list(rows["documents"]), list(rows["metadatas"]), rows["embeddings"])
+        self._index_lexical_rows(session_id, list(rows["ids"]), list(rows["documents"]), list(rows["metadatas"]))
+        self._account(session_id, len(rows["ids"]), self.estimate_bytes(rows["documents"], session_id))
+        for text, metadata in zip(rows["documents"], rows["metadatas"]):
+            if metadata.get("type", "content") == "content":
+                self._fold_fingerprint(session_id, metadata.get("file_name", "Unknown"), [content_hash(text)])
+
+    def begin_document(self, doc_hash: str, file_name: str) -> None:
+        """
+        Opens a fresh manifest for a document about to be ingested. No-op without a document store.
+        """
+        if self.store is not None:
+            self.store.begin_document(doc_hash, file_name)
+
+    def mark_document_complete(self, doc_hash: str) -> None:
+        """
+        Marks a document's content chunks as fully indexed. No-op without a document store.
+        """
+        if self.store is not None:
+            self.store.mark_complete(doc_hash)
+
+    def attach_document(self, doc_hash: str, session_id: str, file_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Attaches an already-ingested document to a session by reference, copying its stored chunks
+        and embeddings into the session partition without extracting, chunking or embedding anything.
+        
+        Args:
+            doc_hash (str): Content hash of the uploaded PDF bytes.
+            session_id (str): The unique identifier for the user session.
+            file_name (str): The name the file was uploaded under in this session.
+            
+        Returns:
+            Optional[Dict[str, Any]]: The document manifest if the document was attached, None if it is unknown.
+        """
+        if self.store is None:
+            return None
+        manifest = self.store.get_manifest(doc_hash)
+        if not manifest or not manifest.get("complete"):
+            return None
+
+        for chunk_type in ("content", "summary"):
+            records = self.store.get_chunks(manifest.get(chunk_type, []))
+            if records:
+                self._add_session_rows(
+                    [record["text"] for record in records],
+                    [record["hash"] for record in records],
+                    [record["token_count"] for record in records],
+                    session_id, file_name, chunk_type, doc_hash,
+                    [record["embedding"] for record in records],
+                    [record["extra_metadata"] for record in records]
+                )
+        logger.success(f"Attached known document {file_name} ({doc_hash[:12]}) to session {session_id} by reference.")
+        return manifest
+
+    def document_texts(self, doc_hash: str, chunk_type: str = "content") -> List[str]:
+        """
+        Returns the stored chunk texts of a known document in document order.
+        """
+        if self.store is None:
+            return []
+        manifest = self.store.get_manifest(doc_hash) or {}
+        return [record["text"] for record in self.store.get_chunks(manifest.get(chunk_type, []))]
+
+    def document_summaries(self, session_id: str, file_names: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the root ('document' granularity) node of each file's summary tree in a session, fetched
+        by metadata rather than by similarity, so a whole-document question always gets the whole-document summary.
+
+        Args:
+            session_id (str): The unique identifier for the user session.
+            file_names (List[str], optional): Restricts and orders the result to these files. All files, by name, when omitted.
+
+        Returns:
+            List[Dict[str, Any]]: At most one row per file, shaped like the rows of `search_many`.
+        """
+        self._hydrate_session(session_id)
+        found = self.get_rows(
+            ["documents", "metadatas", "embeddings"],
+            where={"$and": [{"session_id": session_id}, {"type": "summary"}, {"granularity": "document"}]}
+        )
+        embeddings = found.get("embeddings")
+        roots = {}
+        for position, (chunk_id, text, metadata) in enumerate(zip(found["ids"], found["documents"], found["metadatas"])):
+            roots[metadata.get("file_name", "Unknown")] = {
+                "id": chunk_id, "document": text, "metadata": metadata,
+                "embedding": embeddings[position] if embeddings is not None else None
+            }
+        return [roots[name] for name in (file_names or sorted(roots)) if name in roots]
+
+    def retrieve(self, query: str, session_id: str, n_results: int = 3, chunk_type: str = "content", hybrid: bool = None, rerank: bool = None,
+                 query_embedding: Any = None) -> List[str]:
+        """
+        Retrieves the top 'n_results' most relevant chunks for the given query.
+        In hybrid mode the cosine-similarity ranking is fused with a BM25 ranking by reciprocal rank fusion,
+        so chunks matching rare exact terms (part numbers, clause IDs, names) surface even when their embedding doesn't.
+        With reranking, the over-fetched candidates go through maximal marginal relevance so overlapping and
+        near-duplicate chunks don't fill several slots with the same text.
         
         Args:
             query: The search query.
             session_id: The unique session identifier to filter matching chunks.
             n_results: Number of top results to return.
             chunk_type: Filters results strictly to 'content' chunks or 'summary' chunks.
+            hybrid: Fuse BM25 with vector scores. Defaults to the HYBRID_RETRIEVAL setting.
+            rerank: Rerank candidates with MMR. Defaults to the MMR_RERANK setting.
+            query_embedding: The query's embedding, if already computed.
             
         Returns:
-            A list of retrieved document strings.
+            A list of retrieved document strings. May be shorter than n_results when reranking collapses duplicates.
         """
-        logger.info(f"Retrieving top {n_results} results for query: '{query}' in session: {session_id} (Type filtering: {chunk_type})")
-        
-        # Use logical $and operator to filter by both session boundary and chunk type precisely!
-        # This completely guarantees summaries aren't accidentally pulled into normal queries and vice versa.
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results,
-            where={"$and": [{"session_id": session_id}, {"type": chunk_type}]}
-        )
-        
-        documents = results.get("documents", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
+        logger.info("Retrieving top {} results in session: {} (Type filtering: {})", n_results, session_id, chunk_type)
+        logger.opt(lazy=True).debug("Retrieval query: {}", lambda: query)
+        formatted_chunks = self.retrieve_many([query], session_id, n_results=n_results, chunk_types=chunk_type, hybrid=hybrid, rerank=rerank,
+                                             query_embeddings=None if query_embedding is None else [query_embedding])[0]
+        if formatted_chunks:
+            logger.success(f"Retrieved {len(formatted_chunks)} relevant chunks.")
+        else:
+            logger.warning("No relevant chunks retrieved.")
+        return formatted_chunks
+
+    def retrieve_many(self, queries: List[str], session_ids: Union[str, List[str]], n_results: Union[int, List[int]] = 3,
+                      chunk_types: Union[str, List[str]] = "content", hybrid: bool = None, rerank: bool = None,
+                      query_embeddings: List[Any] = None) -> List[List[str]]:
+        """
+        Batch variant of `retrieve` for multi-query and multi-session workloads. Every distinct query text is
+        embedded once in a single pass, and queries sharing a session, chunk type and depth go to Chroma as
+        one multi-query request.
         
-        if documents:
-            logger.success(f"Retrieved {len(documents)} relevant chunks.")
-            formatted_chunks = []
-            for doc, meta in zip(documents, metadatas):
-                fname = meta.get("file_name", "Unknown File")
-                formatted_chunks.append(f"[Source File: {fname}]\n{doc}")
-            return formatted_chunks
+        Args:
+            queries: The search queries.
+            session_ids: The session of each query, or one session for all of them.
+            n_results: Number of top results per query, or one number for all of them.
+            chunk_types: The chunk type ('content' or 'summary') of each query, or one type for all of them.
+            hybrid: Fuse BM25 with vector scores. Defaults to the HYBRID_RETRIEVAL setting.
+            rerank: Rerank candidates with MMR. Defaults to the MMR_RERANK setting.
+            query_embeddings: Embeddings of the queries, if already computed; skips the embedding pass.
+            
+        Returns:
+            One list of retrieved document strings per query, in query order.
+        """
+        results = self.search_many(queries, session_ids, n_results, chunk_types, hybrid, rerank, query_embeddings)
+        return [[self.format_row(row) for row in rows] for rows in results]
+
+    @staticmethod
+    def format_row(row: Dict[str, Any]) -> str:
+        """
+        Formats a retrieved row as a context block tagged with its source file.
+        """
+        return f"[Source File: {row['metadata'].get('file_name', 'Unknown File')}]\n{row['document']}"
+
+    def search_many(self, queries: List[str], session_ids: Union[str, List[str]], n_results: Union[int, List[int]] = 3,
+                    chunk_types: Union[str, List[str]] = "content", hybrid: bool = None, rerank: bool = None,
+                    query_embeddings: List[Any] = None) -> List[List[Dict[str, Any]]]:
+        """
+        The search behind `retrieve_many`, returning raw rows instead of formatted strings.
         
-        logger.warning("No relevant chunks retrieved.")
-        return []
+        Args:
+            queries: The search queries.
+            session_ids: The session of each query, or one session for all of them.
+            n_results: Number of top results per query, or one number for all of them.
+            chunk_types: The chunk type ('content' or 'summary') of each query, or one type for all of them.
+            hybrid: Fuse BM25 with vector scores. Defaults to the HYBRID_RETRIEVAL setting.
+            rerank: Rerank candidates with MMR. Defaults to the MMR_RERANK setting.
+            query_embeddings: Embeddings of the queries, if already computed; skips the embedding pass.
+            
+        Returns:
+            One list per query, in query order, of rows with the chunk 'id', 'document', 'metadata' and stored
+            'embedding' (None if the backend didn't return it).
+        """
+        count = len(queries)
+        session_ids = [session_ids] * count if isinstance(session_ids, str) else list(session_ids)
+        n_results = [n_results] * count if isinstance(n_results, int) else list(n_results)
+        chunk_types = [chunk_types] * count if isinstance(chunk_types, str) else list(chunk_types)
+        if not (len(session_ids) == len(n_results) == len(chunk_types) == count):
+            raise ValueError("retrieve_many needs one session ID, result count and chunk type per query.")
+        if not count:
+            return []
+        started = time.perf_counter()
+        hybrid = load.HYBRID_RETRIEVAL if hybrid is None else hybrid
+        rerank = load.MMR_RERANK if rerank is None else rerank
+        # Each ranking contributes a deeper candidate list than the final cut so fusion and MMR have something to reorder
+        depth = max(1, load.HYBRID_CANDIDATES) if hybrid or rerank else 1
+
+        if query_embeddings is not None:
+            vectors = dict(zip(queries, query_embeddings))
+        else:
+            unique = list(dict.fromkeys(queries))
+            vectors = dict(zip(unique, self.embedder(unique)))
+        groups: Dict[Tuple[str, str, int], List[int]] = {}
+        for position in range(count):
+            groups.setdefault((session_ids[position], chunk_types[position], n_results[position] * depth), []).append(position)
+
+        include = ["documents", "metadatas", "embeddings"]
+        rows: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        # Stored chunk embeddings, for the MMR redundancy matrix and for callers comparing later queries with the results
+        embedded: Dict[str, Any] = {}
+        rankings: List[List[str]] = [[] for _ in range(count)]
+        for (session_id, chunk_type, candidates), positions in groups.items():
+            self._hydrate_session(session_id)
+            query_vectors = [vectors[queries[position]] for position in positions]
+            if self.vectors.serves(session_id):
+                # Exact top-k over the session's own matrix; other tenants' rows are never touched
+                for position, hits in zip(positions, self.vectors.search(session_id, query_vectors, chunk_type, candidates)):
+                    rankings[position] = [chunk_id for chunk_id, _ in hits]
+                embedded.update(self.vectors.vectors(session_id, [chunk_id for position in positions for chunk_id in rankings[position]]))
+                metrics.increment("vector_searches", len(positions), tier="flat")
+                continue
+            metrics.increment("vector_searches", len(positions), tier="hnsw")
+            # Use logical $and operator to filter by both session boundary and chunk type precisely!
+            # This completely guarantees summaries aren't accidentally pulled into normal queries and vice versa.
+            results = self.collection.query(
+                query_embeddings=query_vectors,
+                n_results=candidates,
+                where={"$and": [{"session_id": session_id}, {"type": chunk_type}]},
+                include=include
+            )
+            # Row IDs are scoped to their session, so one lookup table serves every group
+            for offset, (ids, documents, metadatas, position) in enumerate(zip(results["ids"], results["documents"], results["metadatas"], positions)):
+                rows.update(zip(ids, zip(documents, metadatas)))
+                if results.get("embeddings") is not None:
+                    embedded.update(zip(ids, results["embeddings"][offset]))
+                rankings[position] = list(ids)
+
+        if hybrid:
+            for position in range(count):
+                session_id, chunk_type = session_ids[position], chunk_types[position]
+                lexical_ids = [chunk_id for chunk_id, _ in self.lexical.search(session_id, queries[position], chunk_type, k=n_results[position] * depth)]
+                # On a tie the lexical hit wins: an exact identifier match is stronger evidence than an equally ranked neighbour
+                rankings[position] = reciprocal_rank_fusion([rankings[position], lexical_ids], k=load.RRF_K, prefer=1)
+        # Rows only the flat index or BM25 found are fetched by ID together for the whole batch
+        missing = list(dict.fromkeys(chunk_id for position, ranking in enumerate(rankings)
+                                     for chunk_id in ranking[:n_results[position] * (depth if rerank else 1)] if chunk_id not in rows))
+        if missing:
+            fetch = include if any(chunk_id not in embedded for chunk_id in missing) else ["documents", "metadatas"]
+            extra = self.get_rows(fetch, ids=missing)
+            rows.update(zip(extra["ids"], zip(extra["documents"], extra["metadatas"])))
+            if "embeddings" in extra:
+                embedded.update((chunk_id, embedding) for chunk_id, embedding in zip(extra["ids"], extra["embeddings"]) if embedding is not None)
+
+        retrieved = []
+        for position, ranking in enumerate(rankings):
+            pool = [chunk_id for chunk_id in ranking[:n_results[position] * depth] if chunk_id in rows]
+            if rerank and len(pool) > 1 and all(chunk_id in embedded for chunk_id in pool):
+                # Relevance is the reciprocal-rank score of the candidate's place in the vector (or fused) ranking,
+                # scaled so the top candidate scores 1; BM25-only hits keep their standing this way
+                relevance = (load.RRF_K + 1) / (load.RRF_K + 1 + np.arange(len(pool)))
+                picked = maximal_marginal_relevance(
+                    [embedded[chunk_id] for chunk_id in pool], relevance, n_results[position],
+                    lambda_mult=load.MMR_LAMBDA, duplicate_threshold=load.MMR_DUPLICATE_THRESHOLD,
+                    stop_early=load.MMR_STOP_EARLY
+                )
+                pool = [pool[index] for index in picked]
+            retrieved.append([
+                {"id": chunk_id, "document": rows[chunk_id][0], "metadata": rows[chunk_id][1], "embedding": embedded.get(chunk_id)}
+                for chunk_id in pool[:n_results[position]]
+            ])
+        metrics.observe("stage_seconds", time.perf_counter() - started, stage="retrieve")
+        metrics.increment("retrieval_queries", count)
+        logger.info("Batch retrieval: {} queries over {} session groups (hybrid: {}, rerank: {}).", count, len(groups), hybrid, rerank)
+        return retrieved
     
     def dump_memory_to_json(self, session_id: str) -> None:
         """
@@ -208,10 +1157,7 @@ class RAG_Memory:
         
         logger.info(f"Executing deep memory dump for session {session_id}...")
         try:
-            results = self.collection.get(
-                where={"session_id": session_id},
-                include=["documents", "metadatas"]
-            )
+            results = self.get_rows(["documents", "metadatas"], where={"session_id": session_id})
             
             docs = results.get("documents", [])
             metas = results.get("metadatas", [])
@@ -255,22 +1201,28 @@ class Read_PDF_Content:
         Returns:
             str: A single concatenated string containing all text extracted from the provided PDFs.
         """
-        logger.info(f"Extracting text from {len(pdf_docs)} PDF documents.")
+        logger.info("Extracting text from {} PDF documents.", len(pdf_docs))
         # Reset internal content on a new run to prevent duplicate buildup if called multiple times
         self.content = ""
         
+        # Collect page texts in a list and join once, avoiding quadratic string growth
+        page_texts = []
         for pdf in pdf_docs:
             try:
                 reader = PdfReader(pdf)
                 for page in reader.pages:
-                    if page.extract_text():
-                        # Add a newline at the end so words don't get mashed up across pages
-                        self.content += page.extract_text() + "\n"
+                    # Extract each page exactly once
+                    text = page.extract_text()
+                    if text:
+                        page_texts.append(text)
             except Exception as e:
                 logger.error(f"Error extracting text from a PDF: {e}")
 
+        # Add a newline after every page so words don't get mashed up across pages
+        self.content = "".join(text + "\n" for text in page_texts)
+
         logger.success("Text extraction from PDFs completed.")
-        logger.trace(f"Extracted content: {self.content[:500]}...")  # Log the first 500 characters of the extracted content
+        logger.opt(lazy=True).trace("Extracted content: {}...", lambda: self.content[:500])  # Log the first 500 characters of the extracted content
         return self.content
     
     def chunking(self, text: str) -> List[Any]:
@@ -284,15 +1236,59 @@ class Read_PDF_Content:
             List[Any]: A list of chunk objects, each containing semantic text fragments and token counts.
         """
         logger.info("Chunking extracted text into smaller pieces.")
-        logger.trace(f"Original text length: {len(text)} characters.")
+        logger.trace("Original text length: {} characters.", len(text))
         chunker = RecursiveChunker() # Set a small enough chunk_size to see the split in our test
-        chunks = chunker.chunk(text)
-        for chunk in chunks:
-            logger.trace(f"Chunk text: {chunk.text}")
-            logger.trace(f"Token count: {chunk.token_count}")
-        logger.success(f"Chunking completed. Total chunks created: {len(chunks)}.")
+        with metrics.span("chunk"):
+            chunks = chunker.chunk(text)
+        metrics.increment("chunks_created", len(chunks))
+        # One lazy record instead of two eager f-strings per chunk; the join only runs when TRACE is enabled
+        logger.opt(lazy=True).trace("Chunks:\n{}", lambda: "\n".join(f"[{chunk.token_count} tokens] {chunk.text}" for chunk in chunks))
+        logger.success("Chunking completed. Total chunks created: {}.", len(chunks))
         return chunks
 
+    def chunk_stream(self, pages: Iterable[str], flush_chars: int = 16384) -> Iterator[Any]:
+        """
+        Incrementally chunks a stream of page texts without materializing the whole document.
+        Pages are buffered until roughly `flush_chars` characters are available, the buffer is chunked,
+        and every chunk except the trailing one is emitted. The trailing chunk may have been cut at a
+        page boundary, so its text is carried into the next buffer and re-chunked with the following page.
+        
+        Args:
+            pages (Iterable[str]): Page texts in document order (e.g. from iter_pdf_pages).
+            flush_chars (int, optional): Buffered characters that trigger a chunking pass.
+            
+        Yields:
+            Any: Chunk objects, each containing text fragments and token counts.
+        """
+        chunker = RecursiveChunker()
+        buffer = []
+        buffered_chars = 0
+        
+        for page_text in pages:
+            # Add a newline after every page so words don't get mashed up across pages
+            buffer.append(page_text + "\n")
+            buffered_chars += len(page_text) + 1
+            if buffered_chars < flush_chars:
+                continue
+            
+            with metrics.span("chunk"):
+                chunks = chunker.chunk("".join(buffer))
+            if not chunks:
+                buffer, buffered_chars = [], 0
+                continue
+            metrics.increment("chunks_created", len(chunks) - 1)
+            yield from chunks[:-1]
+            
+            # Carry the open tail chunk over so it can grow across the page boundary
+            carry = chunks[-1].text
+            buffer, buffered_chars = [carry], len(carry)
+        
+        if buffered_chars:
+            with metrics.span("chunk"):
+                chunks = chunker.chunk("".join(buffer))
+            metrics.increment("chunks_created", len(chunks))
+            yield from chunks
+
 class PDF_Pal_App:
     """
     Wrapper class to tie together the document extractor, RAG memory, and LLM chat.
@@ -302,8 +1298,84 @@ class PDF_Pal_App:
         self.brain = PDF_Pal_Brain()
         self.rag = RAG_Memory()
         self.extractor = Read_PDF_Content()
+        self.parallel_extractor = Parallel_PDF_Extractor(
+            max_workers=load.EXTRACTION_WORKERS or None,
+            pages_per_task=load.EXTRACTION_PAGES_PER_TASK,
+            backends=[name.strip() for name in load.EXTRACTION_BACKENDS.split(",") if name.strip()],
+            page_timeout=load.EXTRACTION_PAGE_TIMEOUT,
+            cache=Page_Cache(load.PAGE_CACHE_SIZE, load.PAGE_CACHE_DIR or None)
+        )
+        self.summarizer = Map_Reduce_Summarizer(
+            self.brain.client,
+            model=load.SUMMARY_MODEL,
+            concurrency=load.SUMMARY_CONCURRENCY,
+            pack_token_budget=load.SUMMARY_PACK_TOKENS,
+            max_retries=load.SUMMARY_MAX_RETRIES
+        )
+        # Bounded worker pool for background summaries, shared by every session
+        self.scheduler = Job_Scheduler(max_workers=load.SCHEDULER_WORKERS)
+        # History compaction runs there too, after the answer, instead of delaying the next request
+        self.brain.scheduler = self.scheduler
+        # Frees deleted, idle and cold sessions; cold sessions spill next to the persistent store when there is one
+        self.sessions = Session_Manager(
+            self.rag, self.brain, self.scheduler,
+            idle_ttl=load.SESSION_IDLE_TTL,
+            max_session_chunks=load.SESSION_MAX_CHUNKS,
+            max_session_bytes=load.SESSION_MAX_BYTES,
+            max_total_chunks=load.TOTAL_MAX_CHUNKS,
+            max_total_bytes=load.TOTAL_MAX_BYTES,
+            spill_dir=str(Path(self.rag.persist_dir) / "spill") if self.rag.persist_dir else None
+        )
+        # Picks summary / lookup / comparison / follow-up retrieval from the query embedding. The embedder is
+        # resolved per call so a replaced RAG memory brings its own embedding space along
+        self.router = Intent_Router(
+            lambda texts: self.rag.embedder(texts),
+            threshold=load.ROUTER_THRESHOLD,
+            log_path=load.ROUTER_LOG_PATH or None
+        )
+        # Finished answers shared by every session asking about the same document set
+        self.answer_cache = Semantic_Answer_Cache(
+            max_entries=load.ANSWER_CACHE_SIZE,
+            ttl=load.ANSWER_CACHE_TTL,
+            threshold=load.ANSWER_CACHE_THRESHOLD
+        )
+        metrics.configure(load.METRICS_ENABLED, load.METRICS_EXPORT_PATH or None, load.METRICS_EXPORT_INTERVAL)
+        # Components that keep their own statistics are read at export time instead of mirrored into counters
+        metrics.register_collector("answer_cache", self.answer_cache.metrics)
+        metrics.register_collector("history", self.brain.history.metrics)
+        metrics.register_collector("sessions", lambda: self.sessions.metrics()["total"])
+        metrics.register_collector("routes", lambda: dict(self.router.counts))
+        metrics.register_collector("flat_index", lambda: self.rag.vectors.stats())
+        metrics.register_collector("page_cache", lambda: {"hits": self.parallel_extractor.cache.hits, "misses": self.parallel_extractor.cache.misses})
+        metrics.register_collector("embedding_cache", lambda: self.rag.embedding_cache_stats())
+
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Loads what the first upload and question would otherwise wait for: the Chroma collection, the
+        embedding model and the router's prototype embeddings. Failures are logged, not raised, since
+        the first request will retry whatever didn't load.
+        
+        Args:
+            background (bool, optional): Run on a daemon thread so the caller (e.g. the UI) isn't blocked.
+            
+        Returns:
+            Optional[threading.Thread]: The warm-up thread when running in the background, otherwise None.
+        """
+        def run() -> None:
+            try:
+                self.rag.warm_up()
+                self.router.warm_up()
+            except Exception as e:
+                logger.warning(f"Warm-up failed ({e}); components will load on first use instead.")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="pdf-pal-warm-up", daemon=True)
+        thread.start()
+        return thread
 
-    def process_pdfs(self, pdf_docs: List[Any], session_id: str) -> bool:
+    def process_pdfs(self, pdf_docs: List[Any], session_id: str, streaming: bool = None, bulk: bool = False) -> bool:
         """
         Extracts text from PDFs, chunks it, and indexes it into the RAG memory store.
         Processes each document separately to precisely attach file name tags via metadata.
@@ -311,99 +1383,272 @@ class PDF_Pal_App:
         Args:
             pdf_docs (List[Any]): A list of uploaded PDF files to process.
             session_id (str): The unique identifier for the user session.
+            streaming (bool, optional): Stream pages through chunking and indexing in bounded batches
+                                        instead of extracting whole documents first. Defaults to the
+                                        STREAMING_INGEST setting.
+            bulk (bool, optional): Marks the upload as bulk backfill, so its background summaries
+                                   queue behind interactive sessions.
             
         Returns:
             bool: True if processing and indexing were successful, False otherwise.
         """
-        success = False
-        for pdf in pdf_docs:
-            extracted_text = self.extractor.extract_text_from_pdfs([pdf])
-            if extracted_text:
-                chunks = self.extractor.chunking(extracted_text)
+        if streaming is None:
+            streaming = load.STREAMING_INGEST
+        # Expiry and eviction leave the session alone while its documents are ingested
+        with self.sessions.in_flight(session_id):
+            self.sessions.touch(session_id)
+            # A new upload is new work, even on a session ID that was deleted before
+            self.scheduler.resume_session(session_id)
+            priority = Job_Scheduler.PRIORITY_BULK if bulk else Job_Scheduler.PRIORITY_INTERACTIVE
+            
+            success = False
+            pending = []
+            for pdf in pdf_docs:
+                # Documents already in the persistent store are attached by reference instead of re-embedded
+                doc_hash = self.rag.document_hash(pdf) if self.rag.store is not None else None
                 file_name = getattr(pdf, "name", "Unknown Document")
-                self.rag.index(chunks, session_id, file_name=file_name, chunk_type="content")
-                
-                # Fire the async Map-Reduce summarize loop autonomously so it doesn't block UI interactions
-                import threading
-                threading.Thread(
-                    target=self.generate_document_summary, 
-                    args=(chunks, session_id, file_name),
-                    daemon=True
-                ).start()
-                
-                success = True
+                outcome = self._attach_known_document(doc_hash, session_id, file_name, priority) if doc_hash else UNKNOWN
+                if outcome == ATTACHED:
+                    success = True
+                elif outcome == REJECTED:
+                    logger.warning(f"Skipping {file_name}: session {session_id} is over its memory quota.")
+                else:
+                    pending.append((pdf, doc_hash))
+
+            if streaming:
+                for pdf, doc_hash in pending:
+                    success = self.stream_pdf(pdf, session_id, doc_hash=doc_hash, priority=priority) or success
+            elif pending:
+                # Extract every file concurrently across the process pool, preserving upload order
+                extracted_texts = self.parallel_extractor.extract_text_from_pdfs([pdf for pdf, _ in pending])
+                for (pdf, doc_hash), extracted_text in zip(pending, extracted_texts):
+                    if extracted_text:
+                        chunks = self.extractor.chunking(extracted_text)
+                        file_name = getattr(pdf, "name", "Unknown Document")
+                        if not self.sessions.admit(session_id, len(chunks), self.rag.estimate_bytes([chunk.text for chunk in chunks], session_id)):
+                            logger.warning(f"Skipping {file_name}: session {session_id} is over its memory quota.")
+                            continue
+                        if doc_hash:
+                            self.rag.begin_document(doc_hash, file_name)
+                        self.rag.index(chunks, session_id, file_name=file_name, chunk_type="content", doc_hash=doc_hash)
+                        if doc_hash:
+                            self.rag.mark_document_complete(doc_hash)
+                        self._start_summary(chunks, session_id, file_name, doc_hash, priority)
+                        success = True
                 
-        # Trigger the transparent memory dump if debugging toggle is active
-        if success and load.MEMORY_DUMP:
-            self.rag.dump_memory_to_json(session_id)
+            # Trigger the transparent memory dump if debugging toggle is active
+            if success and load.MEMORY_DUMP:
+                self.rag.dump_memory_to_json(session_id)
             
-        return success
+            metrics.flush()
+            return success
 
-    def generate_document_summary(self, chunks: List[Any], session_id: str, file_name: str) -> None:
+    def _attach_known_document(self, doc_hash: str, session_id: str, file_name: str, priority: int = Job_Scheduler.PRIORITY_INTERACTIVE) -> str:
+        # Returns ATTACHED, UNKNOWN or REJECTED
+        manifest = self.rag.store.get_manifest(doc_hash)
+        if manifest is None or not manifest.get("complete"):
+            return UNKNOWN
+        rows = len(manifest.get("content", [])) + len(manifest.get("summary", []))
+        # Vector bytes only: the texts aren't loaded until the rows are copied
+        if rows and not self.sessions.admit(session_id, rows, rows * self.rag.vector_bytes(session_id)):
+            return REJECTED
+        manifest = self.rag.attach_document(doc_hash, session_id, file_name)
+        if manifest is None:
+            return UNKNOWN
+        # The original upload may have been interrupted before its summary landed; rebuild it from stored chunks
+        if not manifest.get("summary"):
+            chunks = [Text_Chunk(text) for text in self.rag.document_texts(doc_hash)]
+            self._start_summary(chunks, session_id, file_name, doc_hash, priority)
+        return ATTACHED
+
+    def stream_pdf(self, pdf: Any, session_id: str, doc_hash: str = None, priority: int = Job_Scheduler.PRIORITY_INTERACTIVE) -> bool:
         """
-        Background Map-Reduce thread that synthesizes a single global summary chunk 
-        from all individual document fragments to power overarching user questions.
+        Streams a single PDF page by page through incremental chunking into the RAG memory store.
+        Chunks are flushed to ChromaDB in batches of INDEX_BATCH_SIZE, so memory stays flat regardless of
+        document size and the first chunks are searchable while later pages are still being parsed.
+        
+        Args:
+            pdf (Any): The uploaded PDF file to process.
+            session_id (str): The unique identifier for the user session.
+            doc_hash (str, optional): Content hash of the PDF, recorded in the document store if one is configured.
+            priority (int, optional): Scheduler priority of the document's background summary.
+            
+        Returns:
+            bool: True if at least one chunk was indexed, False otherwise.
         """
-        logger.info(f"Starting background map-reduce summarization for {file_name}")
+        file_name = getattr(pdf, "name", "Unknown Document")
+        logger.info(f"Streaming ingestion of {file_name} for session {session_id}.")
+        if doc_hash:
+            self.rag.begin_document(doc_hash, file_name)
+        # New work on the session; a delete from here on cancels it
+        self.scheduler.resume_session(session_id)
         
+        # Section summaries are produced while the document streams in, so no chunk outlives its batch. Only admitted,
+        # indexed chunks are mapped; bulk uploads spill their windows to disk until the summary job runs at bulk priority
+        section_map = self.summarizer.stream(
+            cancelled=lambda: self.scheduler.is_cancelled(session_id),
+            defer=priority != Job_Scheduler.PRIORITY_INTERACTIVE
+        )
+        batch = []
+        indexed = 0
+        truncated = False
         try:
-            # Map Phase: To bypass heavy API rate limits, cap sampling payload natively
-            sample_chunks = chunks[:15] if len(chunks) > 15 else chunks
-            
-            # Load external Map Prompt
-            map_prompt_template = Path(Path(__file__).resolve().parent / "prompts" / "map_summary_prompt.md").read_text()
-            
-            mini_summaries = []
-            for chunk in sample_chunks:
-                prompt = map_prompt_template.format(text=chunk.text)
-                try:
-                    response = self.brain.client.chat.completions.create(
-                        model=load.SUMMARY_MODEL,
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0.3
-                    )
-                    mini_summaries.append(response.choices[0].message.content)
-                except Exception as e:
-                    logger.warning(f"Failed to cleanly summarize sub-chunk: {e}")
-                    
-            if not mini_summaries:
-                logger.warning(f"No valid mapped summaries generated for {file_name}, aborting thread reduction phase.")
-                return
-                
-            # Reduce Phase: Merge arrays uniformly into a highly compressed final block
-            combined_text = " ".join(mini_summaries)
-            
-            # Load external Reduce Prompt
-            reduce_prompt_template = Path(Path(__file__).resolve().parent / "prompts" / "reduce_summary_prompt.md").read_text()
-            reduce_prompt = reduce_prompt_template.format(combined_text=combined_text)
-            
-            final_res = self.brain.client.chat.completions.create(
-                model=load.SUMMARY_MODEL,
-                messages=[{"role": "user", "content": reduce_prompt}],
-                temperature=0.3
-            )
-            
-            global_summary_text = f"[GLOBAL DOCUMENT SUMMARY TARGET]\n{final_res.choices[0].message.content}"
-            
-            # Construct synthetic chunk vector mapping to bypass Semantic Chunker explicitly
-            class SummaryChunk:
-                def __init__(self, text):
-                    self.text = text
-                    self.token_count = len(text) // 4
-            
-            summary_chunk = SummaryChunk(global_summary_text)
+            for chunk in self.extractor.chunk_stream(iter_pdf_pages(pdf, **self.parallel_extractor.page_options())):
+                batch.append(chunk)
+                if len(batch) >= load.INDEX_BATCH_SIZE:
+                    if not self._index_admitted(batch, session_id, file_name, doc_hash, section_map):
+                        truncated = True
+                        break
+                    indexed += len(batch)
+                    batch = []
+            if batch and not truncated:
+                truncated = not self._index_admitted(batch, session_id, file_name, doc_hash, section_map)
+                if not truncated:
+                    indexed += len(batch)
+        except Exception as e:
+            section_map.cancel()
+            logger.error(f"Error streaming {file_name} into RAG memory: {e}")
+            return False
             
-            # Permanently stamp back into ChromaDB under isolated Type partition
-            self.rag.index([summary_chunk], session_id, file_name=file_name, chunk_type="summary")
-            logger.success(f"Background global summary completed and indexed for {file_name}. Summary cache ready.")
+        if self.scheduler.is_cancelled(session_id):
+            # Deleted mid-upload: drop the map windows and whatever was indexed after the delete
+            section_map.cancel()
+            self.rag.delete_session(session_id)
+            logger.info(f"Session {session_id} was deleted while {file_name} streamed in; discarding it.")
+            return False
+        if not indexed:
+            section_map.cancel()
+            return False
             
-            # Re-trigger memory dump so it updates the JSON with the newly injected summary chunk!
-            if load.MEMORY_DUMP:
-                self.rag.dump_memory_to_json(session_id)
+        if truncated:
+            # The document store must not advertise a partial document as attachable
+            logger.warning(f"Session {session_id} reached its memory quota; only the first {indexed} chunks of {file_name} were indexed.")
+        elif doc_hash:
+            self.rag.mark_document_complete(doc_hash)
+        logger.success(f"Streamed {indexed} chunks from {file_name} into RAG memory.")
+        self._start_summary(section_map, session_id, file_name, doc_hash, priority)
+        return True
+
+    def _index_admitted(self, batch: List[Any], session_id: str, file_name: str, doc_hash: str = None,
+                        section_map: Optional[Streaming_Map] = None) -> bool:
+        # The chat was deleted mid-upload, or the quota is full: stop before indexing or summarizing anything more
+        if self.scheduler.is_cancelled(session_id):
+            return False
+        if not self.sessions.admit(session_id, len(batch), self.rag.estimate_bytes([chunk.text for chunk in batch], session_id)):
+            return False
+        self.rag.index(batch, session_id, file_name=file_name, chunk_type="content", doc_hash=doc_hash)
+        if section_map is not None:
+            for chunk in batch:
+                section_map.add(chunk)
+        return True
+
+    def _start_summary(self, chunks: Union[List[Any], Streaming_Map], session_id: str, file_name: str, doc_hash: str = None,
+                       priority: int = Job_Scheduler.PRIORITY_INTERACTIVE) -> None:
+        # Queue the Map-Reduce summary on the bounded background scheduler so it doesn't block UI interactions
+        self.scheduler.submit(
+            self.generate_document_summary, chunks, session_id, file_name, doc_hash,
+            session_id=session_id,
+            name=f"summary:{file_name}",
+            priority=priority
+        )
+
+    def summary_status(self, session_id: str) -> Dict[str, str]:
+        """
+        Reports the state of each document's background summary for a session.
+        
+        Args:
+            session_id (str): The unique identifier for the user session.
             
+        Returns:
+            Dict[str, str]: A mapping of file name to its latest summary job status
+                            ('queued', 'running', 'done', 'failed' or 'cancelled').
+        """
+        statuses = {}
+        for job in self.scheduler.session_status(session_id):
+            if job["name"].startswith("summary:"):
+                statuses[job["name"][len("summary:"):]] = job["status"]
+        return statuses
+
+    def generate_document_summary(self, chunks: Union[List[Any], Streaming_Map], session_id: str, file_name: str, doc_hash: str = None) -> None:
+        """
+        Background Map-Reduce job that builds a hierarchical summary tree over the whole document.
+        Chunks are packed into token-budgeted windows and summarized into sections, which are then
+        summarized level by level into chapters and finally a single global document summary.
+        
+        Args:
+            chunks (Union[List[Any], Streaming_Map]): Every content chunk of the document in document order, or the
+                                                      streaming map phase that already summarized them during ingestion.
+            session_id (str): The unique identifier for the user session.
+            file_name (str): The name of the summarized file.
+            doc_hash (str, optional): Content hash of the PDF, recorded in the document store if one is configured.
+        """
+        logger.info(f"Starting background map-reduce summarization for {file_name}")
+        
+        try:
+            # Map Phase: packed, concurrency-bounded section summaries sharing the app-wide summary worker pool
+            if isinstance(chunks, Streaming_Map):
+                sections = chunks.result()
+            else:
+                sections = self.summarizer.map(chunks)
+            self.index_summary_tree(sections, session_id, file_name, doc_hash)
         except Exception as e:
             logger.error(f"Critical error in background summarizer thread payload: {e}")
 
+    def index_summary_tree(self, sections: List[str], session_id: str, file_name: str, doc_hash: str = None) -> None:
+        """
+        Reduces section summaries into a summary tree and indexes every node as a 'summary' chunk
+        tagged with its granularity ('section', 'chapter' or 'document') and tree level.
+        
+        Args:
+            sections (List[str]): The section (leaf) summaries, in document order.
+            session_id (str): The unique identifier for the user session.
+            file_name (str): The name of the summarized file.
+            doc_hash (str, optional): Content hash of the PDF, recorded in the document store if one is configured.
+        """
+        if not sections:
+            logger.warning(f"No valid mapped summaries generated for {file_name}, aborting thread reduction phase.")
+            return
+            
+        # Reduce Phase: summarize level by level until a single global root remains
+        self.index_summary_levels(self.summarizer.build_tree(sections), session_id, file_name, doc_hash)
+
+    def index_summary_levels(self, levels: List[List[str]], session_id: str, file_name: str, doc_hash: str = None) -> None:
+        """
+        Indexes the levels of an already reduced summary tree as 'summary' chunks.
+        
+        Args:
+            levels (List[List[str]]): The tree levels from the sections up to the root.
+            session_id (str): The unique identifier for the user session.
+            file_name (str): The name of the summarized file.
+            doc_hash (str, optional): Content hash of the PDF, recorded in the document store if one is configured.
+        """
+        # The chat was deleted while we were summarizing; don't resurrect its memory
+        if self.scheduler.is_cancelled(session_id):
+            logger.info(f"Session {session_id} was cancelled; discarding summary for {file_name}.")
+            return
+            
+        summary_chunks = []
+        for depth, level in enumerate(levels):
+            granularity = level_granularity(depth, len(levels))
+            # A lone non-root node says nothing the root doesn't
+            if granularity != "document" and len(level) == 1:
+                continue
+            for position, summary in enumerate(level):
+                if granularity == "document":
+                    text = f"[GLOBAL DOCUMENT SUMMARY TARGET]\n{summary}"
+                else:
+                    text = f"[{granularity.upper()} SUMMARY {position + 1}/{len(level)}]\n{summary}"
+                # Construct synthetic chunk vector mapping to bypass Semantic Chunker explicitly
+                summary_chunks.append(Text_Chunk(text, extra_metadata={"granularity": granularity, "level": depth}))
+        
+        # Permanently stamp back into ChromaDB under isolated Type partition
+        self.rag.index(summary_chunks, session_id, file_name=file_name, chunk_type="summary", doc_hash=doc_hash)
+        logger.success(f"Summary tree ({len(summary_chunks)} nodes over {len(levels)} levels) indexed for {file_name}. Summary cache ready.")
+        
+        # Re-trigger memory dump so it updates the JSON with the newly injected summary chunks!
+        if load.MEMORY_DUMP:
+            self.rag.dump_memory_to_json(session_id)
+
     def ask(self, query: str, session_id: str = "default", temperature: float = None, context_window: int = None, file_names: List[str] = None) -> str:
         """
         Retrieves relevant context from RAG, formats it, and orchestrates the chat with the LLM.
@@ -418,23 +1663,216 @@ class PDF_Pal_App:
         Returns:
             str: The final textual response generated by the LLM.
         """
-        # Intelligent Intent Routing
-        query_lower = query.lower()
-        is_summary = any(kw in query_lower for kw in ["summarize", "summary", "overview", "tldr", "main points"])
+        start = time.perf_counter()
+        # Expiry and eviction leave the session alone until the turn is answered
+        with self.sessions.in_flight(session_id):
+            cached, cache_key = self.lookup_answer(query, session_id, start)
+            if cached is not None:
+                self.record_request(start, cached=True)
+                return cached
+
+            context = self.build_context(query, session_id, file_names)
+            
+            # Send everything to the LLM utilizing session_id
+            output = self.brain.chat(
+                query=query, 
+                context=context, 
+                session_id=session_id,
+                temperature=temperature,
+                context_window=context_window
+            )
+            self.remember_answer(cache_key, session_id, output, start)
+            self.record_request(start)
+            return output
+
+    def ask_stream(self, query: str, session_id: str = "default", temperature: float = None, context_window: int = None, file_names: List[str] = None) -> Iterator[str]:
+        """
+        Streaming variant of `ask`: retrieves context, then yields the LLM response as it is generated.
+        Retrieval runs on the first iteration, so the generator can be handed straight to a renderer.
         
-        target_type = "summary" if is_summary else "content"
-        n_res = len(file_names) if (is_summary and file_names) else 3
-        if n_res == 0: n_res = 3
+        Args:
+            query (str): The specific question or prompt the user is asking.
+            session_id (str, optional): The unique identifier for the user session. Defaults to "default".
+            temperature (float, optional): Adjusts the creativity/randomness of the LLM responses.
+            context_window (int, optional): The max number of historical messages to inject as context.
+            file_names (List[str], optional): The list of filenames uploaded to this specific chat session.
+            
+        Yields:
+            str: Consecutive pieces of the response text.
+        """
+        start = time.perf_counter()
+        with self.sessions.in_flight(session_id):
+            cached, cache_key = self.lookup_answer(query, session_id, start)
+            if cached is not None:
+                self.record_request(start, cached=True)
+                yield cached
+                return
+
+            context = self.build_context(query, session_id, file_names)
+            parts = []
+            for text in self.brain.chat_stream(
+                query=query,
+                context=context,
+                session_id=session_id,
+                temperature=temperature,
+                context_window=context_window
+            ):
+                parts.append(text)
+                yield text
+            # Only reached when the stream ran to completion, so a cut-off answer is never cached
+            self.remember_answer(cache_key, session_id, "".join(parts), start)
+            self.record_request(start)
+
+    def record_request(self, start: float, cached: bool = False) -> None:
+        """
+        Records the end-to-end latency of an answered question and writes the metrics file when one is due.
+        
+        Args:
+            start (float): `time.perf_counter()` at the start of the request.
+            cached (bool, optional): Whether the answer came from the answer cache.
+        """
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="ask", cache="hit" if cached else "miss")
+        metrics.flush()
+
+    def export_metrics(self, path: str = None) -> str:
+        """
+        Renders the pipeline metrics (stage latencies, counters and component gauges) in the Prometheus
+        text format, e.g. for a /metrics endpoint.
         
-        # Route memory fetch through strictly partitioned metadata channel
-        retrieved_chunks = self.rag.retrieve(query, session_id=session_id, n_results=n_res, chunk_type=target_type)
+        Args:
+            path (str, optional): Also write them to this file (JSON for a .json path, Prometheus text otherwise).
+            
+        Returns:
+            str: The metrics in the Prometheus text exposition format.
+        """
+        if path:
+            metrics.write(path)
+        return metrics.export_prometheus()
+
+    def lookup_answer(self, query: str, session_id: str, start: float = None) -> Tuple[Optional[str], Optional[Tuple[str, Any]]]:
+        """
+        Serves a question from the semantic answer cache when the session's document set already has
+        an answer to a near-identical question. A hit is recorded in the session history like a normal turn.
+        
+        Args:
+            query (str): The user question.
+            session_id (str): The unique identifier for the user session.
+            start (float, optional): `time.perf_counter()` at the start of the request, for the latency-saved metric.
+            
+        Returns:
+            Tuple[Optional[str], Optional[Tuple[str, Any]]]: The cached answer (None on a miss) and the cache key
+                                                             to pass to `remember_answer` (None if the cache doesn't apply).
+        """
+        if not load.ANSWER_CACHE_SIZE:
+            return None, None
+        # Restores a spilled session first, so its history and fingerprint are current
+        self.sessions.touch(session_id)
+        # A follow-up can lean on earlier turns that the cached answer never saw
+        if load.ANSWER_CACHE_FIRST_TURN_ONLY and self.brain.history.get(session_id):
+            return None, None
+        fingerprint = self.rag.document_fingerprint(session_id)
+        if not fingerprint:
+            return None, None
+
+        cache_key = (fingerprint, self.rag.embedder([query])[0])
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+        answer = self.answer_cache.lookup(*cache_key, elapsed=elapsed)
+        if answer is None:
+            return None, cache_key
+        self.brain.record_turn(session_id, query, answer)
+        logger.success(f"Answer cache hit for session {session_id}; skipped retrieval and the LLM call.")
+        return answer, None
+
+    def remember_answer(self, cache_key: Optional[Tuple[str, Any]], session_id: str, answer: str, start: float = None) -> None:
+        """
+        Stores a freshly generated answer under the key returned by `lookup_answer`.
+        
+        Args:
+            cache_key (Optional[Tuple[str, Any]]): The key from `lookup_answer`; None skips caching.
+            session_id (str): The unique identifier for the user session.
+            answer (str): The final answer text.
+            start (float, optional): `time.perf_counter()` at the start of the request, recorded as the latency a hit saves.
+        """
+        if cache_key is None or not answer:
+            return
+        # Answers written while a document is still being indexed or summarized describe a partial document set
+        if any(status in (QUEUED, RUNNING) for status in self.summary_status(session_id).values()):
+            return
+        if self.rag.document_fingerprint(session_id) != cache_key[0]:
+            return
+        self.answer_cache.store(*cache_key, answer, cost=time.perf_counter() - start if start is not None else 0.0)
+
+    def build_context(self, query: str, session_id: str = "default", file_names: List[str] = None) -> Optional[str]:
+        """
+        Routes the query by intent, retrieves accordingly and formats the context for the LLM.
+        Summary questions read the summary tree, lookups read content chunks, comparisons read both with
+        room for every file, and follow-ups about the previous answer skip retrieval when that answer was
+        grounded in retrieved chunks (otherwise they are looked up). A question on the previous turn's
+        route whose embedding is close to the previous turn's chunks reuses them too.
         
-        # Protective failover bound: if the async map-reduce thread is still executing, fall back to pure cosine semantic search
-        if is_summary and not retrieved_chunks:
-            logger.warning("Targeted summary chunk missing (map-reduce thread incomplete). Failing over to standard unstructured semantic search.")
-            retrieved_chunks = self.rag.retrieve(query, session_id=session_id, n_results=3, chunk_type="content")
+        Args:
+            query (str): The user question.
+            session_id (str, optional): The unique identifier for the user session.
+            file_names (List[str], optional): The list of filenames uploaded to this specific chat session.
             
-        context_text = "\n\n".join(retrieved_chunks) if retrieved_chunks else "No relevant context found."
+        Returns:
+            Optional[str]: The context block injected into the system prompt, or None when the previous
+                           turn's context is reused (the system message then stays byte-identical).
+        """
+        self.sessions.touch(session_id)
+        # Embedded once; the router and retrieval share it
+        query_embedding = self.rag.embedder([query])[0]
+        allowed = [SUMMARY, LOOKUP]
+        if file_names and len(file_names) > 1:
+            allowed.append(COMPARISON)
+        if self.brain.history.get(session_id):
+            allowed.append(FOLLOWUP)
+        route, _ = self.router.route(query_embedding, query, session_id, allowed)
+        if route == FOLLOWUP and not self._context_retrieved(session_id):
+            # The system message has nothing to reuse (e.g. the last turn was an answer-cache hit), so look it up
+            route = LOOKUP
+
+        if route == FOLLOWUP or self._context_reusable(session_id, query_embedding, route):
+            metrics.increment("context_reused", route=route)
+            logger.info(f"Reusing the previous turn's context for session {session_id}; skipping retrieval.")
+            return None
+
+        files = len(file_names) if file_names else 0
+        pending_note = ""
+        if route == LOOKUP:
+            rows = self.rag.search_many([query], session_id, n_results=3, query_embeddings=[query_embedding])[0]
+        else:
+            # Summaries and content come back in one batch, so a missing summary costs no second round trip
+            n_summaries = max(files, 1) if route == COMPARISON else max(files, 3)
+            n_content = max(2 * files, 3) if route == COMPARISON else 3
+            summary_rows, content_rows = self.rag.search_many(
+                [query, query], session_id, n_results=[n_summaries, n_content], chunk_types=["summary", "content"],
+                query_embeddings=[query_embedding, query_embedding]
+            )
+            # Every file's tree root leads; section and chapter nodes picked by similarity only follow it on summary questions
+            roots = self.rag.document_summaries(session_id, file_names)
+            if roots:
+                root_ids = {row["id"] for row in roots}
+                sections = [row for row in summary_rows if row["id"] not in root_ids and row["metadata"].get("granularity") != "document"
+                            and (not file_names or row["metadata"].get("file_name") in file_names)]
+                summary_rows = roots + (sections[:SUMMARY_SECTION_ROWS] if route == SUMMARY else [])
+            rows = summary_rows + content_rows if route == COMPARISON else summary_rows
+
+            # Protective failover bound: if the background summary job is still executing, fall back to content chunks
+            if not summary_rows:
+                pending = [name for name, status in self.summary_status(session_id).items() if status in (QUEUED, RUNNING)]
+                if pending:
+                    logger.warning(f"Summary still being generated for {pending}. Failing over to standard unstructured semantic search.")
+                    # Tell the model so the answer says it's based on excerpts rather than silently pretending otherwise
+                    pending_note = f"[Note: the full-document summary for {', '.join(pending)} is still being generated; the context below is a set of excerpts.]\n\n"
+                else:
+                    logger.warning("Targeted summary chunk missing. Failing over to standard unstructured semantic search.")
+                rows = content_rows
+
+        # Excerpts standing in for a summary that is still being written must not be reused once it lands
+        self._record_context(session_id, rows, route if not pending_note else None)
+        retrieved_chunks = [self.rag.format_row(row) for row in rows]
+        context_text = pending_note + ("\n\n".join(retrieved_chunks) if retrieved_chunks else "No relevant context found.")
         
         # Inject metadata about uploaded files into the context window wrapper
         if file_names:
@@ -442,12 +1880,33 @@ class PDF_Pal_App:
             context = f"[Attached Files Document Metadata: {files_str}]\n\n{context_text}"
         else:
             context = context_text
-            
-        # Send everything to the LLM utilizing session_id
-        return self.brain.chat(
-            query=query, 
-            context=context, 
-            session_id=session_id,
-            temperature=temperature,
-            context_window=context_window
-        )
\ No newline at end of file
+        return context
+
+    def _context_retrieved(self, session_id: str) -> bool:
+        # The session's system message carries chunks retrieved for the current document set
+        state = self.brain.last_context.get(session_id)
+        return bool(state and state["ids"] and self.brain.history.get(session_id)
+                    and state["fingerprint"] == self.rag.document_fingerprint(session_id))
+
+    def _context_reusable(self, session_id: str, query_embedding: Any, route: str) -> bool:
+        # Same route, same document set, and the question sits close to one of the chunks already in the prompt
+        state = self.brain.last_context.get(session_id)
+        if not state or state["route"] != route or not len(state["vectors"]) or not self.brain.history.get(session_id):
+            return False
+        if state["fingerprint"] != self.rag.document_fingerprint(session_id):
+            return False
+        vector = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        similarity = float((state["vectors"] @ (vector / norm if norm else vector)).max())
+        return similarity >= load.CONTEXT_REUSE_THRESHOLD
+
+    def _record_context(self, session_id: str, rows: List[Dict[str, Any]], route: Optional[str]) -> None:
+        vectors = [row["embedding"] for row in rows if row.get("embedding") is not None]
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.brain.last_context[session_id] = {
+            "ids": [row["id"] for row in rows],
+            "vectors": matrix / np.where(norms == 0, 1, norms),
+            "route": route,
+            "fingerprint": self.rag.document_fingerprint(session_id),
+        }
@@ -0,0 +1,167 @@
+"""
+Semantic answer cache.
+
+Many users ask nearly the same question about the same shared documents. `Semantic_Answer_Cache`
+stores finished answers keyed by a fingerprint of the session's document set and the normalized
+embedding of the question, and serves a stored answer when a new question on the same document
+set is at least `threshold` cosine-similar to a cached one. Entries expire after a TTL and the
+least recently used ones are evicted beyond `max_entries`. Indexing new files into a session
+changes its fingerprint, so answers computed over the old document set are never served to it.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class Semantic_Answer_Cache:
+    """
+    This class maps (document set fingerprint, question embedding) to answers with a similarity
+    threshold, a TTL and LRU eviction, and counts hits, misses and the latency they saved.
+    """
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, threshold: float = 0.95) -> None:
+        """
+        Args:
+            max_entries (int, optional): Maximum cached answers before the least recently used are evicted.
+            ttl (float, optional): Seconds an answer stays servable (0 = no expiry).
+            threshold (float, optional): Minimum cosine similarity between questions for a hit.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        # Entry ID -> entry, least recently used first
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # Fingerprint -> entry IDs and their stacked question vectors (rebuilt lazily after changes)
+        self._buckets: Dict[str, Dict[str, Any]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0, "expired": 0, "invalidated": 0}
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def normalize(vector: Any) -> np.ndarray:
+        """
+        Returns the question embedding as a unit-length float32 vector.
+        """
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def lookup(self, fingerprint: str, vector: Any, elapsed: float = 0.0) -> Optional[str]:
+        """
+        Returns the cached answer to the most similar question on the same document set, if it is similar enough.
+
+        Args:
+            fingerprint (str): The document set fingerprint of the asking session.
+            vector (Any): The question embedding.
+            elapsed (float, optional): Seconds already spent on this request, subtracted from the latency saved on a hit.
+
+        Returns:
+            Optional[str]: The cached answer, or None on a miss.
+        """
+        vector = self.normalize(vector)
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(fingerprint)
+            if bucket is not None:
+                self._expire(bucket, now)
+            if not bucket or not bucket["ids"]:
+                self.counters["misses"] += 1
+                return None
+            if bucket["matrix"] is None:
+                bucket["matrix"] = np.stack([self._entries[entry_id]["vector"] for entry_id in bucket["ids"]])
+            scores = bucket["matrix"] @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.counters["misses"] += 1
+                return None
+            entry_id = bucket["ids"][best]
+            entry = self._entries[entry_id]
+            self._entries.move_to_end(entry_id)
+            self.counters["hits"] += 1
+            self.saved_seconds += max(entry["cost"] - elapsed, 0.0)
+            return entry["answer"]
+
+    def store(self, fingerprint: str, vector: Any, answer: str, cost: float = 0.0) -> None:
+        """
+        Caches an answer for a question on a document set.
+
+        Args:
+            fingerprint (str): The document set fingerprint of the answering session.
+            vector (Any): The question embedding.
+            answer (str): The final answer text.
+            cost (float, optional): Seconds the uncached request took, credited as latency saved on each hit.
+        """
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "fingerprint": fingerprint,
+                "vector": self.normalize(vector),
+                "answer": answer,
+                "created": time.time(),
+                "cost": cost,
+            }
+            bucket = self._buckets.setdefault(fingerprint, {"ids": [], "matrix": None})
+            bucket["ids"].append(entry_id)
+            bucket["matrix"] = None
+            self.counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.counters["evicted"] += 1
+
+    def invalidate(self, fingerprint: str = None) -> int:
+        """
+        Drops the cached answers of one document set, or of every document set.
+
+        Returns:
+            int: The number of answers dropped.
+        """
+        with self._lock:
+            doomed = [entry_id for entry_id, entry in self._entries.items() if fingerprint is None or entry["fingerprint"] == fingerprint]
+            for entry_id in doomed:
+                self._drop(entry_id)
+            self.counters["invalidated"] += len(doomed)
+            return len(doomed)
+
+    def _expire(self, bucket: Dict[str, Any], now: float) -> None:
+        if not self.ttl:
+            return
+        stale = [entry_id for entry_id in bucket["ids"] if now - self._entries[entry_id]["created"] > self.ttl]
+        for entry_id in stale:
+            self._drop(entry_id)
+        self.counters["expired"] += len(stale)
+
+    def _drop(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets[entry["fingerprint"]]
+        bucket["ids"].remove(entry_id)
+        bucket["matrix"] = None
+        if not bucket["ids"]:
+            del self._buckets[entry["fingerprint"]]
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Reports the cache counters, hit rate, size and the total latency saved by hits.
+
+        Returns:
+            Dict[str, Any]: 'hits', 'misses', 'stores', 'evicted', 'expired', 'invalidated', 'hit_rate',
+                            'entries', 'document_sets' and 'saved_seconds'.
+        """
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "document_sets": len(self._buckets),
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
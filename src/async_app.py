@@ -0,0 +1,258 @@
+"""
+Async-native PDF-Pal API.
+
+`AsyncPDF_Pal_App` exposes the PDF_Pal_App pipeline as coroutines, so a server can keep hundreds
+of sessions in flight on a single event loop instead of one OS thread per request. LLM calls go
+through the async Groq client; Chroma queries, embedding and PDF extraction run on a bounded
+thread pool; and each turn holds the brain's per-session lock from prompt assembly to commit, so
+concurrent asks in one chat, from either API, can't interleave its history.
+"""
+
+import time
+import asyncio
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+from src.PDF_Pal import PDF_Pal_App, httpx
+from src.config import load
+from src.lazy import lazy_import
+from src.logger import logger
+from src.metrics import metrics
+from src.streaming import Marker_Stripper
+from src.summarizer import Map_Reduce_Summarizer
+
+AsyncGroq = lazy_import("groq", "AsyncGroq")
+DefaultAsyncHttpxClient = lazy_import("groq", "DefaultAsyncHttpxClient")
+
+
+class AsyncPDF_Pal_App:
+    """
+    This class is the asyncio counterpart of PDF_Pal_App. It shares the wrapped app's RAG memory,
+    conversation history, session locks and background scheduler, so both APIs can serve the same sessions.
+    """
+    def __init__(self, app: PDF_Pal_App = None, client: Any = None, executor_workers: int = None) -> None:
+        """
+        Args:
+            app (PDF_Pal_App, optional): The synchronous app whose state is shared. A new one is created by default.
+            client (Any, optional): An AsyncGroq-compatible client. Defaults to AsyncGroq with a connection
+                                    pool sized by LLM_CONNECTIONS.
+            executor_workers (int, optional): Threads for blocking retrieval, embedding and extraction work.
+                                              Defaults to the ASYNC_EXECUTOR_WORKERS setting.
+        """
+        logger.info("Initializing AsyncPDF_Pal_App class.")
+        self.app = app or PDF_Pal_App()
+        self.brain = self.app.brain
+        from src.config import config
+        self.client = client or AsyncGroq(
+            api_key=config.GROQ_API_KEY,
+            http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=load.LLM_CONNECTIONS,
+                max_keepalive_connections=load.LLM_CONNECTIONS
+            ))
+        )
+        self.summarizer = Map_Reduce_Summarizer(
+            self.brain.client,
+            model=load.SUMMARY_MODEL,
+            concurrency=load.SUMMARY_CONCURRENCY,
+            pack_token_budget=load.SUMMARY_PACK_TOKENS,
+            max_retries=load.SUMMARY_MAX_RETRIES,
+            async_client=self.client
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=executor_workers or load.ASYNC_EXECUTOR_WORKERS,
+            thread_name_prefix="pdf-pal-async"
+        )
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Deleted, expired and spilled sessions drop their lock here too
+        self.app.sessions.on_forget(self.forget_session)
+        logger.success("AsyncPDF_Pal_App class initialized successfully.")
+
+    def session_lock(self, session_id: str) -> asyncio.Lock:
+        """
+        Returns the event-loop lock queueing a session's async turns, creating it on first use. Waiting
+        turns queue here rather than each tying up an executor thread on the brain's lock.
+        """
+        if session_id not in self._locks:
+            self._locks[session_id] = asyncio.Lock()
+        return self._locks[session_id]
+
+    @contextlib.asynccontextmanager
+    async def _turn(self, session_id: str) -> AsyncIterator[None]:
+        # Counted in flight while it waits for the session too, so expiry and eviction leave the session alone until it ends
+        with self.app.sessions.in_flight(session_id):
+            async with self.session_lock(session_id):
+                yield
+
+    @contextlib.asynccontextmanager
+    async def _brain_lock(self, session_id: str) -> AsyncIterator[None]:
+        # The brain's threading lock is what PDF_Pal_App turns hold, so taking it here keeps a sync and an async
+        # turn on the same session apart. It is acquired on a worker thread so waiting never blocks the event loop
+        lock = self.brain.session_lock(session_id)
+        acquiring = asyncio.ensure_future(self._run(lock.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The worker still gets the lock; hand it straight back
+            acquiring.add_done_callback(lambda future: lock.release() if not future.cancelled() and not future.exception() else None)
+            raise
+        try:
+            yield
+        finally:
+            lock.release()
+
+    async def _run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        # Blocking work (Chroma, embedding, extraction, prompt assembly) stays off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    @staticmethod
+    def _request(messages: List[Dict[str, str]], temperature: float = None, stream: bool = False) -> Dict[str, Any]:
+        kwargs = {"model": load.LLM_MODEL, "messages": messages}
+        if temperature:
+            kwargs["temperature"] = temperature
+        if stream:
+            kwargs["stream"] = True
+        return kwargs
+
+    async def ask(self, query: str, session_id: str = "default", temperature: float = None, context_window: int = None, file_names: List[str] = None) -> str:
+        """
+        Retrieves relevant context and answers the query without blocking the event loop.
+
+        Args:
+            query (str): The specific question or prompt the user is asking.
+            session_id (str, optional): The unique identifier for the user session. Defaults to "default".
+            temperature (float, optional): Adjusts the creativity/randomness of the LLM responses.
+            context_window (int, optional): The max number of historical messages to inject as context.
+            file_names (List[str], optional): The list of filenames uploaded to this specific chat session.
+
+        Returns:
+            str: The final textual response generated by the LLM.
+        """
+        start = time.perf_counter()
+        async with self._turn(session_id):
+            cached, cache_key = await self._run(self.app.lookup_answer, query, session_id, start)
+            if cached is not None:
+                self.app.record_request(start, cached=True)
+                return cached
+            context = await self._run(self.app.build_context, query, session_id, file_names)
+            async with self._brain_lock(session_id):
+                messages, usage = await self._run(self.brain.prepare_messages, query, context, context_window, session_id)
+                with metrics.span("llm", mode="blocking"):
+                    response = await self.client.chat.completions.create(**self._request(messages, temperature))
+                output = str(response.choices[0].message.content)
+                # Clean output in case the model leaks chat tags
+                output = output.replace("<|im_start|>", "").replace("<|im_end|>", "")
+                self.brain.commit_answer(session_id, output, usage, getattr(response, "usage", None))
+            # The app's scheduler runs it, so this only queues the job
+            self.brain.schedule_compaction(session_id)
+            self.app.remember_answer(cache_key, session_id, output, start)
+            self.app.record_request(start)
+            return output
+
+    async def ask_stream(self, query: str, session_id: str = "default", temperature: float = None, context_window: int = None, file_names: List[str] = None) -> AsyncIterator[str]:
+        """
+        Async generator variant of `ask` yielding the response as it is generated. The session stays
+        locked until the stream is exhausted or closed.
+
+        Args:
+            query (str): The specific question or prompt the user is asking.
+            session_id (str, optional): The unique identifier for the user session. Defaults to "default".
+            temperature (float, optional): Adjusts the creativity/randomness of the LLM responses.
+            context_window (int, optional): The max number of historical messages to inject as context.
+            file_names (List[str], optional): The list of filenames uploaded to this specific chat session.
+
+        Yields:
+            str: Consecutive pieces of the response text.
+        """
+        start = time.perf_counter()
+        async with self._turn(session_id):
+            cached, cache_key = await self._run(self.app.lookup_answer, query, session_id, start)
+            if cached is not None:
+                self.app.record_request(start, cached=True)
+                yield cached
+                return
+            context = await self._run(self.app.build_context, query, session_id, file_names)
+            stripper, parts = Marker_Stripper(), []
+            try:
+                async with self._brain_lock(session_id):
+                    messages, usage = await self._run(self.brain.prepare_messages, query, context, context_window, session_id)
+                    requested = time.perf_counter()
+                    stream = await self.client.chat.completions.create(**self._request(messages, temperature, stream=True))
+                    provider_usage = None
+                    try:
+                        async for chunk in stream:
+                            provider_usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None) or provider_usage
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                text = stripper.feed(chunk.choices[0].delta.content)
+                                if text:
+                                    if not parts:
+                                        metrics.observe("stage_seconds", time.perf_counter() - requested, stage="llm_first_token")
+                                    parts.append(text)
+                                    yield text
+                        tail = stripper.flush()
+                        if tail:
+                            parts.append(tail)
+                            yield tail
+                    finally:
+                        metrics.observe("stage_seconds", time.perf_counter() - requested, stage="llm", mode="stream")
+                        close = getattr(stream, "close", None)
+                        if callable(close):
+                            await close()
+                        if parts:
+                            self.brain.commit_answer(session_id, "".join(parts), usage, provider_usage)
+                self.app.remember_answer(cache_key, session_id, "".join(parts), start)
+                self.app.record_request(start)
+            finally:
+                self.brain.schedule_compaction(session_id)
+
+    async def process_pdfs(self, pdf_docs: List[Any], session_id: str, streaming: bool = None, bulk: bool = False) -> bool:
+        """
+        Extracts, chunks and indexes uploaded PDFs on the executor. Summaries are queued on the shared
+        background scheduler exactly as with PDF_Pal_App.process_pdfs.
+
+        Args:
+            pdf_docs (List[Any]): A list of uploaded PDF file objects.
+            session_id (str): The unique identifier for the user session.
+            streaming (bool, optional): Overrides the STREAMING_INGEST setting.
+            bulk (bool, optional): Queues the summaries at bulk priority.
+
+        Returns:
+            bool: True if the PDFs were processed successfully, False otherwise.
+        """
+        return await self._run(self.app.process_pdfs, pdf_docs, session_id, streaming=streaming, bulk=bulk)
+
+    async def summarize(self, chunks: List[Any], session_id: str, file_name: str, doc_hash: str = None) -> None:
+        """
+        Builds and indexes a document's summary tree with async LLM calls, for callers that want the
+        summary inline rather than queued on the background scheduler.
+
+        Args:
+            chunks (List[Any]): Every content chunk of the document in document order.
+            session_id (str): The unique identifier for the user session.
+            file_name (str): The name of the summarized file.
+            doc_hash (str, optional): Content hash of the PDF, recorded in the document store if one is configured.
+        """
+        logger.info(f"Starting async map-reduce summarization for {file_name}")
+        sections = await self.summarizer.amap(chunks)
+        if not sections:
+            logger.warning(f"No valid mapped summaries generated for {file_name}, aborting reduction phase.")
+            return
+        levels = await self.summarizer.abuild_tree(sections)
+        await self._run(self.app.index_summary_levels, levels, session_id, file_name, doc_hash)
+
+    def forget_session(self, session_id: str) -> None:
+        """
+        Drops a session's lock once it has no turn in flight.
+        """
+        lock = self._locks.get(session_id)
+        if lock is not None and not lock.locked():
+            del self._locks[session_id]
+
+    async def aclose(self) -> None:
+        """
+        Closes the async HTTP client and releases the executor threads.
+        """
+        await self.client.close()
+        self._executor.shutdown(wait=False)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict, PydanticBaseSettingsSource, TomlConfigSettingsSource
 from pathlib import Path
+import threading
 
 # Get the absolute path to the project root
 ROOT_DIR = Path(__file__).resolve().parent.parent
@@ -36,17 +37,107 @@ class Config_env(BaseSettings):
             TomlConfigSettingsSource(settings_cls),
         )
 
-# Instantiate the config so it can be imported elsewhere
-config = Config_env()
-
 
 class LoadModelConfig(BaseSettings):
     LLM_MODEL: str = Field(default="llama-3.1-8b-instant")
     SUMMARY_MODEL: str = Field(default="meta-llama/llama-prompt-guard-2-86m")
     MEMORY_DUMP: bool = Field(default=False)
+    # Worker processes for PDF extraction (0 = use every CPU core)
+    EXTRACTION_WORKERS: int = Field(default=0)
+    EXTRACTION_PAGES_PER_TASK: int = Field(default=25)
+    # Extraction backends, most preferred first; pages one fails on, times out on or garbles go to the next
+    # ("pypdf", "pypdf-layout", or "pdfium" with pypdfium2 installed, e.g. "pypdf,pdfium"), and the per-page timeout in
+    # seconds (0 = none). The default names only installed backends
+    EXTRACTION_BACKENDS: str = Field(default="pypdf")
+    EXTRACTION_PAGE_TIMEOUT: float = Field(default=30)
+    # Extracted page text cache keyed by file hash + page index: in-memory capacity (0 = off) and optional on-disk directory
+    PAGE_CACHE_SIZE: int = Field(default=2048)
+    PAGE_CACHE_DIR: str = Field(default="")
+    # Stream pages -> chunks -> index in bounded batches instead of whole-document ingestion
+    STREAMING_INGEST: bool = Field(default=False)
+    INDEX_BATCH_SIZE: int = Field(default=64)
+    # Local directory for the persistent vector store and content-addressed document cache (empty = in-memory)
+    PERSIST_DIR: str = Field(default="")
+    # Embedding cache: in-memory LRU capacity and optional on-disk tier directory (empty = memory only)
+    EMBEDDING_CACHE_SIZE: int = Field(default=4096)
+    EMBEDDING_CACHE_DIR: str = Field(default="")
+    # Summary map phase: max in-flight requests, chunk tokens packed per request (0 = no packing), retries
+    SUMMARY_CONCURRENCY: int = Field(default=4)
+    SUMMARY_PACK_TOKENS: int = Field(default=6000)
+    SUMMARY_MAX_RETRIES: int = Field(default=5)
+    # Background job scheduler worker threads (documents summarized at once)
+    SCHEDULER_WORKERS: int = Field(default=2)
+    # Chat prompt budget: max prompt tokens, share for retrieved context, share of history for the rolling summary
+    PROMPT_TOKEN_BUDGET: int = Field(default=6000)
+    CONTEXT_TOKEN_SHARE: float = Field(default=0.6)
+    HISTORY_SUMMARY_SHARE: float = Field(default=0.2)
+    # Conversation history: token cap on each session's retained turns (0 = unlimited), and SQLite file evicted turns spill to (empty = drop them)
+    HISTORY_MAX_TOKENS: int = Field(default=32000)
+    HISTORY_SPILL_PATH: str = Field(default="")
+    # Hugging Face tokenizer ID or tokenizer.json path matching LLM_MODEL. Empty estimates tokens as characters / 4, so
+    # PROMPT_TOKEN_BUDGET is approximate until it is set (the Llama tokenizers are gated, so none ships by default)
+    TOKENIZER_NAME: str = Field(default="")
+    # Pooled HTTP connections to the LLM API, shared by every session (per client: sync and async)
+    LLM_CONNECTIONS: int = Field(default=256)
+    # AsyncPDF_Pal_App threads for blocking retrieval/extraction work
+    ASYNC_EXECUTOR_WORKERS: int = Field(default=8)
+    # Session lifecycle: idle seconds before a session is spilled (deleted without PERSIST_DIR), and chunk/byte caps per session
+    # and in total (0 = unlimited). Bytes count chunk text plus its vector as stored (flat index or collection)
+    SESSION_IDLE_TTL: int = Field(default=3600)
+    SESSION_MAX_CHUNKS: int = Field(default=0)
+    SESSION_MAX_BYTES: int = Field(default=0)
+    TOTAL_MAX_CHUNKS: int = Field(default=0)
+    TOTAL_MAX_BYTES: int = Field(default=0)
+    # Hybrid retrieval: fuse BM25 with vector ranks (RRF constant, candidates fetched per ranking = n_results x multiplier, also the MMR pool)
+    HYBRID_RETRIEVAL: bool = Field(default=True)
+    HYBRID_CANDIDATES: int = Field(default=4)
+    RRF_K: int = Field(default=60)
+    # MMR reranking of retrieved candidates: relevance vs. redundancy weight, the similarity at which chunks count as
+    # duplicates, and whether to return fewer than k results once the remaining candidates mostly repeat the picked ones
+    MMR_RERANK: bool = Field(default=True)
+    MMR_LAMBDA: float = Field(default=0.5)
+    MMR_DUPLICATE_THRESHOLD: float = Field(default=0.95)
+    MMR_STOP_EARLY: bool = Field(default=False)
+    # Intent router: min prototype similarity for a non-default route, and optional JSONL decision log for accuracy checks
+    ROUTER_THRESHOLD: float = Field(default=0.4)
+    ROUTER_LOG_PATH: str = Field(default="")
+    # Reuse the previous turn's chunks when a same-route question is at least this cosine-similar to one of them
+    CONTEXT_REUSE_THRESHOLD: float = Field(default=0.65)
+    # Semantic answer cache: max answers (0 = off), TTL seconds, min question similarity, and whether only a session's first turn may use it
+    ANSWER_CACHE_SIZE: int = Field(default=1024)
+    ANSWER_CACHE_TTL: int = Field(default=3600)
+    ANSWER_CACHE_THRESHOLD: float = Field(default=0.95)
+    ANSWER_CACHE_FIRST_TURN_ONLY: bool = Field(default=True)
+    # Sessions with up to this many chunks are searched exactly in their own NumPy matrix instead of the shared,
+    # session-filtered HNSW graph (0 = always HNSW). Their rows are stored without vectors; after a restart the matrix is
+    # rebuilt from the document store's embeddings
+    FLAT_INDEX_MAX_CHUNKS: int = Field(default=4096)
+    # Flat index storage: float32, float16 (half the memory) or int8 (a quarter); with a compact type the best
+    # RESCORE x k candidates are rescored from a finer copy (0 = off, keeping those savings). Without FLAT_INDEX_DIR the
+    # copy is float16 in RAM and only int8 gets one: 3 bytes/dim in all, 1.33x below float32, rescored at float16
+    # precision (float16 ignores RESCORE). FLAT_INDEX_DIR memory-maps the matrices and float32 originals to rescore from
+    FLAT_INDEX_DTYPE: str = Field(default="float32")
+    FLAT_INDEX_RESCORE: int = Field(default=4)
+    FLAT_INDEX_DIR: str = Field(default="")
+    # Pipeline metrics: record stage latencies and counters, and optionally write them to a file
+    # (Prometheus text, or JSON for a .json path) at most every interval seconds
+    METRICS_ENABLED: bool = Field(default=True)
+    METRICS_EXPORT_PATH: str = Field(default="")
+    METRICS_EXPORT_INTERVAL: int = Field(default=60)
 
     model_config = SettingsConfigDict(
         env_file=str(Path(__file__).resolve().parent.parent / "config.md")
     )
 
-load = LoadModelConfig()
\ No newline at end of file
+_SETTINGS = {"config": Config_env, "load": LoadModelConfig}
+_SETTINGS_LOCK = threading.Lock()
+
+def __getattr__(name: str):
+    # `config` (the secrets TOML) and `load` (config.md) are built on first access rather than at import,
+    # then cached as module globals so later lookups, and test patches, see the same instance
+    if name not in _SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _SETTINGS_LOCK:
+        if name not in globals():
+            globals()[name] = _SETTINGS[name]()
+    return globals()[name]
\ No newline at end of file
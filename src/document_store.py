@@ -0,0 +1,197 @@
+"""
+Content-addressed document store.
+
+Every chunk is stored once under the hash of its text, together with its embedding, and every
+PDF gets a manifest (keyed by the hash of its raw bytes) listing the chunk hashes it produced.
+A re-uploaded document can then be attached to a new session by reference, copying the stored
+embeddings instead of re-extracting, re-chunking and re-embedding it.
+"""
+
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from src.logger import logger
+
+
+def content_hash(*parts: Any) -> str:
+    """
+    Returns a stable SHA-256 hex digest over one or more str/bytes parts.
+
+    Args:
+        *parts (Any): The values to hash. Strings are UTF-8 encoded; parts are NUL-separated.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    for index, part in enumerate(parts):
+        if index:
+            digest.update(b"\0")
+        digest.update(part if isinstance(part, (bytes, bytearray)) else str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Document_Store:
+    """
+    This class keeps deduplicated chunk embeddings and per-document manifests.
+    Chunks live in their own ChromaDB collection; manifests are written as JSON files
+    next to it when a persist directory is configured, and kept in memory otherwise.
+    """
+    def __init__(self, client: Any, persist_dir: Optional[str] = None, embedding_function: Any = None) -> None:
+        """
+        Args:
+            client (Any): The ChromaDB client that owns the chunk collection.
+            persist_dir (str, optional): Directory to store manifests in. In-memory only when omitted.
+            embedding_function (Any, optional): Embedding function shared with the session collection.
+        """
+        kwargs = {"embedding_function": embedding_function} if embedding_function is not None else {}
+        self.collection = client.get_or_create_collection(
+            name="pdf_pal_documents",
+            metadata={"hnsw:space": "cosine"},
+            **kwargs
+        )
+        self.manifest_dir = Path(persist_dir) / "manifests" if persist_dir else None
+        if self.manifest_dir:
+            self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        self._manifests: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_manifest(self, doc_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Looks up the manifest of a previously ingested document.
+
+        Args:
+            doc_hash (str): The content hash of the PDF bytes.
+
+        Returns:
+            Optional[Dict[str, Any]]: The manifest, or None if the document has never been seen.
+        """
+        with self._lock:
+            manifest = self._manifests.get(doc_hash)
+            if manifest is None and self.manifest_dir:
+                path = self.manifest_dir / f"{doc_hash}.json"
+                if path.exists():
+                    manifest = json.loads(path.read_text(encoding="utf-8"))
+                    self._manifests[doc_hash] = manifest
+            return manifest
+
+    def _save(self, doc_hash: str, manifest: Dict[str, Any]) -> None:
+        self._manifests[doc_hash] = manifest
+        if self.manifest_dir:
+            # Write-then-rename so a crash never leaves a half-written manifest behind
+            path = self.manifest_dir / f"{doc_hash}.json"
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+            tmp_path.replace(path)
+
+    def put_chunks(self, documents: List[str], hashes: List[str], token_counts: List[int],
+                   extras: List[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Stores chunks under their content hash, embedding only the ones not already present.
+
+        Args:
+            documents (List[str]): The chunk texts.
+            hashes (List[str]): The content hash of each chunk text.
+            token_counts (List[int]): The token count of each chunk.
+            extras (List[Dict[str, Any]], optional): Extra metadata per chunk (e.g. summary granularity).
+
+        Returns:
+            List[Any]: The stored embedding of each chunk, aligned with `documents`.
+        """
+        known = self.get_embeddings(hashes)
+        extras = extras or [{}] * len(documents)
+        missing = {}
+        for text, chunk_hash, token_count, extra in zip(documents, hashes, token_counts, extras):
+            if chunk_hash not in known and chunk_hash not in missing:
+                missing[chunk_hash] = (text, {"token_count": token_count, **extra})
+
+        if missing:
+            self.collection.add(
+                ids=list(missing),
+                documents=[text for text, _ in missing.values()],
+                metadatas=[metadata for _, metadata in missing.values()]
+            )
+            known.update(self.get_embeddings(list(missing)))
+        logger.info(f"Document store: {len(documents) - len(missing)} chunks reused, {len(missing)} newly embedded.")
+        return [known[chunk_hash] for chunk_hash in hashes]
+
+    def get_embeddings(self, hashes: List[str]) -> Dict[str, Any]:
+        """
+        Fetches stored embeddings by chunk hash.
+
+        Args:
+            hashes (List[str]): The chunk hashes to look up.
+
+        Returns:
+            Dict[str, Any]: A mapping of chunk hash to embedding for every hash that is stored.
+        """
+        if not hashes:
+            return {}
+        results = self.collection.get(ids=list(dict.fromkeys(hashes)), include=["embeddings"])
+        return dict(zip(results["ids"], results["embeddings"]))
+
+    def get_chunks(self, hashes: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetches stored chunk texts, embeddings and token counts in the order of `hashes`.
+
+        Args:
+            hashes (List[str]): The chunk hashes to look up.
+
+        Returns:
+            List[Dict[str, Any]]: One record per stored hash with 'hash', 'text', 'embedding', 'token_count'
+                                  and 'extra_metadata'.
+        """
+        if not hashes:
+            return []
+        results = self.collection.get(ids=list(dict.fromkeys(hashes)), include=["documents", "embeddings", "metadatas"])
+        by_id = {}
+        for chunk_id, doc, emb, meta in zip(results["ids"], results["documents"], results["embeddings"], results["metadatas"]):
+            extra = dict(meta or {})
+            token_count = extra.pop("token_count", len(doc) // 4)
+            by_id[chunk_id] = {"hash": chunk_id, "text": doc, "embedding": emb, "token_count": token_count, "extra_metadata": extra}
+        return [by_id[chunk_hash] for chunk_hash in hashes if chunk_hash in by_id]
+
+    def begin_document(self, doc_hash: str, file_name: str) -> None:
+        """
+        Starts a fresh manifest for a document about to be ingested, discarding any partial one
+        left behind by an interrupted ingestion.
+
+        Args:
+            doc_hash (str): The content hash of the PDF bytes.
+            file_name (str): The file name the document is being uploaded as.
+        """
+        with self._lock:
+            self._save(doc_hash, {"file_name": file_name, "complete": False})
+
+    def record_chunks(self, doc_hash: str, chunk_type: str, hashes: List[str], file_name: str) -> None:
+        """
+        Appends chunk hashes to a document's manifest under the given chunk type.
+
+        Args:
+            doc_hash (str): The content hash of the PDF bytes.
+            chunk_type (str): The classification of the chunks (e.g., 'content' or 'summary').
+            hashes (List[str]): The chunk hashes to record, in document order.
+            file_name (str): The file name the document was first uploaded as.
+        """
+        self.get_manifest(doc_hash)
+        with self._lock:
+            manifest = self._manifests.get(doc_hash) or {"file_name": file_name, "complete": False}
+            manifest.setdefault(chunk_type, []).extend(hashes)
+            self._save(doc_hash, manifest)
+
+    def mark_complete(self, doc_hash: str) -> None:
+        """
+        Flags a document's content chunks as fully ingested, making it eligible for attachment.
+
+        Args:
+            doc_hash (str): The content hash of the PDF bytes.
+        """
+        self.get_manifest(doc_hash)
+        with self._lock:
+            manifest = self._manifests.get(doc_hash)
+            if manifest is not None:
+                manifest["complete"] = True
+                self._save(doc_hash, manifest)
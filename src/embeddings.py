@@ -0,0 +1,175 @@
+"""
+Embedding cache layer.
+
+Wraps the embedding model used by RAG_Memory with a bounded in-memory LRU and an optional
+on-disk SQLite tier, both keyed by a hash of the model name and the text. Repeated questions
+and boilerplate chunks (headers, disclaimers) are then served without running the model.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction, register_embedding_function
+
+from src.document_store import content_hash
+from src.logger import logger
+from src.metrics import metrics
+
+
+@register_embedding_function
+class Cached_Embedding_Function(EmbeddingFunction[Documents]):
+    """
+    This class is a drop-in ChromaDB embedding function that memoizes another embedding function.
+    Lookups go LRU -> disk -> model; only the texts missing from both tiers are sent to the model,
+    in a single batch. Hit and miss counters are exposed through `stats()`.
+    """
+    def __init__(self, inner: Optional[EmbeddingFunction] = None, model_name: str = None, max_entries: int = 4096, cache_dir: Optional[str] = None) -> None:
+        """
+        Args:
+            inner (EmbeddingFunction, optional): The embedding function doing the real work.
+                                                 Defaults to ChromaDB's built-in model, created on first use.
+            model_name (str, optional): Identifier mixed into cache keys. Defaults to the inner function's name.
+            max_entries (int, optional): Capacity of the in-memory LRU tier.
+            cache_dir (str, optional): Directory for the on-disk SQLite tier. Disabled when omitted.
+        """
+        self._inner = inner
+        self.model_name = model_name or (inner.name() if inner is not None else DefaultEmbeddingFunction.name())
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if cache_dir:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(Path(cache_dir) / "embeddings.sqlite3"), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vector BLOB)")
+            self._db.commit()
+
+    @property
+    def inner(self) -> EmbeddingFunction:
+        # The default model is loaded lazily so a fully cached workload never pays for it
+        if self._inner is None:
+            with self._lock:
+                # Re-check under the lock so concurrent first requests load the model only once
+                if self._inner is None:
+                    logger.info("Loading default embedding model behind the embedding cache.")
+                    self._inner = DefaultEmbeddingFunction()
+        return self._inner
+
+    def __call__(self, input: Documents) -> Embeddings:
+        """
+        Embeds a batch of texts, serving as many as possible from the cache.
+
+        Args:
+            input (Documents): The texts to embed.
+
+        Returns:
+            Embeddings: One float32 vector per input text, in input order.
+        """
+        keys = [content_hash(self.model_name, text) for text in input]
+        vectors: List[Optional[np.ndarray]] = [None] * len(keys)
+        missing: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for position, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    self.hits += 1
+                    vectors[position] = vector
+                else:
+                    missing.setdefault(key, []).append(position)
+
+        if missing and self._db is not None:
+            for key, vector in self._read_disk(list(missing)).items():
+                with self._lock:
+                    self.disk_hits += len(missing[key])
+                self._remember(key, vector)
+                for position in missing.pop(key):
+                    vectors[position] = vector
+
+        if missing:
+            texts = [input[positions[0]] for positions in missing.values()]
+            with metrics.span("embed"):
+                computed = self.inner(texts)
+            metrics.increment("texts_embedded", len(texts))
+            with self._lock:
+                self.misses += sum(len(positions) for positions in missing.values())
+            fresh = {}
+            for (key, positions), vector in zip(missing.items(), computed):
+                vector = np.asarray(vector, dtype=np.float32)
+                fresh[key] = vector
+                self._remember(key, vector)
+                for position in positions:
+                    vectors[position] = vector
+            if self._db is not None:
+                self._write_disk(fresh)
+
+        return vectors
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _write_disk(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+                [(key, vector.shape[0], vector.tobytes()) for key, vector in vectors.items()]
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache counters.
+
+        Returns:
+            Dict[str, int]: 'hits' (memory), 'disk_hits', 'misses' (model calls per text) and 'size' (LRU entries).
+        """
+        with self._lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "size": len(self._lru)}
+
+    @staticmethod
+    def name() -> str:
+        return "pdf_pal_cached"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "max_entries": self.max_entries, "cache_dir": self.cache_dir}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "Cached_Embedding_Function":
+        return Cached_Embedding_Function(
+            max_entries=config.get("max_entries", 4096),
+            cache_dir=config.get("cache_dir")
+        )
+
+    def default_space(self) -> str:
+        return "cosine"
+
+    def is_legacy(self) -> bool:
+        return False
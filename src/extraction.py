@@ -0,0 +1,563 @@
+"""
+Parallel PDF extraction engine.
+
+Splits every uploaded PDF into page ranges and fans them out across a process pool,
+so large documents (and multi-file uploads) are parsed on all available cores.
+Each page is extracted exactly once and results are re-assembled in page order.
+
+Text comes from pluggable backends (`EXTRACTION_BACKENDS`): pypdf, pypdf's layout mode and the
+C-backed pdfium when `pypdfium2` is installed. Pages the first backend fails on, takes longer than
+the per-page timeout for, or returns garbled are retried with the next one; blank pages are not. Extracted pages are
+cached by file hash and page index, so re-uploads and streaming re-reads skip parsing.
+"""
+
+import io
+import os
+import time
+import sqlite3
+import threading
+import multiprocessing
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Any, Optional, Iterator, Sequence, Tuple
+
+from src.document_store import content_hash
+from src.lazy import lazy_import
+from src.logger import logger
+from src.metrics import metrics
+
+PdfReader = lazy_import("pypdf", "PdfReader")
+
+# Share of replacement/control characters or unmapped "(cid:N)" glyphs above which a page counts as garbled
+GARBAGE_RATIO = 0.1
+
+
+def read_pdf_bytes(pdf: Any) -> bytes:
+    """
+    Normalizes an uploaded PDF (Streamlit UploadedFile, file object, path or raw bytes) into bytes.
+    Raw bytes are required because open file handles cannot be shipped to worker processes.
+
+    Args:
+        pdf (Any): The PDF byte-stream, path or bytes payload.
+
+    Returns:
+        bytes: The raw PDF file contents.
+    """
+    if isinstance(pdf, (bytes, bytearray)):
+        return bytes(pdf)
+    if isinstance(pdf, (str, Path)):
+        return Path(pdf).read_bytes()
+    if hasattr(pdf, "getvalue"):
+        return pdf.getvalue()
+    # Generic file-like object: rewind so a previously consumed stream is read in full
+    if hasattr(pdf, "seek"):
+        pdf.seek(0)
+    return pdf.read()
+
+
+class Extraction_Backend:
+    """
+    This class is the interface of a text extraction backend: open a document, count its pages and
+    extract one page at a time. Instances hold no document state, so one can serve many documents.
+    """
+    name = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        """
+        Returns whether the backend's library can be imported.
+        """
+        return True
+
+    def open(self, pdf_bytes: bytes) -> Any:
+        raise NotImplementedError
+
+    def page_count(self, document: Any) -> int:
+        raise NotImplementedError
+
+    def extract_page(self, document: Any, index: int) -> str:
+        raise NotImplementedError
+
+    def close(self, document: Any) -> None:
+        pass
+
+
+class Pypdf_Backend(Extraction_Backend):
+    """
+    This class extracts text with pypdf's default (plain) mode.
+    """
+    name = "pypdf"
+    mode = "plain"
+
+    def open(self, pdf_bytes: bytes) -> Any:
+        return PdfReader(io.BytesIO(pdf_bytes))
+
+    def page_count(self, document: Any) -> int:
+        return len(document.pages)
+
+    def extract_page(self, document: Any, index: int) -> str:
+        return document.pages[index].extract_text(extraction_mode=self.mode) or ""
+
+
+class Pypdf_Layout_Backend(Pypdf_Backend):
+    """
+    This class extracts text with pypdf's layout mode, which keeps table columns aligned at some speed cost.
+    """
+    name = "pypdf-layout"
+    mode = "layout"
+
+
+class Pdfium_Backend(Extraction_Backend):
+    """
+    This class extracts text with PDFium (Chrome's C++ PDF engine) through the optional `pypdfium2` package.
+    """
+    name = "pdfium"
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            import pypdfium2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def open(self, pdf_bytes: bytes) -> Any:
+        import pypdfium2
+        return pypdfium2.PdfDocument(pdf_bytes)
+
+    def page_count(self, document: Any) -> int:
+        return len(document)
+
+    def extract_page(self, document: Any, index: int) -> str:
+        page = document[index]
+        try:
+            text_page = page.get_textpage()
+            try:
+                return text_page.get_text_range().replace("\r\n", "\n")
+            finally:
+                text_page.close()
+        finally:
+            page.close()
+
+    def close(self, document: Any) -> None:
+        document.close()
+
+
+EXTRACTION_BACKENDS = {backend.name: backend for backend in (Pypdf_Backend, Pypdf_Layout_Backend, Pdfium_Backend)}
+
+
+def resolve_backends(names: Sequence[str]) -> Tuple[str, ...]:
+    """
+    Keeps the known, importable backends of a preference list, in order. Falls back to pypdf if none are.
+
+    Args:
+        names (Sequence[str]): Backend names, most preferred first.
+
+    Returns:
+        Tuple[str, ...]: The usable backend names.
+    """
+    usable = []
+    for name in names:
+        backend = EXTRACTION_BACKENDS.get(name)
+        if backend is None:
+            logger.warning(f"Unknown extraction backend '{name}'; skipping it.")
+        elif not backend.available():
+            logger.warning(f"Extraction backend '{name}' is not installed; skipping it.")
+        elif name not in usable:
+            usable.append(name)
+    return tuple(usable) or (Pypdf_Backend.name,)
+
+
+def page_text_unusable(text: str) -> bool:
+    """
+    Returns whether an extracted page is garbled, in which case another backend should try it. Blank
+    text is final: blank and image-only pages have no text layer for another backend to find.
+    """
+    if not text or not text.strip():
+        return False
+    sample = text[:4000]
+    bad = sum(1 for char in sample if char == "\ufffd" or (not char.isprintable() and char not in "\n\r\t"))
+    # Each unmapped glyph renders as "(cid:123)", about eight characters
+    bad += sample.count("(cid:") * 8
+    return bad > len(sample) * GARBAGE_RATIO
+
+
+class Fallback_Page_Reader:
+    """
+    This class extracts single pages of one PDF through a chain of backends. A page goes to the next
+    backend when the current one raises, exceeds the per-page timeout or returns unusable text.
+    A backend that timed out is not used again for this document, since its stuck call may still
+    hold the document (and the library is not guaranteed to be thread-safe).
+    """
+    def __init__(self, pdf_bytes: bytes, backends: Sequence[str] = (Pypdf_Backend.name,), timeout: float = 0) -> None:
+        """
+        Args:
+            pdf_bytes (bytes): The raw PDF file contents.
+            backends (Sequence[str], optional): Backend names, most preferred first.
+            timeout (float, optional): Seconds a backend may spend on one page (0 = no limit).
+        """
+        self.pdf_bytes = pdf_bytes
+        self.backends = [EXTRACTION_BACKENDS[name]() for name in backends]
+        self.timeout = timeout
+        self._documents: Dict[str, Any] = {}
+        self._hung = set()
+        self.fallbacks = 0
+
+    @property
+    def page_count(self) -> int:
+        backend = self.backends[0]
+        return backend.page_count(self._document(backend))
+
+    def _document(self, backend: Extraction_Backend) -> Any:
+        if backend.name not in self._documents:
+            self._documents[backend.name] = backend.open(self.pdf_bytes)
+        return self._documents[backend.name]
+
+    def _run(self, backend: Extraction_Backend, index: int) -> str:
+        if not self.timeout:
+            return backend.extract_page(self._document(backend), index)
+        outcome = {}
+
+        def work() -> None:
+            try:
+                outcome["text"] = backend.extract_page(self._document(backend), index)
+            except Exception as e:
+                outcome["error"] = e
+
+        # A daemon thread, so a call that never returns can't hold up interpreter exit
+        worker = threading.Thread(target=work, name="page-extract", daemon=True)
+        worker.start()
+        worker.join(self.timeout)
+        if worker.is_alive():
+            # The stuck call can't be interrupted; abandon its thread and stop using that backend here
+            self._hung.add(backend.name)
+            self._documents.pop(backend.name, None)
+            raise FutureTimeout()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["text"]
+
+    def extract(self, index: int) -> str:
+        """
+        Returns the text of one page from the first backend that produces usable text. If none does,
+        the longest text any of them produced is returned (empty if every backend failed).
+        """
+        best = ""
+        for position, backend in enumerate(self.backends):
+            if backend.name in self._hung:
+                continue
+            if position:
+                self.fallbacks += 1
+            try:
+                text = self._run(backend, index)
+            except FutureTimeout:
+                logger.warning(f"Extraction backend '{backend.name}' exceeded {self.timeout}s on page {index}; trying the next one.")
+                continue
+            except Exception as e:
+                # A single malformed page should not sink the rest of the document
+                logger.debug(f"Extraction backend '{backend.name}' failed on page {index}: {e}")
+                continue
+            if not page_text_unusable(text):
+                return text
+            best = max(best, text, key=len)
+        return best
+
+    def close(self) -> None:
+        for backend in self.backends:
+            document = self._documents.pop(backend.name, None)
+            if document is not None and backend.name not in self._hung:
+                try:
+                    backend.close(document)
+                except Exception:
+                    pass
+
+
+class Page_Cache:
+    """
+    This class caches extracted page text by file hash and page index, in a bounded in-memory LRU
+    with an optional on-disk SQLite tier.
+    """
+    def __init__(self, max_entries: int = 2048, cache_dir: Optional[str] = None) -> None:
+        """
+        Args:
+            max_entries (int, optional): Capacity of the in-memory LRU tier (0 disables the cache).
+            cache_dir (str, optional): Directory for the on-disk SQLite tier. Disabled when omitted.
+        """
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if cache_dir and max_entries:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(Path(cache_dir) / "pages.sqlite3"), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS pages (file_hash TEXT, page INTEGER, text TEXT, PRIMARY KEY (file_hash, page))")
+            self._db.commit()
+
+    def get_many(self, file_hash: str, pages: Sequence[int]) -> Dict[int, str]:
+        """
+        Returns the cached text of whichever of the given pages are cached.
+        """
+        if not self.max_entries:
+            return {}
+        found = {}
+        with self._lock:
+            for page in pages:
+                text = self._lru.get((file_hash, page))
+                if text is not None:
+                    self._lru.move_to_end((file_hash, page))
+                    found[page] = text
+            missing = [page for page in pages if page not in found]
+            if missing and self._db is not None:
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(missing), 500):
+                    batch = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT page, text FROM pages WHERE file_hash = ? AND page IN ({','.join('?' * len(batch))})", [file_hash, *batch]
+                    ).fetchall()
+                    found.update(rows)
+            self.hits += len(found)
+            self.misses += len(pages) - len(found)
+        for page in missing:
+            if page in found:
+                self._remember(file_hash, page, found[page])
+        return found
+
+    def put_many(self, file_hash: str, pages: Dict[int, str]) -> None:
+        """
+        Stores the text of extracted pages.
+        """
+        if not self.max_entries or not pages:
+            return
+        for page, text in pages.items():
+            self._remember(file_hash, page, text)
+        if self._db is not None:
+            with self._lock:
+                self._db.executemany("INSERT OR REPLACE INTO pages (file_hash, page, text) VALUES (?, ?, ?)",
+                                     [(file_hash, page, text) for page, text in pages.items()])
+                self._db.commit()
+
+    def _remember(self, file_hash: str, page: int, text: str) -> None:
+        with self._lock:
+            self._lru[(file_hash, page)] = text
+            self._lru.move_to_end((file_hash, page))
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+
+def extract_page_range(pdf_bytes: bytes, start: int, stop: int, backends: Sequence[str] = (Pypdf_Backend.name,),
+                       timeout: float = 0) -> List[str]:
+    """
+    Worker entry point: parses the PDF and extracts the text of pages [start, stop).
+    Lives at module level so it can be pickled into the process pool.
+
+    Args:
+        pdf_bytes (bytes): The raw PDF file contents.
+        start (int): Index of the first page to extract.
+        stop (int): Index one past the last page to extract.
+        backends (Sequence[str], optional): Backend names, most preferred first; later ones are fallbacks.
+        timeout (float, optional): Seconds a backend may spend on one page (0 = no limit).
+
+    Returns:
+        List[str]: The extracted text of each page in the range, in page order.
+    """
+    reader = Fallback_Page_Reader(pdf_bytes, backends, timeout)
+    try:
+        return [reader.extract(index) for index in range(start, stop)]
+    finally:
+        reader.close()
+
+
+def iter_pdf_pages(pdf: Any, backends: Sequence[str] = (Pypdf_Backend.name,), timeout: float = 0,
+                   cache: Optional[Page_Cache] = None) -> Iterator[str]:
+    """
+    Lazily yields the text of each page of a PDF, one page at a time.
+    Used by the streaming ingestion path so only the current page is held in memory.
+
+    Args:
+        pdf (Any): The PDF byte-stream, path or bytes payload.
+        backends (Sequence[str], optional): Backend names, most preferred first; later ones are fallbacks.
+        timeout (float, optional): Seconds a backend may spend on one page (0 = no limit).
+        cache (Page_Cache, optional): Page cache consulted before, and filled during, extraction.
+
+    Yields:
+        str: The extracted text of each non-empty page, in page order.
+    """
+    pdf_bytes = read_pdf_bytes(pdf)
+    file_hash = content_hash(pdf_bytes) if cache is not None else ""
+    reader = Fallback_Page_Reader(pdf_bytes, backends, timeout)
+    try:
+        for index in range(reader.page_count):
+            cached = cache.get_many(file_hash, [index]) if cache is not None else {}
+            if cached:
+                text = cached[index]
+                metrics.increment("pages_from_cache")
+            else:
+                with metrics.span("extract", mode="page"):
+                    text = reader.extract(index)
+                metrics.increment("pages_extracted")
+                if cache is not None:
+                    cache.put_many(file_hash, {index: text})
+            if text:
+                yield text
+    finally:
+        reader.close()
+
+
+class Parallel_PDF_Extractor:
+    """
+    This class spreads PDF page extraction across a process pool.
+    Small workloads are extracted inline, since spinning up workers would cost more than it saves.
+    """
+    def __init__(self, max_workers: Optional[int] = None, pages_per_task: int = 25, min_pages_for_pool: int = 50,
+                 backends: Sequence[str] = (Pypdf_Backend.name,), page_timeout: float = 0, cache: Optional[Page_Cache] = None) -> None:
+        """
+        Args:
+            max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            pages_per_task (int, optional): Size of each page range submitted to the pool.
+            min_pages_for_pool (int, optional): Total page count below which extraction runs inline.
+            backends (Sequence[str], optional): Extraction backends, most preferred first; later ones are per-page fallbacks.
+                                                Backends that aren't installed are skipped.
+            page_timeout (float, optional): Seconds a backend may spend on one page before the next one takes over (0 = no limit).
+            cache (Page_Cache, optional): Cache of extracted pages by file hash and page index. Disabled when omitted.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
+        self.min_pages_for_pool = min_pages_for_pool
+        self.backends = resolve_backends(backends)
+        self.page_timeout = page_timeout
+        self.cache = cache or Page_Cache(max_entries=0)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Lazily create the pool once and reuse it so worker start-up is paid only on the first upload
+        with self._pool_lock:
+            if self._pool is None:
+                logger.info(f"Starting PDF extraction process pool with {self.max_workers} workers.")
+                # The shared engine serves many threads; forking a multi-threaded process can deadlock the child
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            return self._pool
+
+    def extract_pages_from_pdfs(self, pdf_docs: List[Any]) -> List[List[str]]:
+        """
+        Extracts the text of every page of every PDF, processing all files concurrently.
+
+        Args:
+            pdf_docs (List[Any]): A list of uploaded PDF file byte-streams or paths.
+
+        Returns:
+            List[List[str]]: One list of page texts per input document, in input and page order.
+                             Documents that fail to parse yield an empty list.
+        """
+        logger.info("Extracting pages from {} PDF documents.", len(pdf_docs))
+        started = time.perf_counter()
+
+        payloads = []
+        for pdf in pdf_docs:
+            try:
+                pdf_bytes = read_pdf_bytes(pdf)
+                page_count = len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+                payloads.append((pdf_bytes, page_count))
+            except Exception as e:
+                logger.error(f"Error opening a PDF for extraction: {e}")
+                payloads.append((None, 0))
+
+        # Cached pages are served directly; only the missing ones are extracted
+        files = []
+        for pdf_bytes, page_count in payloads:
+            file_hash = content_hash(pdf_bytes) if pdf_bytes is not None and self.cache.max_entries else ""
+            cached = self.cache.get_many(file_hash, list(range(page_count))) if file_hash else {}
+            missing = [index for index in range(page_count) if index not in cached]
+            files.append((file_hash, page_count, cached, missing))
+
+        total_pages = sum(page_count for _, page_count in payloads)
+        missing_pages = sum(len(missing) for *_, missing in files)
+        use_pool = self.max_workers > 1 and missing_pages >= self.min_pages_for_pool
+
+        # Every range of every file is submitted up-front, so files are processed concurrently too
+        ranges = []
+        for (pdf_bytes, _), (_, _, _, missing) in zip(payloads, files):
+            ranges.append([(pdf_bytes, start, stop, self.backends, self.page_timeout) for start, stop in self._ranges(missing)])
+
+        extracted = []
+        if use_pool:
+            pool = self._get_pool()
+            futures = [[pool.submit(extract_page_range, *task) for task in file_tasks] for file_tasks in ranges]
+            for file_futures in futures:
+                extracted.append(self._collect(file_futures))
+        else:
+            for file_tasks in ranges:
+                extracted.append(self._collect(file_tasks, inline=True))
+
+        results = []
+        for (file_hash, page_count, cached, missing), pages in zip(files, extracted):
+            if len(pages) != len(missing):
+                results.append([])
+                continue
+            fresh = dict(zip(missing, pages))
+            if file_hash:
+                self.cache.put_many(file_hash, fresh)
+            results.append([cached[index] if index in cached else fresh[index] for index in range(page_count)])
+
+        metrics.observe("stage_seconds", time.perf_counter() - started, stage="extract", mode="batch")
+        metrics.increment("pages_extracted", missing_pages)
+        metrics.increment("pages_from_cache", total_pages - missing_pages)
+        logger.success(f"Extracted {missing_pages} pages, {total_pages - missing_pages} from cache "
+                       f"({'process pool' if use_pool else 'inline'}, backends: {', '.join(self.backends)}).")
+        return results
+
+    def _ranges(self, pages: List[int]) -> List[Tuple[int, int]]:
+        # Contiguous runs of the given page indices, split into tasks of at most pages_per_task pages
+        ranges = []
+        for index in pages:
+            if ranges and ranges[-1][1] == index and index - ranges[-1][0] < self.pages_per_task:
+                ranges[-1][1] = index + 1
+            else:
+                ranges.append([index, index + 1])
+        return [tuple(run) for run in ranges]
+
+    def page_options(self) -> Dict[str, Any]:
+        """
+        Returns the backend, timeout and cache settings as keyword arguments for `iter_pdf_pages`.
+        """
+        return {"backends": self.backends, "timeout": self.page_timeout, "cache": self.cache if self.cache.max_entries else None}
+
+    def _collect(self, tasks: List[Any], inline: bool = False) -> List[str]:
+        # Gather page ranges in submission order so page order stays deterministic
+        pages = []
+        try:
+            for task in tasks:
+                pages.extend(extract_page_range(*task) if inline else task.result())
+        except Exception as e:
+            logger.error(f"Error extracting text from a PDF: {e}")
+            return []
+        return pages
+
+    def extract_text_from_pdfs(self, pdf_docs: List[Any]) -> List[str]:
+        """
+        Extracts the full text of each PDF as one string per document.
+
+        Args:
+            pdf_docs (List[Any]): A list of uploaded PDF file byte-streams or paths.
+
+        Returns:
+            List[str]: The concatenated text of each document, in input order.
+        """
+        return [
+            "\n".join(page for page in pages if page) + ("\n" if any(pages) else "")
+            for pages in self.extract_pages_from_pdfs(pdf_docs)
+        ]
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker processes, if any were started.
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
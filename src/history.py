@@ -0,0 +1,340 @@
+"""
+Conversation history store.
+
+`PDF_Pal_Brain` used to keep every session's messages as a list of dicts for the life of the
+process. `History_Store` keeps each session in a `Session_History`: the system message plus a
+ring buffer of turns capped by tokens (a fixed list indexed from a moving head, so evicting the
+oldest turn is O(1) and nothing is shifted). Messages are `__slots__` records with interned
+roles and a cached token count, and `Session_History.window` gives prompt assembly a view of the
+recent turns without copying them. Turns pushed out by the cap are dropped, or written to an
+optional SQLite file so the full transcript survives for export.
+
+Positions follow the old list layout: 0 is the system message and 1.. are the retained turns.
+`dropped` counts the turns evicted so far, so callers that track positions across turns (the
+rolling summary's watermark) can convert them.
+"""
+
+import sys
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.tokens import Token_Counter, MESSAGE_OVERHEAD_TOKENS
+
+
+class Message:
+    """
+    This class is one chat message. It reads like the {"role", "content"} dict it replaces.
+    """
+    __slots__ = ("role", "content", "tokens")
+
+    def __init__(self, role: str, content: str, tokens: int = 0) -> None:
+        self.role = sys.intern(role)
+        self.content = content
+        self.tokens = tokens
+
+    def __getitem__(self, key: str) -> str:
+        if key in ("role", "content"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in ("role", "content") else default
+
+    def as_dict(self) -> Dict[str, str]:
+        """
+        Returns the message in the chat API's format.
+        """
+        return {"role": self.role, "content": self.content}
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Message):
+            return self.role == other.role and self.content == other.content
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content!r})"
+
+
+class History_Window:
+    """
+    This class is a read-only view of consecutive positions of a `Session_History`. Creating one copies nothing.
+    """
+    def __init__(self, history: "Session_History", start: int, stop: int) -> None:
+        self.history = history
+        self.start = start
+        self.stop = max(stop, start)
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return History_Window(self.history, self.start + start, self.start + stop)
+            return [self[position] for position in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history window index out of range")
+        return self.history[self.start + index]
+
+    def __iter__(self) -> Iterator[Message]:
+        for position in range(self.start, self.stop):
+            yield self.history[position]
+
+    @property
+    def tokens(self) -> int:
+        """
+        Prompt tokens of the messages in the window, including per-message overhead.
+        """
+        return sum(message.tokens for message in self)
+
+    def as_dicts(self) -> List[Dict[str, str]]:
+        """
+        Returns the window's messages in the chat API's format.
+        """
+        return [message.as_dict() for message in self]
+
+
+class History_Spill:
+    """
+    This class writes evicted turns to a SQLite file, keyed by session and absolute position.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): The SQLite database file. Created, with its directory, if missing.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS messages (session_id TEXT, position INTEGER, role TEXT, content TEXT, "
+                         "PRIMARY KEY (session_id, position))")
+        self._lock = threading.Lock()
+
+    def write(self, session_id: str, position: int, message: Message) -> None:
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)", (session_id, position, message.role, message.content))
+
+    def read(self, session_id: str) -> List[Dict[str, str]]:
+        with self._lock:
+            rows = self._db.execute("SELECT role, content FROM messages WHERE session_id = ? ORDER BY position", (session_id,)).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+
+class Session_History:
+    """
+    This class holds one session's system message and a ring buffer of its turns: `_ring[_head]` is the oldest
+    turn and eviction advances `_head`, so no message is moved. Once the turns exceed `max_tokens` the oldest
+    are evicted (to the spill, if any); the newest turn is always kept.
+    """
+    def __init__(self, session_id: str, counter: Token_Counter, max_tokens: int = 0, spill: Optional[History_Spill] = None) -> None:
+        """
+        Args:
+            session_id (str): The session the history belongs to.
+            counter (Token_Counter): Counts each message's tokens once, when it is added.
+            max_tokens (int, optional): Token cap on the retained turns (0 = unlimited).
+            spill (History_Spill, optional): Where evicted turns are written. Without it they are dropped.
+        """
+        self.session_id = session_id
+        self.counter = counter
+        self.max_tokens = max_tokens
+        self.spill = spill
+        self.system: Optional[Message] = None
+        self._ring: List[Optional[Message]] = [None] * 8
+        self._head = 0
+        self._size = 0
+        self.dropped = 0
+        self.tokens = 0
+
+    def __len__(self) -> int:
+        return self._size + (self.system is not None)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if self.system is not None:
+            if index == 0:
+                return self.system
+            index -= 1
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        return self._ring[(self._head + index) % len(self._ring)]
+
+    def __iter__(self) -> Iterator[Message]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def _message(self, role: str, content: str) -> Message:
+        return Message(role, content, self.counter.count(content) + MESSAGE_OVERHEAD_TOKENS)
+
+    def set_system(self, content: str) -> None:
+        """
+        Sets the system message, which is never evicted.
+        """
+        self.system = self._message("system", content)
+
+    def append(self, role: str, content: str) -> None:
+        """
+        Adds a turn, evicting the oldest turns if the token cap is exceeded.
+        """
+        if self._size == len(self._ring):
+            # Only when every slot is taken: unroll into a buffer twice the size, amortized O(1) per append
+            self._ring = self._ring[self._head:] + self._ring[:self._head] + [None] * len(self._ring)
+            self._head = 0
+        message = self._message(role, content)
+        self._ring[(self._head + self._size) % len(self._ring)] = message
+        self._size += 1
+        self.tokens += message.tokens
+        while self.max_tokens and self.tokens > self.max_tokens and self._size > 1:
+            self._evict()
+
+    def extend(self, messages: List[Dict[str, str]]) -> None:
+        """
+        Adds messages in the chat API's format; a leading system message becomes the system message.
+        """
+        for message in messages:
+            if message["role"] == "system" and self.system is None and not self._size:
+                self.set_system(message["content"])
+            else:
+                self.append(message["role"], message["content"])
+
+    def _evict(self) -> None:
+        message = self._ring[self._head]
+        self._ring[self._head] = None
+        self._head = (self._head + 1) % len(self._ring)
+        self._size -= 1
+        self.tokens -= message.tokens
+        self.dropped += 1
+        if self.spill is not None:
+            self.spill.write(self.session_id, self.dropped, message)
+
+    def window(self, start: int, stop: Optional[int] = None) -> History_Window:
+        """
+        Returns a view of positions [start, stop) (stop defaults to the end) for prompt assembly.
+        """
+        return History_Window(self, start, len(self) if stop is None else stop)
+
+    def clear(self) -> None:
+        """
+        Forgets every message, including spilled ones.
+        """
+        self.system = None
+        self._ring = [None] * 8
+        self._head = self._size = self.dropped = self.tokens = 0
+        if self.spill is not None:
+            self.spill.delete(self.session_id)
+
+
+class History_Store:
+    """
+    This class maps session IDs to their `Session_History`. It supports the dict operations the brain
+    and the session manager use, and assigning a list of message dicts loads it as a session's history.
+    """
+    def __init__(self, counter: Token_Counter = None, max_tokens: int = 0, spill_path: Optional[str] = None) -> None:
+        """
+        Args:
+            counter (Token_Counter, optional): Counts message tokens. Defaults to the characters / 4 estimate.
+            max_tokens (int, optional): Token cap on each session's retained turns (0 = unlimited).
+            spill_path (str, optional): SQLite file evicted turns are written to. Without it they are dropped.
+        """
+        self.counter = counter or Token_Counter()
+        self.max_tokens = max_tokens
+        self.spill = History_Spill(spill_path) if spill_path else None
+        self._sessions: Dict[str, Session_History] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __getitem__(self, session_id: str) -> Session_History:
+        return self._sessions[session_id]
+
+    def __setitem__(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        self.load(session_id, messages)
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        return self._sessions.get(session_id, default)
+
+    def setdefault(self, session_id: str) -> Session_History:
+        """
+        Returns a session's history, creating an empty one on first use.
+        """
+        with self._lock:
+            if session_id not in self._sessions:
+                self._sessions[session_id] = Session_History(session_id, self.counter, self.max_tokens, self.spill)
+            return self._sessions[session_id]
+
+    def load(self, session_id: str, messages: List[Dict[str, str]], dropped: int = 0) -> Session_History:
+        """
+        Replaces a session's history with the given messages.
+
+        Args:
+            session_id (str): The session.
+            messages (List[Dict[str, str]]): The system message followed by the turns, as exported.
+            dropped (int, optional): Turns that preceded these and are gone, so positions stay comparable.
+
+        Returns:
+            Session_History: The loaded history.
+        """
+        self.pop(session_id)
+        history = self.setdefault(session_id)
+        history.extend(messages)
+        history.dropped += dropped
+        return history
+
+    def export(self, session_id: str) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Returns a session's full transcript, spilled turns included, and how many earlier turns were dropped for good.
+        """
+        history = self._sessions.get(session_id)
+        if history is None:
+            return [], 0
+        spilled = self.spill.read(session_id) if self.spill is not None else []
+        messages = [history.system.as_dict()] if history.system is not None else []
+        turns = history.window(int(history.system is not None)).as_dicts()
+        return messages + spilled + turns, history.dropped - len(spilled)
+
+    def pop(self, session_id: str, default: Any = None) -> Any:
+        with self._lock:
+            history = self._sessions.pop(session_id, None)
+        if history is None:
+            return default
+        if self.spill is not None:
+            self.spill.delete(session_id)
+        return history
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Reports the sessions, retained messages and tokens held in memory, and the turns evicted so far.
+        """
+        histories = list(self._sessions.values())
+        return {
+            "sessions": len(histories),
+            "messages": sum(len(history) for history in histories),
+            "tokens": sum(history.tokens for history in histories),
+            "evicted": sum(history.dropped for history in histories),
+            "spilled": self.spill.count() if self.spill is not None else 0,
+        }
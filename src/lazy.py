@@ -0,0 +1,58 @@
+"""
+Deferred imports.
+
+chromadb alone takes most of a second to import, and groq, pypdf and chonkie add more, although
+a process often needs none of them until its first upload or question. `lazy_import` returns a
+stand-in bound to a module-level name that imports the module (or one of its attributes) the
+first time it is used, so call sites stay unchanged (`chromadb.Client()`, `PdfReader(stream)`)
+and tests can still patch the name.
+"""
+
+import importlib
+import threading
+from typing import Any, Optional
+
+
+class Lazy_Import:
+    """
+    This class stands in for a module, or an attribute of one, until it is first used.
+    Attribute access and calls are forwarded to the imported object.
+    """
+    def __init__(self, module: str, attribute: Optional[str] = None) -> None:
+        """
+        Args:
+            module (str): The dotted module name.
+            attribute (str, optional): An attribute of the module to stand in for instead of the module itself.
+        """
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+        self._lock = threading.Lock()
+
+    def resolve(self) -> Any:
+        """
+        Imports and returns the target, once.
+        """
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    target = importlib.import_module(self._module)
+                    self._target = getattr(target, self._attribute) if self._attribute else target
+        return self._target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        target = f"{self._module}.{self._attribute}" if self._attribute else self._module
+        return f"<lazy {target} ({'loaded' if self._target is not None else 'not loaded'})>"
+
+
+def lazy_import(module: str, attribute: Optional[str] = None) -> Lazy_Import:
+    """
+    Returns a stand-in that imports `module` (or `module.attribute`) on first use.
+    """
+    return Lazy_Import(module, attribute)
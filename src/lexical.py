@@ -0,0 +1,258 @@
+"""
+In-process BM25 inverted index.
+
+Dense embeddings are weak on exact identifiers (part numbers, clause IDs, names), so RAG_Memory
+keeps a lexical index next to the Chroma collection and fuses both rankings. The index is
+partitioned by session and file. Postings are stored compressed-sparse-row style in NumPy arrays
+(sorted term IDs, offsets, uint32 doc IDs, uint16 term frequencies), costing about 6 bytes per
+posting. New chunks land in a small append-only buffer that is merged into the arrays on the
+next search or once it grows large, so incremental indexing stays cheap.
+"""
+
+import re
+import math
+import threading
+from array import array
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# Words joined by -, _, ., / or : stay one token (PN-4821, 4.2.1, ISO/IEC) and also index their parts
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+SPLIT_PATTERN = re.compile(r"[-_./:]")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it its of on or our she "
+    "so than that the their them then there these they this to was we were what when where which who "
+    "will with you your does do did how can about".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases a text and splits it into index terms, keeping compound identifiers whole as well as
+    indexing their parts.
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in SPLIT_PATTERN.split(token) if part and part not in STOPWORDS)
+    return tokens
+
+
+class _Partition:
+    """
+    The postings of one file within one session.
+    """
+    __slots__ = ("ids", "positions", "types", "lengths", "terms", "offsets", "docs", "tfs",
+                 "pending_terms", "pending_docs", "pending_tfs")
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.types = array("B")
+        self.lengths = array("I")
+        # Frozen CSR postings: docs[offsets[i]:offsets[i + 1]] hold the documents of term terms[i]
+        self.terms = np.zeros(0, dtype=np.uint32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.docs = np.zeros(0, dtype=np.uint32)
+        self.tfs = np.zeros(0, dtype=np.uint16)
+        # Postings added since the last freeze, as parallel (term, doc, tf) arrays
+        self.pending_terms = array("I")
+        self.pending_docs = array("I")
+        self.pending_tfs = array("H")
+
+    def freeze(self) -> None:
+        if not self.pending_terms:
+            return
+        terms = np.concatenate([np.repeat(self.terms, np.diff(self.offsets)), np.frombuffer(self.pending_terms, dtype=np.uint32)])
+        docs = np.concatenate([self.docs, np.frombuffer(self.pending_docs, dtype=np.uint32)])
+        tfs = np.concatenate([self.tfs, np.frombuffer(self.pending_tfs, dtype=np.uint16)])
+        order = np.lexsort((docs, terms))
+        terms, self.docs, self.tfs = terms[order], docs[order], tfs[order]
+        self.terms, starts = np.unique(terms, return_index=True)
+        self.offsets = np.append(starts, len(terms)).astype(np.int64)
+        self.pending_terms, self.pending_docs, self.pending_tfs = array("I"), array("I"), array("H")
+
+    def postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        index = int(np.searchsorted(self.terms, term_id))
+        if index == len(self.terms) or self.terms[index] != term_id:
+            return self.docs[:0], self.tfs[:0]
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return self.docs[start:stop], self.tfs[start:stop]
+
+    def nbytes(self) -> int:
+        return (self.terms.nbytes + self.offsets.nbytes + self.docs.nbytes + self.tfs.nbytes
+                + self.types.itemsize * len(self.types) + self.lengths.itemsize * len(self.lengths)
+                + self.pending_terms.itemsize * len(self.pending_terms) * 2 + self.pending_tfs.itemsize * len(self.pending_tfs))
+
+
+class BM25_Index:
+    """
+    This class maintains BM25 postings for every session's chunks and ranks them for a query.
+    Statistics (document count, document frequencies, average length) are computed per session, so
+    one session's uploads never skew another's scores.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75, freeze_threshold: int = 50000) -> None:
+        """
+        Args:
+            k1 (float, optional): BM25 term-frequency saturation.
+            b (float, optional): BM25 document-length normalization.
+            freeze_threshold (int, optional): Buffered postings after which a partition is merged eagerly.
+        """
+        self.k1 = k1
+        self.b = b
+        self.freeze_threshold = freeze_threshold
+        # Term and chunk-type dictionaries shared by every partition so postings store small integers
+        self._vocabulary: Dict[str, int] = {}
+        self._type_codes: Dict[str, int] = {}
+        self._sessions: Dict[str, Dict[str, _Partition]] = {}
+        self._lock = threading.RLock()
+
+    def add(self, session_id: str, file_name: str, chunk_type: str, ids: List[str], texts: List[str]) -> int:
+        """
+        Indexes chunks of one file. Chunks whose ID is already indexed in the partition are skipped.
+
+        Args:
+            session_id (str): The session the chunks belong to.
+            file_name (str): The file the chunks come from.
+            chunk_type (str): The chunk type ('content' or 'summary').
+            ids (List[str]): The chunk IDs, matching the Chroma row IDs.
+            texts (List[str]): The chunk texts.
+
+        Returns:
+            int: The number of chunks added.
+        """
+        with self._lock:
+            partition = self._sessions.setdefault(session_id, {}).setdefault(file_name, _Partition())
+            type_code = self._type_codes.setdefault(chunk_type, len(self._type_codes))
+            added = 0
+            for chunk_id, text in zip(ids, texts):
+                if chunk_id in partition.positions:
+                    continue
+                doc = len(partition.ids)
+                partition.positions[chunk_id] = doc
+                partition.ids.append(chunk_id)
+                partition.types.append(type_code)
+                counts: Dict[int, int] = {}
+                tokens = tokenize(text)
+                for token in tokens:
+                    term_id = self._vocabulary.setdefault(token, len(self._vocabulary))
+                    counts[term_id] = counts.get(term_id, 0) + 1
+                partition.lengths.append(len(tokens))
+                for term_id, count in counts.items():
+                    partition.pending_terms.append(term_id)
+                    partition.pending_docs.append(doc)
+                    partition.pending_tfs.append(min(count, 65535))
+                added += 1
+            if len(partition.pending_terms) >= self.freeze_threshold:
+                partition.freeze()
+            return added
+
+    def search(self, session_id: str, query: str, chunk_type: str = None, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Ranks a session's chunks against a query with BM25.
+
+        Args:
+            session_id (str): The session to search.
+            query (str): The query text.
+            chunk_type (str, optional): Restricts results to one chunk type.
+            k (int, optional): Maximum number of results.
+
+        Returns:
+            List[Tuple[str, float]]: (chunk ID, score) pairs, best first. Only chunks sharing a term with the query are returned.
+        """
+        with self._lock:
+            partitions = list(self._sessions.get(session_id, {}).values())
+            term_ids = list(dict.fromkeys(self._vocabulary[token] for token in tokenize(query) if token in self._vocabulary))
+            type_code = self._type_codes.get(chunk_type) if chunk_type else None
+            if not partitions or not term_ids or (chunk_type and type_code is None):
+                return []
+            for partition in partitions:
+                partition.freeze()
+
+            total_docs = sum(len(partition.ids) for partition in partitions)
+            average_length = sum(sum(partition.lengths) for partition in partitions) / max(total_docs, 1) or 1.0
+            postings = [[partition.postings(term_id) for term_id in term_ids] for partition in partitions]
+            idf = []
+            for position in range(len(term_ids)):
+                df = sum(len(per_partition[position][0]) for per_partition in postings)
+                idf.append(math.log(1 + (total_docs - df + 0.5) / (df + 0.5)))
+
+            results = []
+            for partition, per_partition in zip(partitions, postings):
+                scores = np.zeros(len(partition.ids), dtype=np.float32)
+                lengths = np.frombuffer(partition.lengths, dtype=np.uint32).astype(np.float32)
+                norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+                for weight, (docs, tfs) in zip(idf, per_partition):
+                    if len(docs):
+                        tf = tfs.astype(np.float32)
+                        scores[docs] += weight * tf * (self.k1 + 1) / (tf + norms[docs])
+                if type_code is not None:
+                    scores[np.frombuffer(partition.types, dtype=np.uint8) != type_code] = 0
+                hits = np.nonzero(scores > 0)[0]
+                if len(hits) > k:
+                    hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+                results.extend((partition.ids[doc], float(scores[doc])) for doc in hits)
+            results.sort(key=lambda pair: pair[1], reverse=True)
+            return results[:k]
+
+    def has_session(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def delete_session(self, session_id: str) -> None:
+        """
+        Drops every partition of a session.
+        """
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def delete_file(self, session_id: str, file_name: str) -> None:
+        """
+        Drops the partition of one file within a session.
+        """
+        with self._lock:
+            self._sessions.get(session_id, {}).pop(file_name, None)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Reports index size: sessions, partitions, chunks, postings, vocabulary and postings memory.
+        """
+        with self._lock:
+            partitions = [partition for files in self._sessions.values() for partition in files.values()]
+            postings = sum(len(partition.docs) + len(partition.pending_docs) for partition in partitions)
+            nbytes = sum(partition.nbytes() for partition in partitions)
+            return {
+                "sessions": len(self._sessions),
+                "partitions": len(partitions),
+                "chunks": sum(len(partition.ids) for partition in partitions),
+                "postings": postings,
+                "vocabulary": len(self._vocabulary),
+                "postings_bytes": nbytes,
+                "bytes_per_posting": round(nbytes / postings, 2) if postings else 0.0,
+            }
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60, prefer: int = None) -> List[str]:
+    """
+    Fuses several best-first rankings of IDs with reciprocal rank fusion: score = sum(1 / (k + rank)).
+
+    Args:
+        rankings (List[List[str]]): The rankings to fuse.
+        k (int, optional): The RRF damping constant.
+        prefer (int, optional): Index of the ranking whose order breaks equal fused scores. By default
+                                ties keep the order in which the IDs were first seen.
+
+    Returns:
+        List[str]: All IDs, best fused score first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    preferred = {item: rank for rank, item in enumerate(rankings[prefer])} if prefer is not None else {}
+    return sorted(scores, key=lambda item: (-scores[item], preferred.get(item, len(preferred))))
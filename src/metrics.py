@@ -0,0 +1,235 @@
+"""
+Pipeline instrumentation.
+
+A process-wide `metrics` registry records where the RAG pipeline spends its time and work:
+`span(stage)` times a block into the `pdf_pal_stage_seconds` histogram (extract, chunk, embed,
+index, retrieve, prompt, llm, ...), `increment` bumps counters (pages, chunks, tokens) and
+`observe` feeds other histograms. Components with their own statistics (caches, history, sessions)
+register collectors that are read at export time. Everything exports as Prometheus text, served
+by `export_prometheus()` or written to a local file, optionally on an interval.
+
+Recording is a lock, a `perf_counter` pair and a bisect, so spans are safe on hot paths; a
+disabled registry records nothing.
+"""
+
+import json
+import time
+import bisect
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics_Registry:
+    """
+    This class holds counters and histograms keyed by name and labels, plus gauge collectors,
+    and renders them in the Prometheus text exposition format.
+    """
+    def __init__(self, prefix: str = "pdf_pal", enabled: bool = True) -> None:
+        """
+        Args:
+            prefix (str, optional): Prepended to every exported metric name.
+            enabled (bool, optional): Whether anything is recorded.
+        """
+        self.prefix = prefix
+        self.enabled = enabled
+        self.export_path: Optional[str] = None
+        self.export_interval = 0.0
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Dict[str, Any]]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, str] = {
+            "stage_seconds": "Wall-clock seconds spent per pipeline stage.",
+        }
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+
+    def configure(self, enabled: bool = True, export_path: Optional[str] = None, export_interval: float = 60) -> None:
+        """
+        Turns recording on or off and sets where, and how often, `flush` writes the metrics.
+
+        Args:
+            enabled (bool, optional): Whether anything is recorded.
+            export_path (str, optional): File `flush` writes to. Disabled when omitted.
+            export_interval (float, optional): Minimum seconds between writes by `flush`.
+        """
+        self.enabled = enabled
+        self.export_path = export_path
+        self.export_interval = export_interval
+
+    def describe(self, name: str, text: str) -> None:
+        """
+        Sets the HELP text of a metric.
+        """
+        self._help[name] = text
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        Adds to a counter. Exported with a `_total` suffix.
+        """
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = SECONDS_BUCKETS, **labels: Any) -> None:
+        """
+        Records one value in a histogram. A histogram keeps the buckets it was first observed with.
+        """
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            bounds = self._buckets.setdefault(name, tuple(buckets))
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {"counts": [0] * (len(bounds) + 1), "sum": 0.0, "count": 0}
+            histogram["counts"][bisect.bisect_left(bounds, value)] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def span(self, stage: str, **labels: Any) -> Iterator[None]:
+        """
+        Times the enclosed block into the stage histogram, also when it raises.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    def register_collector(self, name: str, collect: Callable[[], Dict[str, float]]) -> None:
+        """
+        Registers a function returning gauge values, read at export time as `<prefix>_<name>_<key>`.
+        Registering the same name again replaces the previous collector.
+        """
+        with self._lock:
+            self._collectors[name] = collect
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns every counter, histogram and collected gauge as plain data.
+        """
+        with self._lock:
+            counters = {name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {name: [{"labels": dict(key), "buckets": list(self._buckets[name]), "counts": list(data["counts"]),
+                                  "sum": data["sum"], "count": data["count"]} for key, data in series.items()]
+                          for name, series in self._histograms.items()}
+            collectors = list(self._collectors.items())
+        return {"counters": counters, "histograms": histograms, "gauges": self._collect(collectors)}
+
+    def _collect(self, collectors: List[Tuple[str, Callable[[], Dict[str, float]]]]) -> Dict[str, float]:
+        gauges = {}
+        for name, collect in collectors:
+            try:
+                values = collect() or {}
+            except Exception:
+                # A broken collector must not take the whole export down
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[f"{name}_{key}"] = value
+        return gauges
+
+    def export_prometheus(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+        """
+        data = self.snapshot()
+        lines = []
+        for name, series in sorted(data["counters"].items()):
+            metric = f"{self.prefix}_{name}_total"
+            lines += [f"# HELP {metric} {self._help.get(name, name.replace('_', ' ').capitalize() + '.')}", f"# TYPE {metric} counter"]
+            lines += [f"{metric}{_format_labels(_labels(entry['labels']))} {_format_value(entry['value'])}" for entry in series]
+        for name, series in sorted(data["histograms"].items()):
+            metric = f"{self.prefix}_{name}"
+            lines += [f"# HELP {metric} {self._help.get(name, name.replace('_', ' ').capitalize() + '.')}", f"# TYPE {metric} histogram"]
+            for entry in series:
+                key = _labels(entry["labels"])
+                cumulative = 0
+                for bound, count in zip([*entry["buckets"], "+Inf"], entry["counts"]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _format_value(bound)
+                    lines.append(f"{metric}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {_format_value(entry['sum'])}")
+                lines.append(f"{metric}_count{_format_labels(key)} {entry['count']}")
+        for name, value in sorted(data["gauges"].items()):
+            metric = f"{self.prefix}_{name}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {_format_value(value)}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Writes the metrics to a file: JSON for a .json path, Prometheus text otherwise (e.g. a
+        node_exporter textfile collector .prom file). The file is replaced atomically.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(self.snapshot(), indent=2) if path.suffix == ".json" else self.export_prometheus()
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(content)
+        tmp.replace(path)
+
+    def flush(self, force: bool = False) -> bool:
+        """
+        Writes the metrics to the configured export path if the export interval has passed.
+
+        Returns:
+            bool: True if a file was written.
+        """
+        if not self.enabled or not self.export_path:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_export < self.export_interval:
+                return False
+            self._last_export = now
+        self.write(self.export_path)
+        return True
+
+    def reset(self) -> None:
+        """
+        Drops every recorded counter and histogram; collectors stay registered.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._buckets.clear()
+
+
+# Shared by every component in the process, like the logger
+metrics = Metrics_Registry()
@@ -0,0 +1,57 @@
+"""
+Maximal marginal relevance reranking.
+
+Overlapping chunks from the same page often take every retrieval slot, spending prompt tokens on
+the same text several times. `maximal_marginal_relevance` picks candidates one at a time, trading
+their relevance against their similarity to what is already picked and drops near-duplicates of
+picked chunks outright. The remaining slots are filled with the best of the rest, unless
+`stop_early` ends selection once no candidate adds more than it repeats. All similarities come
+from one NumPy matrix product over the candidate embeddings.
+"""
+
+from typing import Any, List
+
+import numpy as np
+
+
+def maximal_marginal_relevance(embeddings: Any, relevance: Any, k: int, lambda_mult: float = 0.5,
+                               duplicate_threshold: float = 0.95, stop_early: bool = False) -> List[int]:
+    """
+    Selects up to k diverse, relevant candidates.
+
+    Args:
+        embeddings (Any): One embedding per candidate, as an (n, d) array-like.
+        relevance (Any): One relevance score per candidate in [0, 1], higher is better.
+        k (int): Maximum number of candidates to select.
+        lambda_mult (float, optional): Weight of relevance against redundancy (1 = relevance only).
+        duplicate_threshold (float, optional): Cosine similarity at or above which a candidate counts as a
+                                               duplicate of a selected one and is dropped.
+        stop_early (bool, optional): Stop once the best remaining candidate's relevance no longer outweighs
+                                     its redundancy, instead of filling all k slots.
+
+    Returns:
+        List[int]: Positions of the selected candidates, in selection order. Fewer than k only when the rest
+                   are duplicates, or with `stop_early`.
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    if not len(vectors) or k <= 0:
+        return []
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    similarity = vectors @ vectors.T
+
+    selected: List[int] = []
+    redundancy = np.zeros(len(vectors), dtype=np.float32)
+    available = np.ones(len(vectors), dtype=bool)
+    while len(selected) < k and available.any():
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        # The first pick is always the most relevant; with stop_early later ones must add more than they repeat
+        if stop_early and selected and scores[best] <= 0:
+            break
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        available &= similarity[best] < duplicate_threshold
+    return selected
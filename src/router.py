@@ -0,0 +1,153 @@
+"""
+Embedding-based intent router.
+
+Decides how `PDF_Pal_App` gathers context for a question by comparing the question's embedding
+with labeled prototype questions. It uses the embedding retrieval needs anyway, so routing costs
+no extra model call (the prototypes are embedded once, in one batch). Routes:
+
+- summary: document-level questions, answered from the summary tree.
+- lookup: specific questions, answered from content chunks.
+- comparison: questions spanning several uploaded files, answered from both.
+- followup: turns about the previous answer that need no new retrieval.
+
+Every decision is logged, and optionally appended to a JSONL file, so routing accuracy can be
+measured against labeled questions.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.logger import logger
+
+
+SUMMARY, LOOKUP, COMPARISON, FOLLOWUP = "summary", "lookup", "comparison", "followup"
+
+DEFAULT_PROTOTYPES: Dict[str, List[str]] = {
+    SUMMARY: [
+        "Summarize this document.",
+        "Give me an overview of the PDF.",
+        "What are the main points of the report?",
+        "tl;dr",
+        "What is this paper about?",
+        "Give me the key takeaways.",
+        "Briefly describe the whole document.",
+    ],
+    LOOKUP: [
+        "What does section 3 say about the warranty?",
+        "When is the deadline for submitting the form?",
+        "What is the torque value for the front axle bolts?",
+        "Who is the author of the study?",
+        "How much revenue did the company report in 2023?",
+        "Find the definition of force majeure in the contract.",
+        "Which table lists the test results?",
+    ],
+    COMPARISON: [
+        "Compare the two documents.",
+        "What are the differences between these files?",
+        "How does the first report differ from the second one?",
+        "Which of the contracts has the longer notice period?",
+        "Contrast the conclusions of both papers.",
+        "What do the uploaded PDFs have in common?",
+    ],
+    FOLLOWUP: [
+        "Thanks!",
+        "Can you explain that more simply?",
+        "Say that again in bullet points.",
+        "Translate your last answer into French.",
+        "Make it shorter.",
+        "What do you mean by that?",
+        "Ok, got it.",
+    ],
+}
+
+
+class Intent_Router:
+    """
+    This class classifies a query embedding by cosine similarity to labeled prototype questions.
+    A query closest to a route's prototypes takes that route if the similarity clears the threshold;
+    otherwise it takes the default route.
+    """
+    def __init__(self, embedder: Any, prototypes: Dict[str, List[str]] = None, threshold: float = 0.4,
+                 default_route: str = LOOKUP, log_path: Optional[str] = None) -> None:
+        """
+        Args:
+            embedder (Any): The embedding function used for queries, so prototypes live in the same space.
+            prototypes (Dict[str, List[str]], optional): Example questions per route. Defaults to DEFAULT_PROTOTYPES.
+            threshold (float, optional): Minimum cosine similarity to a prototype for a non-default route.
+            default_route (str, optional): The route taken when nothing is similar enough.
+            log_path (str, optional): JSONL file every decision is appended to. Disabled when omitted.
+        """
+        self.embedder = embedder
+        self.prototypes = prototypes or DEFAULT_PROTOTYPES
+        self.threshold = threshold
+        self.default_route = default_route
+        self.log_path = Path(log_path) if log_path else None
+        self._labels: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def _prototype_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._matrix is None:
+            with self._lock:
+                if self._matrix is None:
+                    labels = [route for route, examples in self.prototypes.items() for _ in examples]
+                    texts = [example for examples in self.prototypes.values() for example in examples]
+                    matrix = np.asarray(self.embedder(texts), dtype=np.float32)
+                    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                    self._labels = labels
+                    self._matrix = matrix / np.where(norms == 0, 1, norms)
+        return self._matrix, np.asarray(self._labels)
+
+    def warm_up(self) -> None:
+        """
+        Embeds the prototype questions ahead of the first query.
+        """
+        self._prototype_matrix()
+
+    def route(self, query_embedding: Any, query: str = "", session_id: str = "", allowed: List[str] = None) -> Tuple[str, float]:
+        """
+        Picks the route for a query.
+
+        Args:
+            query_embedding (Any): The query's embedding, as computed for retrieval.
+            query (str, optional): The query text, for the decision log.
+            session_id (str, optional): The session, for the decision log.
+            allowed (List[str], optional): Routes possible in the current state (e.g. no follow-up without history).
+                                           Defaults to every route.
+
+        Returns:
+            Tuple[str, float]: The route and its best prototype similarity.
+        """
+        matrix, labels = self._prototype_matrix()
+        vector = np.asarray(query_embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        similarities = matrix @ (vector / norm if norm else vector)
+
+        scores = {}
+        for route in (allowed or self.prototypes):
+            mask = labels == route
+            if mask.any():
+                scores[route] = float(similarities[mask].max())
+        best = max(scores, key=scores.get) if scores else self.default_route
+        score = scores.get(best, 0.0)
+        route = best if score >= self.threshold else self.default_route
+
+        with self._lock:
+            self.counts[route] = self.counts.get(route, 0) + 1
+        logger.opt(lazy=True).info("Routed query for session {} to '{}' (best: {} {:.3f}; scores: {}).",
+                                   lambda: session_id, lambda: route, lambda: best, lambda: score,
+                                   lambda: ", ".join(f"{name} {value:.3f}" for name, value in scores.items()))
+        if self.log_path is not None:
+            self._log({"session_id": session_id, "query": query, "route": route, "scores": scores})
+        return route, score
+
+    def _log(self, decision: Dict[str, Any]) -> None:
+        with self._lock:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.log_path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(decision) + "\n")
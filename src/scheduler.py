@@ -0,0 +1,264 @@
+"""
+Background job scheduler.
+
+A bounded pool of worker threads draining a priority queue. Interactive work (a user waiting on
+their own upload) is dequeued ahead of bulk backfill, jobs can be cancelled per session, and
+their state can be polled so callers can tell whether a background result is ready. A session
+keeps only the latest finished run of each job name, so recurring jobs don't grow the bookkeeping.
+"""
+
+import time
+import atexit
+import itertools
+import threading
+from queue import PriorityQueue
+from typing import Any, Callable, Dict, List, Optional
+
+from src.logger import logger
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class Job:
+    """
+    A unit of background work and its lifecycle state.
+    """
+    __slots__ = ("id", "session_id", "name", "priority", "fn", "args", "kwargs",
+                 "status", "error", "created_at", "started_at", "finished_at")
+
+    def __init__(self, job_id: int, session_id: str, name: str, priority: int, fn: Callable, args: tuple, kwargs: dict) -> None:
+        self.id = job_id
+        self.session_id = session_id
+        self.name = name
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "name": self.name,
+            "priority": self.priority,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class Job_Scheduler:
+    """
+    This class runs background jobs on a fixed number of worker threads.
+    Lower priority values run first; jobs of equal priority run in submission order.
+    """
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_BULK = 10
+    # Job IDs start at 1, so 0 is free to act as the worker stop signal
+    _SENTINEL = 0
+
+    def __init__(self, max_workers: int = 2) -> None:
+        """
+        Args:
+            max_workers (int, optional): Number of worker threads, i.e. the maximum number of jobs running at once.
+        """
+        self.max_workers = max(1, max_workers)
+        self._queue: PriorityQueue = PriorityQueue()
+        self._jobs: Dict[int, Job] = {}
+        # Session -> its jobs in submission order, so per-session queries don't scan every job
+        self._sessions: Dict[str, Dict[int, Job]] = {}
+        self._cancelled_sessions = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._stopping = False
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"job-worker-{index}", daemon=True)
+            for index in range(self.max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        # Drain gracefully on interpreter exit instead of letting jobs vanish mid-flight
+        atexit.register(self.shutdown)
+
+    def submit(self, fn: Callable, *args: Any, session_id: str, name: str, priority: int = PRIORITY_INTERACTIVE, **kwargs: Any) -> int:
+        """
+        Queues a job for background execution.
+
+        Args:
+            fn (Callable): The function to run.
+            *args (Any): Positional arguments for `fn`.
+            session_id (str): The session the job belongs to, used for cancellation and status queries.
+            name (str): A label identifying the job within its session (e.g. 'summary:report.pdf').
+            priority (int, optional): Scheduling priority; lower runs first.
+            **kwargs (Any): Keyword arguments for `fn`.
+
+        Returns:
+            int: The job ID. A job for a cancelled session is recorded as cancelled and never runs, until
+                 `resume_session` clears the flag.
+        """
+        with self._lock:
+            job = Job(next(self._ids), session_id, name, priority, fn, args, kwargs)
+            jobs = self._sessions.setdefault(session_id, {})
+            # Only the latest finished run of a name is kept, so recurring jobs (history compaction) don't pile up
+            for stale in [other.id for other in jobs.values() if other.name == name and other.status not in (QUEUED, RUNNING)]:
+                del jobs[stale]
+                del self._jobs[stale]
+            self._jobs[job.id] = job
+            jobs[job.id] = job
+            refused = session_id in self._cancelled_sessions
+            if refused:
+                job.status = CANCELLED
+                job.finished_at = job.created_at
+                job.args, job.kwargs = (), {}
+        if refused:
+            logger.info(f"Refused background job {job.id} '{name}' for cancelled session {session_id}.")
+            return job.id
+        self._queue.put((priority, job.id))
+        logger.info(f"Queued background job {job.id} '{name}' for session {session_id} (priority {priority}).")
+        return job.id
+
+    def _worker(self) -> None:
+        while True:
+            _, job_id = self._queue.get()
+            if job_id == self._SENTINEL:
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != QUEUED:
+                    continue
+                job.status = RUNNING
+                job.started_at = time.time()
+            try:
+                job.fn(*job.args, **job.kwargs)
+                status, error = DONE, None
+            except Exception as e:
+                status, error = FAILED, str(e)
+                logger.error(f"Background job {job.id} '{job.name}' failed: {e}")
+            with self._lock:
+                # A job cancelled while running keeps its cancelled state
+                if job.status == RUNNING:
+                    job.status = status
+                job.error = error
+                job.finished_at = time.time()
+                # Release references to large arguments (chunk lists) once the job is finished
+                job.args, job.kwargs = (), {}
+
+    def cancel_session(self, session_id: str) -> int:
+        """
+        Cancels every queued or running job of a session. Queued jobs never start; running jobs are
+        flagged so they can check `is_cancelled` and discard their results.
+
+        Args:
+            session_id (str): The session whose jobs should be cancelled.
+
+        Returns:
+            int: The number of jobs cancelled.
+        """
+        cancelled = 0
+        with self._lock:
+            self._cancelled_sessions.add(session_id)
+            for job in self._sessions.get(session_id, {}).values():
+                if job.status in (QUEUED, RUNNING):
+                    job.status = CANCELLED
+                    job.finished_at = time.time()
+                    cancelled += 1
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} background jobs for session {session_id}.")
+        return cancelled
+
+    def is_cancelled(self, session_id: str) -> bool:
+        """
+        Returns True if the session's jobs have been cancelled and the session hasn't been resumed since.
+        """
+        with self._lock:
+            return session_id in self._cancelled_sessions
+
+    def resume_session(self, session_id: str) -> None:
+        """
+        Clears a session's cancelled flag, so new work on it (e.g. a fresh upload) runs again.
+        """
+        with self._lock:
+            self._cancelled_sessions.discard(session_id)
+
+    def status(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Returns the state of a single job, or None if the ID is unknown or its record was superseded.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def session_status(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Returns the state of the session's jobs, oldest first: every queued or running one and the latest finished run of each name.
+        """
+        with self._lock:
+            return [job.to_dict() for job in self._sessions.get(session_id, {}).values()]
+
+    def forget_session(self, session_id: str) -> None:
+        """
+        Drops the bookkeeping of a session's finished jobs.
+        """
+        with self._lock:
+            jobs = self._sessions.get(session_id, {})
+            for job_id in [job.id for job in jobs.values() if job.status not in (QUEUED, RUNNING)]:
+                del jobs[job_id]
+                del self._jobs[job_id]
+            if not jobs:
+                self._sessions.pop(session_id, None)
+
+    def pending(self) -> int:
+        """
+        Returns the number of queued or running jobs.
+        """
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in (QUEUED, RUNNING))
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """
+        Blocks until no job is queued or running.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait. Waits indefinitely when omitted.
+
+        Returns:
+            bool: True if the scheduler went idle, False if the timeout expired first.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while self.pending():
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, wait: bool = True, timeout: float = 30.0) -> None:
+        """
+        Stops the workers. Queued jobs are cancelled; running jobs get up to `timeout` seconds to finish.
+        """
+        if self._stopping:
+            return
+        self._stopping = True
+        with self._lock:
+            dropped = [job for job in self._jobs.values() if job.status == QUEUED]
+            for job in dropped:
+                job.status = CANCELLED
+        if dropped:
+            logger.warning(f"Scheduler shutting down; {len(dropped)} queued jobs were not started.")
+        for _ in self._workers:
+            # Sentinels sort after every real priority so running work drains first
+            self._queue.put((float("inf"), self._SENTINEL))
+        if wait:
+            deadline = time.time() + timeout
+            for worker in self._workers:
+                worker.join(max(0.0, deadline - time.time()))
@@ -0,0 +1,351 @@
+"""
+Session lifecycle management.
+
+The shared engine keeps every session's chunks in one Chroma collection and its messages in
+PDF_Pal_Brain.history, so nothing is freed unless something removes it. `Session_Manager`
+deletes sessions explicitly, expires idle ones after a TTL, enforces per-session and global caps
+on chunk count and bytes, and evicts the least recently used sessions when the global caps are
+reached. Expired and evicted sessions are spilled to disk when a persistent directory is configured,
+so they come back on their next request. It also reports the memory footprint of every session.
+"""
+
+import json
+import time
+import shutil
+import threading
+import contextlib
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from src.document_store import content_hash
+from src.scheduler import QUEUED, RUNNING
+from src.logger import logger
+
+
+class Session_Manager:
+    """
+    This class tracks session activity and frees the memory of sessions that are deleted, idle or cold.
+    Limits of 0 are disabled.
+    """
+    # Expired session IDs remembered for `acknowledge_expiry`
+    EXPIRED_MEMORY = 10000
+
+    def __init__(self, rag: Any, brain: Any, scheduler: Any, idle_ttl: float = 3600, max_session_chunks: int = 0,
+                 max_session_bytes: int = 0, max_total_chunks: int = 0, max_total_bytes: int = 0,
+                 spill_dir: Optional[str] = None, sweep_interval: float = 60) -> None:
+        """
+        Args:
+            rag (Any): The RAG_Memory holding session chunks.
+            brain (Any): The PDF_Pal_Brain holding session histories.
+            scheduler (Any): The Job_Scheduler running session background jobs.
+            idle_ttl (float, optional): Seconds without activity after which a session is spilled, or deleted without a spill directory.
+            max_session_chunks (int, optional): Maximum chunks a single session may hold.
+            max_session_bytes (int, optional): Maximum estimated bytes a single session may hold.
+            max_total_chunks (int, optional): Maximum chunks across all live sessions before cold sessions are evicted.
+            max_total_bytes (int, optional): Maximum estimated bytes across all live sessions before cold sessions are evicted.
+            spill_dir (str, optional): Directory expired and evicted sessions are written to. Without it they are deleted.
+            sweep_interval (float, optional): Minimum seconds between idle sweeps triggered by activity.
+        """
+        self.rag = rag
+        self.brain = brain
+        self.scheduler = scheduler
+        self.idle_ttl = idle_ttl
+        self.max_session_chunks = max_session_chunks
+        self.max_session_bytes = max_session_bytes
+        self.max_total_chunks = max_total_chunks
+        self.max_total_bytes = max_total_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.sweep_interval = sweep_interval
+
+        # Session -> last activity time, least recently used first
+        self._last_used: "OrderedDict[str, float]" = OrderedDict()
+        self._spilled = set()
+        # Sessions whose data expiry deleted, until the UI owning them acknowledges it (oldest dropped past the cap)
+        self._expired: "OrderedDict[str, None]" = OrderedDict()
+        # Called with the session ID whenever a session's in-memory state is dropped, for state kept outside rag and brain
+        self._forget_hooks: List[Callable[[str], None]] = []
+        self._lock = threading.RLock()
+        # Session -> requests (chat turns, uploads) currently working on it; its own lock, so entering never waits on a spill
+        self._in_flight: Dict[str, int] = {}
+        self._flight_lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.counters = {"deleted": 0, "expired": 0, "evicted": 0, "spilled": 0, "restored": 0, "rejected": 0}
+
+    def on_forget(self, callback: Callable[[str], None]) -> None:
+        """
+        Registers a callback run with the session ID whenever a session is deleted, expired or spilled.
+        """
+        self._forget_hooks.append(callback)
+
+    def _forget(self, session_id: str) -> None:
+        self.brain.forget_session(session_id)
+        for callback in self._forget_hooks:
+            callback(session_id)
+
+    def touch(self, session_id: str) -> None:
+        """
+        Records activity on a session, restoring it from disk if it was spilled, and runs the idle
+        sweep when it is due.
+        """
+        with self._lock:
+            if session_id in self._spilled:
+                self._restore(session_id)
+            # Used again, so it starts over as a new session
+            self._expired.pop(session_id, None)
+            self._last_used[session_id] = time.time()
+            self._last_used.move_to_end(session_id)
+            due = self.idle_ttl and time.time() - self._last_sweep >= self.sweep_interval
+        if due:
+            self.expire_idle()
+
+    @contextlib.contextmanager
+    def in_flight(self, session_id: str) -> Iterator[None]:
+        """
+        Marks a request as working on the session for the duration of the block, so expiry and
+        eviction leave the session alone until it ends.
+        """
+        with self._flight_lock:
+            self._in_flight[session_id] = self._in_flight.get(session_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._flight_lock:
+                self._in_flight[session_id] -= 1
+                if not self._in_flight[session_id]:
+                    del self._in_flight[session_id]
+
+    def admit(self, session_id: str, chunks: int, nbytes: int) -> bool:
+        """
+        Checks whether a session may index more chunks. Per-session caps reject the request; global
+        caps are met by evicting the least recently used other sessions first.
+
+        Args:
+            session_id (str): The session about to index.
+            chunks (int): Number of chunks to be added.
+            nbytes (int): Estimated bytes to be added.
+
+        Returns:
+            bool: True if the chunks may be indexed.
+        """
+        with self._lock:
+            footprint = self.rag.session_footprint(session_id)
+            if (self.max_session_chunks and footprint["chunks"] + chunks > self.max_session_chunks) or \
+               (self.max_session_bytes and footprint["bytes"] + nbytes > self.max_session_bytes):
+                self.counters["rejected"] += 1
+                logger.warning(f"Session {session_id} would exceed its quota ({footprint['chunks'] + chunks} chunks, "
+                               f"{footprint['bytes'] + nbytes} bytes); rejecting {chunks} chunks.")
+                return False
+
+            while self._over_global(chunks, nbytes):
+                victim = self._coldest(exclude=session_id)
+                if victim is None:
+                    self.counters["rejected"] += 1
+                    logger.warning(f"Global memory cap reached and no session can be evicted; rejecting {chunks} chunks for {session_id}.")
+                    return False
+                self.evict(victim)
+            return True
+
+    def _over_global(self, chunks: int, nbytes: int) -> bool:
+        total_chunks, total_bytes = self._totals()
+        return bool((self.max_total_chunks and total_chunks + chunks > self.max_total_chunks) or
+                    (self.max_total_bytes and total_bytes + nbytes > self.max_total_bytes))
+
+    def _totals(self):
+        with self.rag._footprint_lock:
+            footprints = list(self.rag.footprints.values())
+        return sum(f["chunks"] for f in footprints), sum(f["bytes"] for f in footprints)
+
+    def _coldest(self, exclude: str) -> Optional[str]:
+        # Least recently used live session holding chunks, with no request or background job in flight
+        for session_id in self._last_used:
+            if session_id == exclude or session_id in self._spilled:
+                continue
+            if not self.rag.session_footprint(session_id)["chunks"]:
+                continue
+            if self._busy(session_id):
+                continue
+            return session_id
+        return None
+
+    def _busy(self, session_id: str) -> bool:
+        with self._flight_lock:
+            if session_id in self._in_flight:
+                return True
+        return any(job["status"] in (QUEUED, RUNNING) for job in self.scheduler.session_status(session_id))
+
+    def delete_session(self, session_id: str) -> None:
+        """
+        Removes a session completely: cancels its background jobs and drops its chunks, history and any spilled copy.
+        """
+        self.scheduler.cancel_session(session_id)
+        removed = self.rag.delete_session(session_id)
+        self._forget(session_id)
+        self.scheduler.forget_session(session_id)
+        with self._lock:
+            self._last_used.pop(session_id, None)
+            if session_id in self._spilled:
+                self._spilled.discard(session_id)
+                shutil.rmtree(self._spill_path(session_id), ignore_errors=True)
+            self.counters["deleted"] += 1
+        logger.success(f"Deleted session {session_id} ({removed} chunks).")
+
+    def expire_idle(self, now: float = None) -> List[str]:
+        """
+        Frees every session idle for longer than the TTL. With a spill directory they are spilled like
+        evicted sessions and come back on their next request; without one they are deleted and reported
+        by `acknowledge_expiry`. Sessions with a request in flight (see `in_flight`) or a background job
+        queued or running are skipped until it ends.
+
+        Args:
+            now (float, optional): The reference time. Defaults to the current time.
+
+        Returns:
+            List[str]: The expired session IDs.
+        """
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._last_sweep = now
+            if not self.idle_ttl:
+                return []
+            idle = [session_id for session_id, last_used in self._last_used.items()
+                    if now - last_used > self.idle_ttl and session_id not in self._spilled]
+        expired = []
+        for session_id in idle:
+            with self._lock:
+                # Checked again under the lock: a request starting after this waits in `touch`, which restores a spill
+                if session_id in self._spilled or self._busy(session_id) or now - self._last_used.get(session_id, now) <= self.idle_ttl:
+                    continue
+                expired.append(session_id)
+                if self.spill_dir is not None:
+                    self._spill(session_id)
+                else:
+                    self.delete_session(session_id)
+                    self._expired[session_id] = None
+                    while len(self._expired) > self.EXPIRED_MEMORY:
+                        self._expired.popitem(last=False)
+                self.counters["expired"] += 1
+        if expired:
+            logger.info(f"Expired {len(expired)} idle sessions.")
+        return expired
+
+    def acknowledge_expiry(self, session_id: str) -> bool:
+        """
+        Reports, once, that expiry deleted a session's documents and history, so a frontend can stop
+        listing its files as processed.
+
+        Returns:
+            bool: True if the session expired since the last call for it.
+        """
+        with self._lock:
+            if session_id in self._expired:
+                del self._expired[session_id]
+                return True
+            return False
+
+    def evict(self, session_id: str) -> None:
+        """
+        Frees a live session's memory: spills it to disk when a spill directory is configured, otherwise deletes it.
+        """
+        with self._lock:
+            self.counters["evicted"] += 1
+            if self.spill_dir is None:
+                logger.warning(f"Evicting cold session {session_id} without a spill directory; its data is dropped.")
+                self.delete_session(session_id)
+                return
+            self._spill(session_id)
+
+    def _spill_path(self, session_id: str) -> Path:
+        # Hash the ID so arbitrary session strings can't escape the spill directory
+        return self.spill_dir / content_hash(session_id)[:32]
+
+    def _spill(self, session_id: str) -> None:
+        path = self._spill_path(session_id)
+        path.mkdir(parents=True, exist_ok=True)
+        rows = self.rag.export_session(session_id)
+        history, dropped = self.brain.history.export(session_id)
+        np.save(path / "embeddings.npy", rows["embeddings"])
+        state = {
+            "session_id": session_id,
+            "ids": rows["ids"],
+            "documents": rows["documents"],
+            "metadatas": rows["metadatas"],
+            "history": history,
+            "history_dropped": dropped,
+            "history_summary": self.brain.history_summaries.get(session_id),
+        }
+        # Write-then-rename so a crash never leaves a half-written spill behind
+        tmp = path / "state.json.tmp"
+        tmp.write_text(json.dumps(state))
+        tmp.replace(path / "state.json")
+
+        self.rag.delete_session(session_id)
+        self._forget(session_id)
+        self._spilled.add(session_id)
+        self.counters["spilled"] += 1
+        logger.info(f"Spilled cold session {session_id} ({len(rows['ids'])} chunks) to {path}.")
+
+    def _restore(self, session_id: str) -> None:
+        path = self._spill_path(session_id)
+        try:
+            state = json.loads((path / "state.json").read_text())
+            embeddings = np.load(path / "embeddings.npy")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to restore spilled session {session_id}: {e}")
+            self._spilled.discard(session_id)
+            return
+        self.rag.import_session(session_id, {**state, "embeddings": embeddings})
+        if state["history"]:
+            self.brain.history.load(session_id, state["history"], state.get("history_dropped", 0))
+        if state["history_summary"]:
+            self.brain.history_summaries[session_id] = state["history_summary"]
+        shutil.rmtree(path, ignore_errors=True)
+        self._spilled.discard(session_id)
+        self.counters["restored"] += 1
+        logger.info(f"Restored spilled session {session_id} ({len(state['ids'])} chunks).")
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Reports the current memory footprint of every known session, the totals and the lifecycle counters.
+
+        Returns:
+            Dict[str, Any]: 'sessions' maps each session ID to its chunks, estimated bytes, history size,
+                            idle seconds and spill state; 'total', 'limits' and 'counters' summarize the process.
+        """
+        now = time.time()
+        with self._lock:
+            known = list(dict.fromkeys([*self._last_used, *self.rag.footprints, *self.brain.history]))
+            sessions = {}
+            for session_id in known:
+                footprint = self.rag.session_footprint(session_id)
+                history = self.brain.history.get(session_id, [])
+                last_used = self._last_used.get(session_id)
+                sessions[session_id] = {
+                    "chunks": footprint["chunks"],
+                    "bytes": footprint["bytes"],
+                    "history_messages": len(history),
+                    "history_bytes": sum(len(message["content"].encode("utf-8")) for message in history),
+                    "idle_seconds": round(now - last_used, 1) if last_used else None,
+                    "spilled": session_id in self._spilled,
+                }
+            live = [data for data in sessions.values() if not data["spilled"]]
+            return {
+                "sessions": sessions,
+                "total": {
+                    "sessions": len(live),
+                    "spilled_sessions": len(self._spilled),
+                    "chunks": sum(data["chunks"] for data in live),
+                    "bytes": sum(data["bytes"] for data in live),
+                    "history_bytes": sum(data["history_bytes"] for data in live),
+                },
+                "limits": {
+                    "idle_ttl": self.idle_ttl,
+                    "max_session_chunks": self.max_session_chunks,
+                    "max_session_bytes": self.max_session_bytes,
+                    "max_total_chunks": self.max_total_chunks,
+                    "max_total_bytes": self.max_total_bytes,
+                },
+                "counters": dict(self.counters),
+            }
@@ -0,0 +1,59 @@
+"""
+Helpers for streamed LLM responses.
+"""
+
+from typing import Iterable, Iterator
+
+# Chat-template tags some models leak into their output
+LEAKED_MARKERS = ("<|im_start|>", "<|im_end|>")
+
+
+class Marker_Stripper:
+    """
+    This class removes leaked chat-template markers from a token stream. A marker can be split
+    across several deltas, so any trailing text that could still grow into a marker is held back
+    until the next delta (or the end of the stream) decides it.
+    """
+    def __init__(self, markers: Iterable[str] = LEAKED_MARKERS) -> None:
+        self.markers = tuple(markers)
+        self._pending = ""
+
+    def feed(self, text: str) -> str:
+        """
+        Adds the next delta and returns the text that is now safe to emit.
+        """
+        buffer = self._pending + text
+        for marker in self.markers:
+            buffer = buffer.replace(marker, "")
+        hold = self._partial_marker_length(buffer)
+        self._pending = buffer[len(buffer) - hold:] if hold else ""
+        return buffer[:len(buffer) - hold]
+
+    def flush(self) -> str:
+        """
+        Returns whatever was held back once the stream has ended.
+        """
+        text, self._pending = self._pending, ""
+        return text
+
+    def _partial_marker_length(self, buffer: str) -> int:
+        # Length of the longest suffix of `buffer` that is a proper prefix of some marker
+        for length in range(min(len(buffer), max(len(marker) for marker in self.markers) - 1), 0, -1):
+            suffix = buffer[-length:]
+            if any(marker.startswith(suffix) for marker in self.markers):
+                return length
+        return 0
+
+
+def strip_markers(deltas: Iterable[str]) -> Iterator[str]:
+    """
+    Yields a stream of text deltas with leaked chat-template markers removed, skipping empty deltas.
+    """
+    stripper = Marker_Stripper()
+    for delta in deltas:
+        text = stripper.feed(delta)
+        if text:
+            yield text
+    tail = stripper.flush()
+    if tail:
+        yield tail
@@ -0,0 +1,440 @@
+"""
+Map-Reduce document summarizer.
+
+Runs the map phase of the background summary with bounded concurrency, packs several chunks
+into one map request when they fit the token budget, and retries rate-limited calls with
+backoff. Prompt templates are read from disk once per process.
+
+Summaries form a tree: token-budgeted windows of chunks are summarized into sections, sections
+are grouped and summarized level by level until a single document root remains. Every node is
+memoized by the hash of its input, so re-summarizing a document that gained pages only pays
+for the windows (and their ancestors) that actually changed.
+
+Given an async client, the same pipeline is available as coroutines (`amap`, `abuild_tree`) that
+run on the caller's event loop instead of the worker pool.
+"""
+
+import time
+import random
+import asyncio
+import threading
+import weakref
+import tempfile
+from pathlib import Path
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Any, Optional, Tuple
+
+from src.document_store import content_hash
+from src.logger import logger
+
+PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
+
+# Errors worth retrying: provider throttling, transient server failures and dropped connections
+@lru_cache(maxsize=None)
+def retryable_errors() -> tuple:
+    # Imported on first use so loading the summarizer doesn't pull in the Groq SDK
+    import groq
+    return (groq.RateLimitError, groq.InternalServerError, groq.APIConnectionError)
+
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str) -> str:
+    """
+    Reads a prompt template from src/prompts once and caches it for the lifetime of the process.
+
+    Args:
+        name (str): The prompt file name, e.g. 'map_summary_prompt.md'.
+
+    Returns:
+        str: The template text.
+    """
+    return (PROMPTS_DIR / name).read_text()
+
+
+def chunk_tokens(chunk: Any) -> int:
+    """
+    Returns a chunk's token count, estimating it from its length when the chunker didn't provide one.
+    """
+    return getattr(chunk, "token_count", None) or len(chunk.text) // 4
+
+
+def level_granularity(depth: int, levels: int) -> str:
+    """
+    Names a summary tree level: leaves are sections, the root is the document, anything between is a chapter.
+    """
+    if depth == levels - 1:
+        return "document"
+    return "section" if depth == 0 else "chapter"
+
+
+class Map_Reduce_Summarizer:
+    """
+    This class performs the map and reduce LLM calls behind PDF_Pal_App.generate_document_summary.
+    A single worker pool is shared by every document, so a bulk upload never exceeds `concurrency`
+    simultaneous map requests.
+    """
+    def __init__(self, client: Any, model: str, concurrency: int = 4, pack_token_budget: int = 6000,
+                 max_retries: int = 5, backoff_base: float = 1.0, temperature: float = 0.3, async_client: Any = None) -> None:
+        """
+        Args:
+            client (Any): The Groq client used for completions.
+            model (str): The model used for map and reduce calls.
+            concurrency (int, optional): Maximum number of in-flight map requests.
+            pack_token_budget (int, optional): Maximum chunk tokens packed into one map request.
+                                               0 disables packing (one request per chunk).
+            max_retries (int, optional): Retry attempts for rate-limited or transient failures.
+            backoff_base (float, optional): Base delay in seconds for exponential backoff.
+            temperature (float, optional): Sampling temperature for summary calls.
+            async_client (Any, optional): An AsyncGroq client, required only by the coroutine API.
+        """
+        self.client = client
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.pack_token_budget = pack_token_budget
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.temperature = temperature
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="summary-map")
+        # Node summaries keyed by hash of (prompt, input); bounded so long-running servers don't grow forever
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+        self._memo_size = 4096
+        self._memo_lock = threading.Lock()
+        self.async_client = async_client
+        # One semaphore per event loop bounds in-flight async requests the way the pool bounds threads
+        self._async_limits = weakref.WeakKeyDictionary()
+
+    def pack(self, chunks: List[Any]) -> List[str]:
+        """
+        Greedily groups consecutive chunks into map payloads that fit the token budget.
+
+        Args:
+            chunks (List[Any]): The chunks to summarize, in document order.
+
+        Returns:
+            List[str]: One text payload per map request, in document order.
+        """
+        if not self.pack_token_budget:
+            return [chunk.text for chunk in chunks]
+
+        payloads, current, current_tokens = [], [], 0
+        for chunk in chunks:
+            tokens = chunk_tokens(chunk)
+            if current and current_tokens + tokens > self.pack_token_budget:
+                payloads.append("\n\n---\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(chunk.text)
+            current_tokens += tokens
+        if current:
+            payloads.append("\n\n---\n\n".join(current))
+        return payloads
+
+    def complete(self, prompt: str) -> str:
+        """
+        Sends one summary prompt to the LLM, retrying rate limits and transient errors with backoff.
+        A `retry-after` header from the provider takes precedence over the computed delay.
+
+        Args:
+            prompt (str): The fully formatted user prompt.
+
+        Returns:
+            str: The completion text.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.chat.completions.create(**self._request(prompt))
+                return response.choices[0].message.content
+            except retryable_errors() as e:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(e, attempt))
+
+    async def acomplete(self, prompt: str) -> str:
+        """
+        Coroutine variant of `complete` using the async client; backoff sleeps don't block the event loop.
+        """
+        async with self._async_limit():
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await self.async_client.chat.completions.create(**self._request(prompt))
+                    return response.choices[0].message.content
+                except retryable_errors() as e:
+                    if attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(self._backoff(e, attempt))
+
+    def _request(self, prompt: str) -> dict:
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature
+        }
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        delay = self._retry_after(error)
+        if delay is None:
+            # Exponential backoff with full jitter to de-synchronize concurrent workers
+            delay = random.uniform(0, self.backoff_base * (2 ** attempt))
+        logger.warning(f"Summary call throttled or failed ({type(error).__name__}); retrying in {delay:.2f}s.")
+        return delay
+
+    def _async_limit(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_limits:
+            self._async_limits[loop] = asyncio.Semaphore(self.concurrency)
+        return self._async_limits[loop]
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def _memoized(self, prompt_name: str, field: str, payload: str) -> Optional[str]:
+        key = content_hash(self.model, prompt_name, payload)
+        cached = self._memo_get(key)
+        if cached is not None:
+            return cached
+        try:
+            summary = self.complete(load_prompt(prompt_name).format(**{field: payload}))
+        except Exception as e:
+            logger.warning(f"Failed to cleanly summarize sub-chunk: {e}")
+            return None
+        self._memo_put(key, summary)
+        return summary
+
+    async def _amemoized(self, prompt_name: str, field: str, payload: str) -> Optional[str]:
+        key = content_hash(self.model, prompt_name, payload)
+        cached = self._memo_get(key)
+        if cached is not None:
+            return cached
+        try:
+            summary = await self.acomplete(load_prompt(prompt_name).format(**{field: payload}))
+        except Exception as e:
+            logger.warning(f"Failed to cleanly summarize sub-chunk: {e}")
+            return None
+        self._memo_put(key, summary)
+        return summary
+
+    def _memo_get(self, key: str) -> Optional[str]:
+        with self._memo_lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        return None
+
+    def _memo_put(self, key: str, summary: Optional[str]) -> None:
+        if summary:
+            with self._memo_lock:
+                self._memo[key] = summary
+                while len(self._memo) > self._memo_size:
+                    self._memo.popitem(last=False)
+
+    def _map_one(self, payload: str) -> Optional[str]:
+        return self._memoized("map_summary_prompt.md", "text", payload)
+
+    def _reduce_one(self, payload: str) -> Optional[str]:
+        return self._memoized("reduce_summary_prompt.md", "combined_text", payload)
+
+    def map(self, chunks: List[Any]) -> List[str]:
+        """
+        Runs the map phase: summarizes packed chunk payloads concurrently.
+
+        Args:
+            chunks (List[Any]): The chunks to summarize, in document order.
+
+        Returns:
+            List[str]: The successful mini summaries, in document order.
+        """
+        payloads = self.pack(chunks)
+        logger.info(f"Map phase: {len(chunks)} chunks packed into {len(payloads)} requests (concurrency {self.concurrency}).")
+        return [summary for summary in self._pool.map(self._map_one, payloads) if summary]
+
+    async def amap(self, chunks: List[Any]) -> List[str]:
+        """
+        Coroutine variant of `map`: summarizes packed payloads concurrently on the running event loop.
+        """
+        payloads = self.pack(chunks)
+        logger.info(f"Async map phase: {len(chunks)} chunks packed into {len(payloads)} requests (concurrency {self.concurrency}).")
+        summaries = await asyncio.gather(*(self._amemoized("map_summary_prompt.md", "text", payload) for payload in payloads))
+        return [summary for summary in summaries if summary]
+
+    def stream(self, cancelled: Callable[[], bool] = None, defer: bool = False) -> "Streaming_Map":
+        """
+        Starts an incremental map phase that summarizes windows while chunks are still arriving.
+
+        Args:
+            cancelled (Callable[[], bool], optional): Checked before each window is sent; True drops it.
+            defer (bool, optional): Hold the windows back until `result()` instead of sending them as they fill.
+        """
+        return Streaming_Map(self, cancelled, defer)
+
+    def reduce(self, mini_summaries: List[str]) -> str:
+        """
+        Runs the reduce phase: merges mini summaries into one global summary.
+
+        Args:
+            mini_summaries (List[str]): The map phase outputs.
+
+        Returns:
+            str: The global summary text.
+        """
+        combined_text = " ".join(mini_summaries)
+        return self.complete(load_prompt("reduce_summary_prompt.md").format(combined_text=combined_text))
+
+    def _group(self, summaries: List[str]) -> List[str]:
+        # Like pack(), but every group takes at least two nodes so each level strictly shrinks
+        groups, current, current_tokens = [], [], 0
+        for summary in summaries:
+            tokens = len(summary) // 4
+            if len(current) >= 2 and current_tokens + tokens > (self.pack_token_budget or 6000):
+                groups.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
+        if current:
+            groups.append(" ".join(current))
+        return groups
+
+    def build_tree(self, sections: List[str]) -> List[List[str]]:
+        """
+        Summarizes section summaries level by level until a single document root remains.
+        Each level's groups are summarized concurrently.
+
+        Args:
+            sections (List[str]): The leaf (section) summaries, in document order.
+
+        Returns:
+            List[List[str]]: The tree levels from the sections up to the root; the last level holds one node.
+        """
+        levels = [sections]
+        current = sections
+        while True:
+            groups = self._group(current)
+            if len(groups) == 1:
+                root = self._reduce_one(groups[0])
+                if root:
+                    levels.append([root])
+                return levels
+            current = [summary for summary in self._pool.map(self._reduce_one, groups) if summary]
+            if not current:
+                return levels
+            logger.info(f"Summary tree level {len(levels)}: {len(groups)} groups summarized.")
+            levels.append(current)
+
+    async def abuild_tree(self, sections: List[str]) -> List[List[str]]:
+        """
+        Coroutine variant of `build_tree`.
+        """
+        levels = [sections]
+        current = sections
+        while True:
+            groups = self._group(current)
+            if len(groups) == 1:
+                root = await self._amemoized("reduce_summary_prompt.md", "combined_text", groups[0])
+                if root:
+                    levels.append([root])
+                return levels
+            summaries = await asyncio.gather(*(self._amemoized("reduce_summary_prompt.md", "combined_text", group) for group in groups))
+            current = [summary for summary in summaries if summary]
+            if not current:
+                return levels
+            logger.info(f"Summary tree level {len(levels)}: {len(groups)} groups summarized.")
+            levels.append(current)
+
+
+class Streaming_Map:
+    """
+    This class packs streamed chunks into token-budgeted windows and submits each window to the
+    map pool as soon as it is full, so section summaries overlap ingestion and only the open
+    window's text is held in memory. Deferred maps write their windows to an anonymous temporary
+    file until `result()`, so the calls run inside the (prioritized) summary job instead of during
+    ingestion, and each window is read back only when its call is about to run.
+    """
+    def __init__(self, summarizer: Map_Reduce_Summarizer, cancelled: Callable[[], bool] = None, defer: bool = False) -> None:
+        self.summarizer = summarizer
+        self._cancelled = cancelled or (lambda: False)
+        self._defer = defer
+        self._futures = []
+        # Deferred windows: (offset, length) of each one's UTF-8 text in the spill file, created on first use
+        self._spill = None
+        self._windows: List[Tuple[int, int]] = []
+        self._spill_lock = threading.Lock()
+        self._current = []
+        self._current_tokens = 0
+
+    def add(self, chunk: Any) -> None:
+        """
+        Adds the next chunk of the document, flushing the open window when the budget would overflow.
+        """
+        tokens = chunk_tokens(chunk)
+        budget = self.summarizer.pack_token_budget
+        if self._current and (not budget or self._current_tokens + tokens > budget):
+            self._flush()
+        self._current.append(chunk.text)
+        self._current_tokens += tokens
+
+    def _flush(self) -> None:
+        payload = "\n\n---\n\n".join(self._current)
+        if self._defer:
+            data = payload.encode("utf-8")
+            with self._spill_lock:
+                if self._spill is None:
+                    self._spill = tempfile.TemporaryFile()
+                self._spill.seek(0, 2)
+                self._windows.append((self._spill.tell(), len(data)))
+                self._spill.write(data)
+        else:
+            self._futures.append(self.summarizer._pool.submit(self._map_one, payload))
+        self._current, self._current_tokens = [], 0
+
+    def _map_one(self, payload: str) -> Optional[str]:
+        # A window still queued when its session is deleted is dropped rather than sent
+        if self._cancelled():
+            return None
+        return self.summarizer._map_one(payload)
+
+    def _map_spilled(self, offset: int, length: int) -> Optional[str]:
+        if self._cancelled():
+            return None
+        with self._spill_lock:
+            if self._spill is None:
+                return None
+            self._spill.seek(offset)
+            payload = self._spill.read(length).decode("utf-8")
+        return self.summarizer._map_one(payload)
+
+    def _close_spill(self) -> None:
+        with self._spill_lock:
+            if self._spill is not None:
+                self._spill.close()
+            self._spill, self._windows = None, []
+
+    def cancel(self) -> None:
+        """
+        Drops every window not yet sent. Calls already running finish, but their results are discarded.
+        """
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        self._close_spill()
+        self._current, self._current_tokens = [], 0
+
+    def result(self) -> List[str]:
+        """
+        Flushes the last window and waits for every section summary.
+
+        Returns:
+            List[str]: The successful section summaries, in document order.
+        """
+        if self._current:
+            self._flush()
+        self._futures.extend(self.summarizer._pool.submit(self._map_spilled, offset, length) for offset, length in self._windows)
+        try:
+            return [summary for summary in (future.result() for future in self._futures) if summary]
+        finally:
+            self._close_spill()
@@ -0,0 +1,151 @@
+"""
+Token counting and prompt budgeting.
+
+Counts tokens with the chat model's tokenizer when one is configured and loadable, falling back
+to a characters / 4 estimate otherwise. `Token_Budget` splits a fixed prompt budget between the
+system prompt, retrieved context and conversation history, so input size (and with it latency
+and cost) stays bounded regardless of chunk or message length.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.logger import logger
+
+# Chat formats wrap every message in role markers; a few tokens per message is typical for Llama-style templates
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class Token_Counter:
+    """
+    This class counts tokens for prompt budgeting. The tokenizer is loaded on first use; when it
+    can't be loaded (offline, gated model, no name configured) counts fall back to len(text) / 4.
+    """
+    def __init__(self, tokenizer_name: str = "") -> None:
+        """
+        Args:
+            tokenizer_name (str, optional): A Hugging Face tokenizer ID or local tokenizer.json path matching
+                                            the chat model. Empty uses the character estimate.
+        """
+        self.tokenizer_name = tokenizer_name
+        self._tokenizer = None
+        self._loaded = not tokenizer_name
+
+    def _load(self) -> Optional[Any]:
+        if not self._loaded:
+            self._loaded = True
+            try:
+                from tokenizers import Tokenizer
+                if self.tokenizer_name.endswith(".json"):
+                    self._tokenizer = Tokenizer.from_file(self.tokenizer_name)
+                else:
+                    self._tokenizer = Tokenizer.from_pretrained(self.tokenizer_name)
+                logger.info(f"Loaded tokenizer '{self.tokenizer_name}' for prompt budgeting.")
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer '{self.tokenizer_name}' ({e}); estimating tokens as characters / 4.")
+        return self._tokenizer
+
+    def count(self, text: str) -> int:
+        """
+        Returns the number of tokens in a text.
+        """
+        if not text:
+            return 0
+        tokenizer = self._load()
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False).ids)
+        return math.ceil(len(text) / 4)
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """
+        Returns the number of prompt tokens a list of chat messages occupies, including per-message overhead.
+        """
+        return sum(self.count(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cuts a text down to at most `max_tokens` tokens, preferring to cut at a paragraph boundary
+        so retrieved chunks are kept whole where possible.
+
+        Args:
+            text (str): The text to shorten.
+            max_tokens (int): The token limit.
+
+        Returns:
+            str: The text unchanged if it fits, otherwise its longest prefix within the limit.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+
+        tokenizer = self._load()
+        if tokenizer is not None:
+            offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+            cut = text[:offsets[max_tokens - 1][1]]
+        else:
+            cut = text[:max_tokens * 4]
+
+        # Drop a trailing partial chunk unless that would throw away most of the allowance
+        boundary = cut.rfind("\n\n")
+        if boundary > len(cut) // 2:
+            cut = cut[:boundary]
+        return cut
+
+
+class Token_Budget:
+    """
+    This class shares a fixed prompt-token budget between the system prompt, the retrieved context
+    and the conversation history. The system template and the current query are always sent; the
+    context gets up to `context_share` of what remains and the history gets the rest, including any
+    allowance the context didn't use.
+    """
+    def __init__(self, counter: Token_Counter, total: int = 6000, context_share: float = 0.6, summary_share: float = 0.2) -> None:
+        """
+        Args:
+            counter (Token_Counter): The token counter.
+            total (int, optional): Maximum prompt tokens per request.
+            context_share (float, optional): Fraction of the free budget reserved for retrieved context.
+            summary_share (float, optional): Fraction of the history budget reserved for the rolling summary
+                                             of compacted turns.
+        """
+        self.counter = counter
+        self.total = total
+        self.context_share = context_share
+        self.summary_share = summary_share
+
+    def split(self, template_tokens: int, context_tokens: int, query_tokens: int) -> Tuple[int, int]:
+        """
+        Computes the context and history allowances for one request.
+
+        Args:
+            template_tokens (int): Tokens of the system prompt without context.
+            context_tokens (int): Tokens of the full retrieved context.
+            query_tokens (int): Tokens of the current user message.
+
+        Returns:
+            Tuple[int, int]: The (context, history) token allowances.
+        """
+        available = max(0, self.total - template_tokens - query_tokens - 2 * MESSAGE_OVERHEAD_TOKENS)
+        context_budget = min(context_tokens, int(available * self.context_share))
+        return context_budget, available - context_budget
+
+    def select_history(self, messages: List[Dict[str, str]], budget: int) -> int:
+        """
+        Finds how many of the most recent messages fit the history budget.
+
+        Args:
+            messages (List[Dict[str, str]]): Prior conversation turns, oldest first.
+            budget (int): The token allowance.
+
+        Returns:
+            int: The index of the oldest message that still fits; earlier messages must be compacted.
+        """
+        used, cut = 0, len(messages)
+        while cut > 0:
+            tokens = self.counter.count(messages[cut - 1]["content"]) + MESSAGE_OVERHEAD_TOKENS
+            if used + tokens > budget:
+                break
+            used += tokens
+            cut -= 1
+        return cut
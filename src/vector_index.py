@@ -0,0 +1,404 @@
+"""
+Per-session flat vector index.
+
+Chroma keeps every session's chunks in one shared HNSW graph and filters by session at query
+time, so a session's searches get slower, and filtered HNSW loses recall, as other tenants fill
+the graph. Most sessions hold a few hundred chunks, where an exact scan is faster and perfectly
+accurate: each session's normalized embeddings live in one contiguous NumPy matrix, and a batch
+of queries is a single matrix product plus a partial sort, whatever else is loaded. RAG_Memory keeps
+those rows in Chroma without their vectors, and rebuilds the matrix from its document store. A
+session that outgrows `max_vectors` is promoted: `promote` hands its vectors back to be inserted
+into the HNSW collection and drops the matrix.
+
+The matrices can be stored compactly: float16 halves them and int8 scalar quantization (one
+scale per row) quarters them. Compact scores only pick candidates; the best `rescore` x k are
+rescored from a finer copy: a float32 memory-mapped one when `storage_dir` is set, otherwise (for
+int8) a float16 one in RAM. That copy costs memory: int8 codes plus float16 are 3 bytes per
+dimension, only 1.33x smaller than float32, and rescoring is float16-accurate. With `storage_dir`
+the matrices themselves are memory-mapped files too, so the OS pages them in on demand instead of
+the process holding them.
+"""
+
+import os
+import shutil
+import weakref
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.document_store import content_hash
+from src.logger import logger
+
+DTYPES = ("float32", "float16", "int8")
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scales each row to unit length, so dot products are cosine similarities. Zero rows stay zero.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row scalar quantization: returns int8 codes and the float32 scale restoring each row.
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class _Session_Matrix:
+    """
+    The vectors of one session: row-major arrays with spare capacity, and each row's ID and chunk type.
+    `codes` holds the searched representation; `scales` (int8 only) and `full` (the rescoring copy, when
+    there is one) sit alongside.
+    """
+    __slots__ = ("ids", "positions", "types", "codes", "scales", "full", "size", "limit", "_allocate", "_generation")
+
+    def __init__(self, dim: int, dtype: np.dtype, allocate: Callable[[str, Tuple[int, ...], Any], np.ndarray],
+                 full_dtype: Optional[np.dtype], limit: int, capacity: int = 64) -> None:
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.size = 0
+        self.limit = limit
+        self._allocate = allocate
+        self._generation = 0
+        capacity = min(capacity, limit)
+        self.types = np.zeros(capacity, dtype=np.uint8)
+        self.codes = allocate("codes-0", (capacity, dim), dtype)
+        self.scales = np.ones(capacity, dtype=np.float32) if dtype == np.int8 else None
+        self.full = allocate("full-0", (capacity, dim), full_dtype) if full_dtype is not None else None
+
+    def _grow(self, array: Optional[np.ndarray], name: str, capacity: int) -> Optional[np.ndarray]:
+        if array is None:
+            return None
+        if array.ndim == 1:
+            grown = np.ones(capacity, dtype=array.dtype) if array.dtype == np.float32 else np.zeros(capacity, dtype=array.dtype)
+        else:
+            grown = self._allocate(f"{name}-{self._generation}", (capacity, array.shape[1]), array.dtype)
+        grown[:self.size] = array[:self.size]
+        return grown
+
+    def append(self, ids: List[str], vectors: np.ndarray, type_code: int) -> None:
+        needed = self.size + len(ids)
+        if needed > len(self.codes):
+            # Doubling keeps appends amortized O(1), up to the most the session may hold; searches hold views
+            # of the old arrays, which stay valid
+            capacity = max(needed, min(2 * len(self.codes), self.limit))
+            self._generation += 1
+            old = [self.codes, self.full]
+            self.codes = self._grow(self.codes, "codes", capacity)
+            self.full = self._grow(self.full, "full", capacity)
+            self.scales = self._grow(self.scales, "scales", capacity)
+            self.types = self._grow(self.types, "types", capacity)
+            for array in old:
+                _release(array)
+        if self.scales is not None:
+            codes, scales = quantize_int8(vectors)
+            self.codes[self.size:needed] = codes
+            self.scales[self.size:needed] = scales
+        else:
+            self.codes[self.size:needed] = vectors
+        if self.full is not None:
+            self.full[self.size:needed] = vectors
+        self.types[self.size:needed] = type_code
+        for offset, chunk_id in enumerate(ids):
+            self.positions[chunk_id] = self.size + offset
+        self.ids.extend(ids)
+        self.size = needed
+
+    def decode(self, rows: np.ndarray) -> np.ndarray:
+        # Best available float32 version of the given rows
+        if self.full is not None:
+            return np.asarray(self.full[rows], dtype=np.float32)
+        vectors = np.asarray(self.codes[rows], dtype=np.float32)
+        return vectors * self.scales[rows, None] if self.scales is not None else vectors
+
+    def close(self) -> None:
+        for array in (self.codes, self.full):
+            _release(array)
+
+
+def _release(array: Optional[np.ndarray]) -> None:
+    # The file is unlinked now; open searches keep their mapping until they drop it
+    if isinstance(array, np.memmap):
+        try:
+            os.unlink(array.filename)
+        except OSError:
+            pass
+
+
+class Flat_Vector_Index:
+    """
+    This class serves exact top-k cosine search over small sessions from per-session NumPy matrices,
+    holds those sessions' vectors, and tracks which sessions have grown past it.
+    """
+    def __init__(self, max_vectors: int = 4096, dtype: str = "float32", rescore: int = 4, storage_dir: Optional[str] = None) -> None:
+        """
+        Args:
+            max_vectors (int, optional): Vectors a session may hold before it is promoted to the ANN index (0 disables the flat tier).
+            dtype (str, optional): Storage type of the matrices: 'float32', 'float16' (half the memory) or 'int8'
+                                   (scalar-quantized, a quarter). Scores are always computed in float32.
+            rescore (int, optional): With a compact dtype, the best rescore x k candidates are rescored from a finer copy
+                                     (0 = off): float32 under `storage_dir`, otherwise float16 for int8 storage, which
+                                     brings int8 to 3 bytes per dimension. Ignored for float16 without `storage_dir`.
+            storage_dir (str, optional): Directory for memory-mapped matrices and their float32 originals. In RAM when omitted.
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported flat index dtype '{dtype}'; use one of {', '.join(DTYPES)}.")
+        self.max_vectors = max_vectors
+        self.dtype = np.dtype(dtype)
+        self._storage_root = Path(storage_dir) if storage_dir else None
+        # A float16 copy in RAM would only duplicate float16 codes, so without a storage directory only int8 rescores
+        self.rescore = rescore if dtype != "float32" and (self._storage_root is not None or dtype == "int8") else 0
+        if rescore and dtype == "float16" and not self.rescore:
+            logger.warning(f"Flat index rescoring (rescore={rescore}) needs a storage directory with float16; ranking by float16 scores only.")
+        self._full_dtype = None if not self.rescore else np.dtype(np.float32 if self._storage_root is not None else np.float16)
+        # The files are scratch space rebuilt from the collection, so each index gets its own directory. It exists
+        # while the index holds sessions and is removed with the last one, at garbage collection or at exit
+        self.storage_dir: Optional[Path] = None
+        self._cleanup: Optional[weakref.finalize] = None
+        self._type_codes: Dict[str, int] = {}
+        self._sessions: Dict[str, _Session_Matrix] = {}
+        self._promoted = set()
+        self._lock = threading.RLock()
+
+    def _allocator(self, session_id: str) -> Callable[[str, Tuple[int, ...], Any], np.ndarray]:
+        if self._storage_root is None:
+            return lambda name, shape, dtype: np.zeros(shape, dtype=dtype)
+        if self.storage_dir is None:
+            self._storage_root.mkdir(parents=True, exist_ok=True)
+            self.storage_dir = Path(tempfile.mkdtemp(prefix="flat-index-", dir=self._storage_root))
+            self._cleanup = weakref.finalize(self, shutil.rmtree, str(self.storage_dir), True)
+        # Session IDs come from clients, so file names are derived from a hash rather than the ID itself
+        prefix = content_hash("flat-index", session_id)[:24]
+        return lambda name, shape, dtype: np.memmap(self.storage_dir / f"{prefix}-{name}.bin", dtype=dtype, mode="w+", shape=shape)
+
+    def accepts(self, session_id: str) -> bool:
+        """
+        Whether new vectors of the session belong in the flat tier.
+        """
+        with self._lock:
+            return self.max_vectors > 0 and session_id not in self._promoted
+
+    def serves(self, session_id: str) -> bool:
+        """
+        Whether the session's searches can be answered from the flat tier.
+        """
+        with self._lock:
+            return session_id in self._sessions
+
+    def room(self, session_id: str) -> int:
+        """
+        Returns how many more vectors the session can add before it has to be promoted (0 once it is).
+        """
+        with self._lock:
+            if not self.accepts(session_id):
+                return 0
+            return self.max_vectors - self.size(session_id)
+
+    def add(self, session_id: str, chunk_type: str, ids: Sequence[str], vectors: Sequence[Sequence[float]]) -> int:
+        """
+        Adds a session's vectors. IDs already present are skipped.
+
+        Args:
+            session_id (str): The session the vectors belong to.
+            chunk_type (str): The chunk type ('content' or 'summary').
+            ids (Sequence[str]): The chunk IDs, matching the Chroma row IDs.
+            vectors (Sequence[Sequence[float]]): One embedding per ID.
+
+        Returns:
+            int: The number of vectors added.
+
+        Raises:
+            ValueError: If the session is promoted or the vectors don't fit in `room`; promote it first.
+        """
+        if not ids:
+            return 0
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            if not self.accepts(session_id):
+                raise ValueError(f"Session {session_id} is not in the flat tier.")
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session_Matrix(
+                    vectors.shape[1], self.dtype, self._allocator(session_id), self._full_dtype, self.max_vectors
+                )
+            fresh = [position for position, chunk_id in enumerate(ids) if chunk_id not in session.positions]
+            fresh = list({ids[position]: position for position in fresh}.values())
+            if session.size + len(fresh) > self.max_vectors:
+                raise ValueError(f"Session {session_id} would hold {session.size + len(fresh)} vectors, over the flat tier's "
+                                 f"{self.max_vectors}; promote it first.")
+            type_code = self._type_codes.setdefault(chunk_type, len(self._type_codes))
+            session.append([ids[position] for position in fresh], vectors[fresh], type_code)
+            return len(fresh)
+
+    def promote(self, session_id: str) -> Dict[str, np.ndarray]:
+        """
+        Moves a session out of the flat tier: its matrix is dropped and later vectors are refused.
+
+        Returns:
+            Dict[str, np.ndarray]: The session's vectors by chunk ID (normalized float32, from the finest copy held),
+                                   for the caller to insert into the ANN index.
+        """
+        with self._lock:
+            self._promoted.add(session_id)
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return {}
+            vectors = dict(zip(session.ids, session.decode(np.arange(session.size)))) if session.size else {}
+            session.close()
+            if not self._sessions:
+                self._remove_storage()
+        logger.info(f"Session {session_id} outgrew the flat index ({len(vectors)} vectors); searching it through HNSW.")
+        return vectors
+
+    def search(self, session_id: str, query_vectors: Sequence[Sequence[float]], chunk_type: Optional[str] = None,
+               k: int = 10) -> List[List[Tuple[str, float]]]:
+        """
+        Ranks a session's vectors against a batch of queries by cosine similarity: exact for float32 storage,
+        and for compact storage exact over the candidates that survive the compact pass.
+
+        Args:
+            session_id (str): The session to search.
+            query_vectors (Sequence[Sequence[float]]): The query embeddings.
+            chunk_type (str, optional): Restricts results to one chunk type.
+            k (int, optional): Maximum results per query.
+
+        Returns:
+            List[List[Tuple[str, float]]]: Per query, (chunk ID, cosine similarity) pairs, best first.
+        """
+        queries = normalize_rows(np.asarray(query_vectors, dtype=np.float32))
+        with self._lock:
+            session = self._sessions.get(session_id)
+            type_code = self._type_codes.get(chunk_type) if chunk_type else None
+            if session is None or not session.size or (chunk_type and type_code is None):
+                return [[] for _ in range(len(queries))]
+            # Views of the filled rows; later appends never write into them
+            size = session.size
+            codes, types, ids = session.codes[:size], session.types[:size], session.ids[:size]
+            scales = session.scales[:size] if session.scales is not None else None
+            full = session.full[:size] if session.full is not None else None
+
+        candidates = np.arange(size) if type_code is None else np.flatnonzero(types == type_code)
+        if not len(candidates):
+            return [[] for _ in range(len(queries))]
+        rows = codes if type_code is None else codes[candidates]
+        scores = np.asarray(rows, dtype=np.float32) @ queries.T
+        if scales is not None:
+            scores *= (scales if type_code is None else scales[candidates])[:, None]
+        k = min(k, len(candidates))
+        depth = min(k * self.rescore, len(candidates)) if full is not None else k
+        picks = [self._top(column, depth) for column in scores.T]
+
+        if depth > k:
+            # Exact scores for the shortlisted rows of every query, read in one batch
+            shortlist = np.unique(np.concatenate(picks))
+            lookup = dict(zip(shortlist.tolist(), range(len(shortlist))))
+            rescored = np.asarray(full[candidates[shortlist]], dtype=np.float32) @ queries.T
+            for column, pick in enumerate(picks):
+                scores[pick, column] = rescored[[lookup[index] for index in pick.tolist()], column]
+            picks = [pick[self._top(scores[pick, column], k)] for column, pick in enumerate(picks)]
+        return [[(ids[candidates[index]], float(scores[index, column])) for index in pick] for column, pick in enumerate(picks)]
+
+    @staticmethod
+    def _top(column: np.ndarray, k: int) -> np.ndarray:
+        top = np.argpartition(-column, k - 1)[:k] if k < len(column) else np.arange(len(column))
+        # Sorting the picks by position first makes ties resolve in insertion order
+        top = np.sort(top)
+        return top[np.argsort(-column[top], kind="stable")]
+
+    def vectors(self, session_id: str, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Returns normalized float32 vectors of whichever of the given IDs the session holds, decoded from the
+        finest copy it keeps.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return {}
+            present = [chunk_id for chunk_id in ids if chunk_id in session.positions]
+            if not present:
+                return {}
+            decoded = session.decode(np.array([session.positions[chunk_id] for chunk_id in present]))
+            return dict(zip(present, decoded))
+
+    def mark_promoted(self, session_id: str) -> None:
+        """
+        Records that a session's vectors already live in the ANN index (e.g. rebuilt after a restart).
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                session.close()
+            self._promoted.add(session_id)
+            if not self._sessions:
+                self._remove_storage()
+
+    def delete_session(self, session_id: str) -> None:
+        """
+        Drops a session's matrix (and its files) and its promotion, so a re-created session starts in the flat tier again.
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                session.close()
+            self._promoted.discard(session_id)
+            if not self._sessions:
+                self._remove_storage()
+
+    def close(self) -> None:
+        """
+        Drops every session's matrix and removes the memory-mapped files' directory.
+        """
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._remove_storage()
+
+    def _remove_storage(self) -> None:
+        if self._cleanup is not None:
+            self._cleanup()
+            self._cleanup = None
+            self.storage_dir = None
+
+    def size(self, session_id: str) -> int:
+        """
+        Returns the number of vectors the session holds in the flat tier.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.size if session is not None else 0
+
+    def vector_bytes(self, dim: int) -> int:
+        """
+        Returns the process memory one stored vector of the given dimension takes: its type code, its int8 scale and,
+        unless the matrices are memory-mapped, its codes and rescoring copy.
+        """
+        nbytes = 1 + (4 if self.dtype == np.int8 else 0)
+        if self._storage_root is None:
+            nbytes += dim * (self.dtype.itemsize + (self._full_dtype.itemsize if self._full_dtype is not None else 0))
+        return nbytes
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Reports flat sessions, promoted sessions, stored vectors, the bytes held in RAM and the bytes in
+        memory-mapped files (resident only while the OS keeps their pages cached).
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            arrays = [array for session in sessions for array in (session.codes, session.full, session.scales, session.types) if array is not None]
+            return {
+                "sessions": len(sessions),
+                "promoted": len(self._promoted),
+                "vectors": sum(session.size for session in sessions),
+                "bytes": sum(array.nbytes for array in arrays if not isinstance(array, np.memmap)),
+                "mapped_bytes": sum(array.nbytes for array in arrays if isinstance(array, np.memmap)),
+            }
@@ -1,5 +1,6 @@
 import pytest
 from pathlib import Path
+from chromadb.api.types import EmbeddingFunction
 
 @pytest.fixture(autouse=True)
 def mock_settings_env(mocker):
@@ -11,3 +12,32 @@ def mock_settings_env(mocker):
     mocker.patch("src.config.Config_env.GROQ_API_KEY", new_callable=mocker.PropertyMock, return_value="fake_testing_key")
     mocker.patch("src.config.load.LLM_MODEL", "llama-3.1-8b-instant")
     mocker.patch("src.config.load.MEMORY_DUMP", False)
+
+class RecordingEmbedding(EmbeddingFunction):
+    """
+    Deterministic stand-in for the embedding model: maps each text through `vectorize` and records every batch.
+    """
+    def __init__(self, vectorize=None):
+        self.vectorize = vectorize or (lambda text: [float(len(text)), 1.0, 0.5])
+        self.batches = []
+
+    def __call__(self, input):
+        self.batches.append(list(input))
+        return [list(self.vectorize(text)) for text in input]
+
+    @property
+    def texts(self):
+        return [text for batch in self.batches for text in batch]
+
+    @staticmethod
+    def name(): return "recording_test_embedding"
+    def get_config(self): return {}
+    @staticmethod
+    def build_from_config(config): return RecordingEmbedding()
+
+@pytest.fixture
+def make_embedder():
+    """
+    Builds test embedders: `make_embedder(lambda text: [...])`, or text-length vectors by default.
+    """
+    return RecordingEmbedding
@@ -0,0 +1,59 @@
+import pytest
+from src.answer_cache import Semantic_Answer_Cache
+from src.PDF_Pal import PDF_Pal_App, RAG_Memory
+
+def test_lookup_respects_threshold_fingerprint_and_ttl(mocker):
+    """Verify near-identical questions hit, dissimilar ones or other document sets miss, and stale entries expire."""
+    clock = mocker.patch("src.answer_cache.time.time", return_value=1000.0)
+    cache = Semantic_Answer_Cache(max_entries=8, ttl=60, threshold=0.95)
+    cache.store("docs-a", [1.0, 0.0, 0.0], "Answer A", cost=2.0)
+
+    assert cache.lookup("docs-a", [0.99, 0.05, 0.0], elapsed=0.5) == "Answer A"
+    assert cache.lookup("docs-a", [0.0, 1.0, 0.0]) is None
+    assert cache.lookup("docs-b", [1.0, 0.0, 0.0]) is None
+
+    clock.return_value = 1061.0
+    assert cache.lookup("docs-a", [1.0, 0.0, 0.0]) is None
+
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1 and metrics["misses"] == 3 and metrics["expired"] == 1
+    assert metrics["saved_seconds"] == 1.5
+    assert metrics["entries"] == 0
+
+def test_lru_eviction_and_invalidation():
+    """Verify the least recently used answer is evicted at capacity and invalidation drops a document set."""
+    cache = Semantic_Answer_Cache(max_entries=2, ttl=0, threshold=0.9)
+    cache.store("docs", [1.0, 0.0], "first")
+    cache.store("docs", [0.0, 1.0], "second")
+    assert cache.lookup("docs", [1.0, 0.0]) == "first"
+    cache.store("other", [1.0, 1.0], "third")
+
+    assert cache.lookup("docs", [0.0, 1.0]) is None
+    assert cache.lookup("docs", [1.0, 0.0]) == "first"
+    assert cache.invalidate("other") == 1
+    assert len(cache) == 1 and cache.metrics()["evicted"] == 1
+
+def test_app_shares_answers_across_sessions_until_new_files_arrive(mocker, tmp_path, make_embedder):
+    """Verify a second session with the same document gets the cached answer without an LLM call, and new files invalidate it."""
+    embedder = make_embedder(lambda text: [float("revenue" in text.lower()), float("risk" in text.lower()), 1.0])
+
+    class FakeChunk:
+        def __init__(self, text): self.text = text
+
+    app = PDF_Pal_App()
+    app.rag = app.sessions.rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=embedder)
+    app.brain.client = mocker.MagicMock()
+    app.brain.client.chat.completions.create.return_value.choices[0].message.content = "Revenue grew 12%."
+    for session_id in ("alice", "bob"):
+        app.rag.index([FakeChunk("Revenue grew 12% in 2023.")], session_id=session_id, file_name="report.pdf")
+
+    assert app.ask("How did revenue change?", session_id="alice") == "Revenue grew 12%."
+    assert app.ask("how did revenue change", session_id="bob") == "Revenue grew 12%."
+    assert app.brain.client.chat.completions.create.call_count == 1
+    assert [m["role"] for m in app.brain.history["bob"]] == ["system", "user", "assistant"]
+
+    app.rag.index([FakeChunk("Revenue grew 12% in 2023.")], session_id="carol", file_name="report.pdf")
+    app.rag.index([FakeChunk("New risk factors.")], session_id="carol", file_name="risks.pdf")
+    app.ask("How did revenue change?", session_id="carol")
+    assert app.brain.client.chat.completions.create.call_count == 2
+    assert app.answer_cache.metrics()["hits"] == 1
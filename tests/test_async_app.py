@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from src.PDF_Pal import PDF_Pal_App
+from src.async_app import AsyncPDF_Pal_App
+
+def make_async_client(mocker, answer, delay=0.01, active=None, peak=None):
+    """Builds an AsyncGroq stand-in whose completions take `delay` seconds and track per-session overlap."""
+    async def create(**kwargs):
+        session = kwargs["messages"][-1]["content"].split(":")[0]
+        if active is not None:
+            active[session] = active.get(session, 0) + 1
+            peak[session] = max(peak.get(session, 0), active[session])
+        await asyncio.sleep(delay)
+        if active is not None:
+            active[session] -= 1
+        response = mocker.MagicMock()
+        response.choices = [mocker.MagicMock()]
+        response.choices[0].message.content = answer
+        return response
+    client = mocker.MagicMock()
+    client.chat.completions.create = create
+    return client
+
+def test_async_ask_serializes_turns_per_session(mocker):
+    """Verify one session's asks run one at a time while different sessions overlap."""
+    active, peak = {}, {}
+    app = AsyncPDF_Pal_App(app=PDF_Pal_App(), client=make_async_client(mocker, "ok", active=active, peak=peak))
+    app.app.build_context = mocker.MagicMock(return_value="ctx")
+
+    async def run():
+        return await asyncio.gather(
+            app.ask("a: first", session_id="a"),
+            app.ask("a: second", session_id="a"),
+            app.ask("b: only", session_id="b"),
+        )
+    assert asyncio.run(run()) == ["ok", "ok", "ok"]
+
+    assert peak["a"] == 1
+    history = app.brain.history["a"]
+    assert [m["role"] for m in history[1:]] == ["user", "assistant", "user", "assistant"]
+    assert history[1]["content"] == "a: first"
+
+def test_async_summarize_indexes_summary_tree(mocker):
+    """Verify the coroutine summary path uses the async client and indexes the reduced tree."""
+    app = AsyncPDF_Pal_App(app=PDF_Pal_App(), client=make_async_client(mocker, "Async summary"))
+    app.app.rag.index = mocker.MagicMock()
+    app.brain.client.chat.completions.create = mocker.MagicMock(side_effect=AssertionError("sync client used"))
+
+    class FakeChunk:
+        def __init__(self, text): self.text = text
+    asyncio.run(app.summarize([FakeChunk("Line 1"), FakeChunk("Line 2")], session_id="s", file_name="doc.pdf"))
+
+    app.app.rag.index.assert_called_once()
+    summary_chunks = app.app.rag.index.call_args[0][0]
+    assert summary_chunks[0].text.endswith("Async summary")
+    assert app.app.rag.index.call_args[1]["chunk_type"] == "summary"
+
+def test_async_turn_holds_the_brain_session_lock(mocker):
+    """Verify an async turn holds the lock sync turns use, and deleting the session drops both locks."""
+    held = []
+    app = AsyncPDF_Pal_App(app=PDF_Pal_App(), client=make_async_client(mocker, "ok"))
+    app.app.build_context = mocker.MagicMock(return_value="ctx")
+    create = app.client.chat.completions.create
+
+    async def checking_create(**kwargs):
+        held.append(app.brain.session_lock("a").locked())
+        return await create(**kwargs)
+    app.client.chat.completions.create = checking_create
+
+    assert asyncio.run(app.ask("a: question", session_id="a")) == "ok"
+    assert held == [True]
+    assert not app.brain.session_lock("a").locked()
+    assert "a" in app._locks
+
+    app.app.sessions.delete_session("a")
+    assert "a" not in app._locks
+    assert "a" not in app.brain.history
@@ -0,0 +1,68 @@
+import pytest
+from src.embeddings import Cached_Embedding_Function
+
+class CountingEmbedding:
+    """Deterministic stand-in for the embedding model that records which texts it was asked to embed."""
+    def __init__(self):
+        self.seen = []
+    def __call__(self, input):
+        self.seen.extend(input)
+        return [[float(len(text)), 1.0, 0.0] for text in input]
+    @staticmethod
+    def name():
+        return "counting"
+
+def test_repeated_texts_skip_model_inference():
+    """Verify cache hits are served from the LRU and only unseen texts reach the model."""
+    inner = CountingEmbedding()
+    embedder = Cached_Embedding_Function(inner=inner, max_entries=10)
+
+    embedder(["what is the warranty?", "boilerplate header"])
+    vectors = embedder(["what is the warranty?", "boilerplate header", "new question"])
+
+    assert inner.seen == ["what is the warranty?", "boilerplate header", "new question"]
+    assert len(vectors) == 3
+    stats = embedder.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+
+def test_lru_evicts_least_recently_used():
+    """Verify the in-memory tier stays bounded and evicts the coldest entry first."""
+    inner = CountingEmbedding()
+    embedder = Cached_Embedding_Function(inner=inner, max_entries=2)
+
+    embedder(["a"])
+    embedder(["b"])
+    embedder(["a"])  # refresh 'a' so 'b' becomes the eviction candidate
+    embedder(["c"])
+    embedder(["a"])
+    embedder(["b"])
+
+    assert embedder.stats()["size"] == 2
+    assert inner.seen == ["a", "b", "c", "b"]
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    """Verify the SQLite tier serves embeddings computed by a previous process."""
+    first = Cached_Embedding_Function(inner=CountingEmbedding(), cache_dir=str(tmp_path))
+    expected = first(["disclaimer text"])[0]
+
+    inner = CountingEmbedding()
+    second = Cached_Embedding_Function(inner=inner, cache_dir=str(tmp_path))
+    vector = second(["disclaimer text"])[0]
+
+    assert inner.seen == []
+    assert second.stats()["disk_hits"] == 1
+    assert list(vector) == list(expected)
+
+def test_rag_memory_reports_cache_stats_without_loading_the_model():
+    """Verify the public stats accessor is empty before the embedder exists and reads the cache afterwards."""
+    from src.PDF_Pal import RAG_Memory
+
+    rag = RAG_Memory()
+    assert rag.embedding_cache_stats() == {}
+    assert rag._embedder is None
+
+    rag.embedder = Cached_Embedding_Function(inner=CountingEmbedding(), max_entries=10)
+    rag.embedder(["a"])
+    rag.embedder(["a"])
+    assert rag.embedding_cache_stats()["hits"] == 1
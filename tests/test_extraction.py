@@ -31,3 +31,117 @@ def test_chunking_token_counts():
     assert len(chunks) > 0
     assert hasattr(chunks[0], "text")
     assert hasattr(chunks[0], "token_count")
+
+def test_extract_text_calls_each_page_once(mocker):
+    """Verify each page's text is extracted a single time rather than once for the check and once for the append."""
+    extractor = Read_PDF_Content()
+
+    mock_page = mocker.MagicMock()
+    mock_page.extract_text.return_value = "Hello World"
+
+    mock_reader = mocker.MagicMock()
+    mock_reader.pages = [mock_page, mock_page, mock_page]
+
+    mocker.patch("src.PDF_Pal.PdfReader", return_value=mock_reader)
+
+    result = extractor.extract_text_from_pdfs(["file1.pdf"])
+
+    assert mock_page.extract_text.call_count == 3
+    assert result == "Hello World\n" * 3
+
+def test_parallel_extractor_preserves_page_order(tmp_path):
+    """Verify the process pool re-assembles page ranges of every file in deterministic page order."""
+    from reportlab.pdfgen import canvas
+    from src.extraction import Parallel_PDF_Extractor
+
+    paths = []
+    for doc in range(2):
+        path = tmp_path / f"doc{doc}.pdf"
+        pdf = canvas.Canvas(str(path))
+        for page in range(5):
+            pdf.drawString(72, 720, f"doc{doc} page{page}")
+            pdf.showPage()
+        pdf.save()
+        paths.append(path)
+
+    # Force the pool even for tiny files, with ranges smaller than a document
+    engine = Parallel_PDF_Extractor(max_workers=2, pages_per_task=2, min_pages_for_pool=1)
+    try:
+        pages = engine.extract_pages_from_pdfs(paths)
+    finally:
+        engine.shutdown()
+
+    assert [[page.strip() for page in doc] for doc in pages] == [
+        [f"doc{doc} page{page}" for page in range(5)] for doc in range(2)
+    ]
+
+def test_chunk_stream_carries_boundary_across_pages():
+    """Verify streamed chunking emits bounded chunks that reassemble the original pages without loss."""
+    extractor = Read_PDF_Content()
+    pages = [f"Page {i} sentence one. Page {i} sentence two is a little longer. " * 40 for i in range(10)]
+
+    chunks = list(extractor.chunk_stream(iter(pages), flush_chars=5000))
+
+    assert len(chunks) > 1
+    assert all(len(chunk.text) <= 2048 for chunk in chunks)
+    assert "".join(chunk.text for chunk in chunks) == "".join(page + "\n" for page in pages)
+
+def test_pages_fall_back_to_next_backend_on_garbage_errors_and_timeouts(mocker):
+    """Verify garbled, failing and hanging pages are retried with the next backend, blank ones are not, and a hung backend is retired."""
+    import time
+    import threading
+    from src.extraction import Extraction_Backend, extract_page_range
+
+    class Flaky_Backend(Extraction_Backend):
+        name = "flaky"
+        def open(self, pdf_bytes):
+            return None
+        def page_count(self, document):
+            return 4
+        def extract_page(self, document, index):
+            if index == 1:
+                return "(cid:12)(cid:7)(cid:40)��"
+            if index == 2:
+                raise ValueError("broken content stream")
+            if index == 3:
+                time.sleep(1)
+            return "  \n" if index == 0 else f"flaky {index}"
+
+    class Steady_Backend(Flaky_Backend):
+        name = "steady"
+        def extract_page(self, document, index):
+            return f"steady {index}"
+
+    mocker.patch.dict("src.extraction.EXTRACTION_BACKENDS", {"flaky": Flaky_Backend, "steady": Steady_Backend})
+
+    pages = extract_page_range(b"%PDF", 0, 4, backends=("flaky", "steady"), timeout=0.2)
+
+    # A blank page is final; the hung call's thread is a daemon, so it can't hold up interpreter exit
+    assert pages == ["  \n", "steady 1", "steady 2", "steady 3"]
+    assert all(thread.daemon for thread in threading.enumerate() if thread.name == "page-extract")
+
+def test_page_cache_skips_extraction_of_seen_pages(tmp_path, mocker):
+    """Verify re-extracting a file is served from the page cache, including from the on-disk tier."""
+    from reportlab.pdfgen import canvas
+    import src.extraction as extraction
+
+    path = tmp_path / "doc.pdf"
+    pdf = canvas.Canvas(str(path))
+    for page in range(3):
+        pdf.drawString(72, 720, f"page{page}")
+        pdf.showPage()
+    pdf.save()
+
+    spy = mocker.spy(extraction, "extract_page_range")
+    engine = extraction.Parallel_PDF_Extractor(max_workers=1, cache=extraction.Page_Cache(16, str(tmp_path / "cache")))
+    first = engine.extract_pages_from_pdfs([path])
+    assert spy.call_count == 1
+
+    assert engine.extract_pages_from_pdfs([path]) == first
+    assert spy.call_count == 1 and engine.cache.hits == 3
+
+    # A fresh process with the same cache directory reads the pages from disk
+    restarted = extraction.Parallel_PDF_Extractor(max_workers=1, cache=extraction.Page_Cache(16, str(tmp_path / "cache")))
+    assert restarted.extract_pages_from_pdfs([path]) == first
+    assert spy.call_count == 1
+    assert [page.strip() for page in first[0]] == ["page0", "page1", "page2"]
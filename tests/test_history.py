@@ -0,0 +1,74 @@
+import tracemalloc
+import pytest
+from src.history import History_Store, Message
+
+def test_ring_buffer_evicts_oldest_turns_within_token_cap():
+    """Verify the token cap evicts the oldest turns, keeps the system message and windows without copying."""
+    store = History_Store(max_tokens=60)
+    store["s"] = [{"role": "system", "content": "sys"}, {"role": "user", "content": "q0 " * 10}]
+    history = store["s"]
+    for turn in range(1, 20):
+        history.append("assistant", f"a{turn:02d} " * 10)
+
+    # Each turn is 10 tokens of text (characters / 4) plus 4 of overhead, so four fit under the cap
+    assert len(history) == 5 and history.dropped == 16
+    assert history.tokens <= 60
+    assert history[0] == {"role": "system", "content": "sys"}
+    assert history[-1]["content"].startswith("a19")
+
+    window = history.window(2)
+    assert len(window) == 3 and window[0] is history[2]
+    assert window.as_dicts()[-1] == history[-1].as_dict()
+    assert window.tokens == sum(message.tokens for message in history[2:])
+    # Roles are interned, so every record shares one string per role
+    assert isinstance(history[1], Message) and history[1].role is history[2].role
+
+    messages, dropped = store.export("s")
+    assert dropped == 16 and len(messages) == 5
+    restored = History_Store(max_tokens=60).load("s", messages, dropped)
+    assert restored.dropped == 16 and [m.content for m in restored] == [m.content for m in history]
+
+    # Eviction advances the head in place: the buffer never grew past its first size and the kept turns weren't moved
+    kept = list(history)[1:]
+    assert len(history._ring) == 8
+    history.append("assistant", "a20 " * 10)
+    assert len(history._ring) == 8 and list(history)[1:4] == kept[1:]
+
+def test_sqlite_spill_keeps_full_transcript(tmp_path):
+    """Verify evicted turns go to SQLite, come back in the export and are deleted with the session."""
+    store = History_Store(max_tokens=30, spill_path=str(tmp_path / "history.db"))
+    history = store.setdefault("s")
+    history.set_system("sys")
+    for turn in range(10):
+        history.append("user", f"question {turn} " * 5)
+
+    assert history.dropped > 0 and store.metrics()["spilled"] == history.dropped
+    messages, dropped = store.export("s")
+    assert dropped == 0
+    assert [m["content"].split()[1] for m in messages[1:]] == [str(turn) for turn in range(10)]
+
+    store.pop("s")
+    assert "s" not in store and store.metrics()["spilled"] == 0
+
+def test_soak_10k_sessions_memory_stays_bounded():
+    """Verify memory plateaus once every session reaches its token cap, however many turns follow."""
+    store = History_Store(max_tokens=100)
+    sessions = [f"session-{index}" for index in range(10_000)]
+
+    def chat(rounds, offset):
+        for turn in range(offset, offset + rounds):
+            for session_id in sessions:
+                history = store.setdefault(session_id)
+                history.append("user", f"Question {turn} about page {turn % 7} of the report?")
+                history.append("assistant", f"Answer {turn}: the report says the value is {turn * 3}.")
+
+    tracemalloc.start()
+    chat(4, 0)
+    plateau = tracemalloc.get_traced_memory()[0]
+    chat(8, 4)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert after < plateau * 1.1
+    assert max(store[session_id].tokens for session_id in sessions) <= 100
+    assert store.metrics()["evicted"] > 0
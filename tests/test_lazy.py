@@ -0,0 +1,31 @@
+import sys
+import subprocess
+import pytest
+from src.lazy import lazy_import
+
+def test_lazy_import_loads_on_first_use():
+    """Verify the stand-in imports nothing until used, then forwards calls and attribute access."""
+    dumps = lazy_import("json", "dumps")
+    assert "not loaded" in repr(dumps)
+    assert dumps({"a": 1}) == '{"a": 1}'
+    assert "loaded" in repr(dumps) and "not" not in repr(dumps)
+    assert lazy_import("json").loads("[1]") == [1]
+
+def test_importing_the_app_skips_heavy_dependencies_and_settings():
+    """Verify importing src.PDF_Pal in a fresh interpreter loads neither chromadb, groq, pypdf, chonkie nor the secrets."""
+    script = (
+        "import sys, src.PDF_Pal, src.config; "
+        "print(sorted(m for m in ('chromadb', 'groq', 'pypdf', 'chonkie', 'src.embeddings') if m in sys.modules), "
+        "'config' in vars(src.config))"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["[]", "False"]
+
+def test_rag_memory_connects_on_first_use_or_warm_up(tmp_path, make_embedder):
+    """Verify the Chroma collection is created by warm_up (or the first access), not by the constructor."""
+    from src.PDF_Pal import RAG_Memory
+
+    rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=make_embedder())
+    assert rag._collection is None
+    rag.warm_up()
+    assert rag._collection is not None and rag.collection.count() == 0 and rag.store is not None
@@ -0,0 +1,46 @@
+import pytest
+from src.lexical import BM25_Index, tokenize, reciprocal_rank_fusion
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    """Verify part numbers and clause IDs are indexed whole as well as by their components."""
+    tokens = tokenize("See clause 4.2.1 for part PN-4821.")
+    assert "4.2.1" in tokens and "pn-4821" in tokens
+    assert "4821" in tokens and "for" not in tokens
+
+def test_bm25_ranks_exact_match_and_filters_type():
+    """Verify the chunk holding the rare identifier ranks first and other chunk types are excluded."""
+    index = BM25_Index()
+    index.add("s", "a.pdf", "content", ["c1", "c2", "c3"], [
+        "General torque guidance for assemblies.",
+        "Part PN-4821 requires 12 Nm torque.",
+        "Assemblies need periodic inspection.",
+    ])
+    index.add("s", "a.pdf", "summary", ["s1"], ["Summary mentioning PN-4821 torque."])
+    index.add("other", "b.pdf", "content", ["o1"], ["PN-4821 in another session."])
+
+    results = index.search("s", "torque for PN-4821", chunk_type="content", k=2)
+    assert [chunk_id for chunk_id, _ in results][0] == "c2"
+    assert all(chunk_id.startswith("c") for chunk_id, _ in results)
+
+def test_incremental_adds_match_single_batch():
+    """Verify buffered postings merged across several adds score exactly like one bulk add."""
+    texts = [f"chunk {i} mentions widget {i % 3} and gear {i % 5}" for i in range(30)]
+    ids = [f"id{i}" for i in range(30)]
+    bulk, incremental = BM25_Index(), BM25_Index(freeze_threshold=10)
+    bulk.add("s", "f.pdf", "content", ids, texts)
+    for start in range(0, 30, 7):
+        incremental.add("s", "f.pdf", "content", ids[start:start + 7], texts[start:start + 7])
+        incremental.search("s", "widget", k=1)
+
+    assert incremental.search("s", "widget 2 gear 4", k=5) == bulk.search("s", "widget 2 gear 4", k=5)
+    assert incremental.stats()["postings"] == bulk.stats()["postings"]
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Verify an item ranked well by both lists beats items only one list likes."""
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]])[0] in ("a", "b")
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "a"], ["b"]])[0] == "b"
+
+def test_reciprocal_rank_fusion_breaks_ties_by_preferred_ranking():
+    """Verify equal fused scores follow the preferred ranking instead of first-seen order."""
+    assert reciprocal_rank_fusion([["filler"], ["exact"]])[0] == "filler"
+    assert reciprocal_rank_fusion([["filler"], ["exact"]], prefer=1) == ["exact", "filler"]
@@ -1,5 +1,6 @@
 import pytest
 from src.PDF_Pal import PDF_Pal_Brain, PDF_Pal_App
+from src.config import load
 
 def test_brain_chat_appends_history(mocker):
     """Verify that Groq interface correctly pushes dictionary payloads into session buffers."""
@@ -44,3 +45,154 @@ def test_app_generate_summary_trigger(mocker):
     app.rag.index.assert_called_once()
     called_args = app.rag.index.call_args[1]
     assert called_args["chunk_type"] == "summary"
+    # A single-window document collapses to just the root node of the summary tree
+    summary_chunks = app.rag.index.call_args[0][0]
+    assert [chunk.extra_metadata["granularity"] for chunk in summary_chunks] == ["document"]
+
+def test_app_stream_pdf_flushes_bounded_batches(mocker):
+    """Verify streaming ingestion indexes chunks in INDEX_BATCH_SIZE batches as pages arrive."""
+    app = PDF_Pal_App()
+    app.rag.index = mocker.MagicMock()
+    app._start_summary = mocker.MagicMock()
+    mocker.patch("src.config.load.INDEX_BATCH_SIZE", 2)
+
+    class FakeChunk:
+        def __init__(self, text): self.text = text
+    mocker.patch("src.PDF_Pal.iter_pdf_pages", return_value=iter(["page"] * 5))
+    app.extractor.chunk_stream = mocker.MagicMock(return_value=iter([FakeChunk(str(i)) for i in range(5)]))
+
+    assert app.process_pdfs([b"%PDF"], session_id="stream_session", streaming=True)
+
+    batch_sizes = [len(call.args[0]) for call in app.rag.index.call_args_list]
+    assert batch_sizes == [2, 2, 1]
+    app._start_summary.assert_called_once()
+
+def test_stream_pdf_summarizes_only_admitted_chunks_and_stops_on_delete(mocker):
+    """Verify chunks rejected by the quota are never mapped, and a delete mid-upload cancels the map and the summary."""
+    app = PDF_Pal_App()
+    app.rag.index = mocker.MagicMock()
+    app.rag.delete_session = mocker.MagicMock()
+    app._start_summary = mocker.MagicMock()
+    section_map = mocker.MagicMock()
+    app.summarizer.stream = mocker.MagicMock(return_value=section_map)
+    mocker.patch("src.config.load.INDEX_BATCH_SIZE", 2)
+
+    class FakeChunk:
+        def __init__(self, text): self.text = text
+    mocker.patch("src.PDF_Pal.iter_pdf_pages", return_value=iter(["page"] * 5))
+    app.extractor.chunk_stream = mocker.MagicMock(side_effect=lambda pages: iter([FakeChunk(str(i)) for i in range(5)]))
+
+    app.sessions.admit = mocker.MagicMock(side_effect=[True, False])
+    assert app.stream_pdf(b"%PDF", session_id="quota")
+    assert [call.args[0].text for call in section_map.add.call_args_list] == ["0", "1"]
+    app._start_summary.assert_called_once()
+
+    section_map.reset_mock()
+    app._start_summary.reset_mock()
+    app.sessions.admit = mocker.MagicMock(return_value=True)
+    app.rag.index.side_effect = lambda *args, **kwargs: app.scheduler.cancel_session("deleted")
+    assert not app.stream_pdf(b"%PDF", session_id="deleted")
+    assert app.rag.index.call_count == 2 and section_map.add.call_count == 2
+    section_map.cancel.assert_called_once()
+    app.rag.delete_session.assert_called_once_with("deleted")
+    app._start_summary.assert_not_called()
+
+def test_known_document_over_quota_is_skipped_not_reingested(mocker):
+    """Verify a stored document the session's quota refuses is neither attached nor extracted and embedded again."""
+    app = PDF_Pal_App()
+    app.rag.collection = mocker.MagicMock()
+    app.rag.store = mocker.MagicMock(**{"get_manifest.return_value": {"complete": True, "content": ["h1", "h2"]}})
+    app.rag.document_hash = mocker.MagicMock(return_value="doc")
+    app.rag.attach_document = mocker.MagicMock()
+    app.sessions.admit = mocker.MagicMock(return_value=False)
+    app.stream_pdf = mocker.MagicMock()
+    app.parallel_extractor.extract_text_from_pdfs = mocker.MagicMock()
+
+    assert not app.process_pdfs([b"%PDF"], session_id="full", streaming=True)
+    assert not app.process_pdfs([b"%PDF"], session_id="full", streaming=False)
+
+    app.rag.attach_document.assert_not_called()
+    app.stream_pdf.assert_not_called()
+    app.parallel_extractor.extract_text_from_pdfs.assert_not_called()
+
+def test_brain_chat_compacts_history_within_token_budget(mocker):
+    """Verify long conversations stay under the prompt budget by folding old turns into a rolling summary."""
+    brain = PDF_Pal_Brain()
+    brain.budget.total = 400
+
+    mock_response = mocker.MagicMock()
+    mock_response.choices = [mocker.MagicMock()]
+    mock_response.choices[0].message.content = "word " * 40
+    create = brain.client.chat.completions.create = mocker.MagicMock(return_value=mock_response)
+
+    for turn in range(8):
+        brain.chat(query=f"Question {turn} " + "detail " * 40, context="Chunk text. " * 200, session_id="budget")
+
+    # Without a scheduler compaction runs after each answer, so the last chat request is the last call on the chat model
+    messages = [call.kwargs for call in create.call_args_list if call.kwargs["model"] == load.LLM_MODEL][-1]["messages"]
+    assert brain.counter.count_messages(messages) <= 400
+    assert messages[1]["content"].startswith("Summary of the earlier conversation:")
+    assert messages[-1]["content"].startswith("Question 7")
+    # Nothing is lost from the stored history, only from what is sent
+    assert len(brain.history["budget"]) == 17
+    assert brain.last_usage["budget"]["prompt_tokens"] <= 400
+
+def test_history_compaction_runs_after_the_answer(mocker):
+    """Verify a turn crossing the budget sends no summary call before its own request and queues compaction instead."""
+    brain = PDF_Pal_Brain()
+    brain.budget.total = 400
+    brain.scheduler = mocker.MagicMock()
+    response = mocker.MagicMock()
+    response.choices = [mocker.MagicMock()]
+    response.choices[0].message.content = "word " * 40
+    create = brain.client.chat.completions.create = mocker.MagicMock(return_value=response)
+
+    for turn in range(3):
+        brain.chat(query=f"Question {turn} " + "detail " * 40, context="Chunk text. " * 200, session_id="later")
+
+    assert create.call_count == 3
+    assert brain.scheduler.submit.call_args.args == (brain.compact_history, "later")
+    brain.compact_history("later")
+    assert create.call_count == 4 and brain.history_summaries["later"]["text"] == "word " * 40
+    brain.chat(query="Question 3", session_id="later")
+    assert create.call_args.kwargs["messages"][1]["content"].startswith("Summary of the earlier conversation:")
+
+def test_brain_chat_stream_yields_and_commits_history(mocker):
+    """Verify streamed deltas are yielded incrementally and the joined answer lands in history."""
+    brain = PDF_Pal_Brain()
+
+    def delta(text):
+        chunk = mocker.MagicMock(x_groq=None, usage=None)
+        chunk.choices = [mocker.MagicMock()]
+        chunk.choices[0].delta.content = text
+        return chunk
+    brain.client.chat.completions.create = mocker.MagicMock(return_value=iter([delta("Str"), delta("eam<|im_"), delta("end|>ed")]))
+
+    pieces = list(brain.chat_stream(query="Hello", session_id="stream"))
+
+    assert len(pieces) > 1
+    assert "".join(pieces) == "Streamed"
+    assert brain.client.chat.completions.create.call_args.kwargs["stream"] is True
+    assert brain.history["stream"][-1] == {"role": "assistant", "content": "Streamed"}
+
+def test_shared_brain_serializes_concurrent_turns_per_session(mocker):
+    """Verify concurrent threads chatting in one session on a shared brain never interleave its history."""
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    brain = PDF_Pal_Brain()
+
+    def create(**kwargs):
+        time.sleep(0.01)
+        response = mocker.MagicMock()
+        response.choices = [mocker.MagicMock()]
+        response.choices[0].message.content = f"answer to {kwargs['messages'][-1]['content']}"
+        return response
+    brain.client.chat.completions.create = create
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: brain.chat(query=f"q{i}", session_id="shared"), range(8)))
+
+    turns = brain.history["shared"][1:]
+    assert len(turns) == 16
+    for question, answer in zip(turns[::2], turns[1::2]):
+        assert answer["content"] == f"answer to {question['content']}"
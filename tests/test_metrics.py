@@ -0,0 +1,80 @@
+import json
+import pytest
+from src.logger import logger
+from src.metrics import Metrics_Registry, metrics
+from src.PDF_Pal import PDF_Pal_App
+
+def test_registry_exports_prometheus_text(tmp_path):
+    """Verify spans, counters, histograms and collectors render as cumulative Prometheus series and files."""
+    registry = Metrics_Registry()
+    with registry.span("retrieve"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.span("llm"):
+            raise ValueError("provider down")
+    registry.increment("chunks_indexed", 8, type="content")
+    registry.increment("chunks_indexed", 2, type="content")
+    registry.observe("prompt_tokens", 300, buckets=(256, 512))
+    registry.observe("prompt_tokens", 900, buckets=(256, 512))
+    registry.register_collector("answer_cache", lambda: {"hits": 3, "hit_rate": 0.75, "name": "ignored"})
+    registry.register_collector("broken", lambda: 1 / 0)
+
+    text = registry.export_prometheus()
+    assert "# TYPE pdf_pal_chunks_indexed_total counter" in text
+    assert 'pdf_pal_chunks_indexed_total{type="content"} 10' in text
+    assert 'pdf_pal_prompt_tokens_bucket{le="256"} 0' in text
+    assert 'pdf_pal_prompt_tokens_bucket{le="512"} 1' in text
+    assert 'pdf_pal_prompt_tokens_bucket{le="+Inf"} 2' in text
+    assert "pdf_pal_prompt_tokens_sum 1200" in text
+    # A failing block is still timed
+    assert 'pdf_pal_stage_seconds_count{stage="llm"} 1' in text
+    assert 'pdf_pal_stage_seconds_count{stage="retrieve"} 1' in text
+    assert "pdf_pal_answer_cache_hit_rate 0.75" in text and "ignored" not in text and "broken" not in text
+
+    registry.write(str(tmp_path / "metrics.prom"))
+    registry.write(str(tmp_path / "metrics.json"))
+    assert (tmp_path / "metrics.prom").read_text() == text
+    assert json.loads((tmp_path / "metrics.json").read_text())["counters"]["chunks_indexed"][0]["value"] == 10
+
+def test_disabled_registry_and_flush_interval(tmp_path):
+    """Verify a disabled registry records nothing and flush writes at most once per interval."""
+    registry = Metrics_Registry(enabled=False)
+    with registry.span("embed"):
+        registry.increment("texts_embedded", 5)
+    assert registry.snapshot()["counters"] == {} and registry.snapshot()["histograms"] == {}
+
+    path = tmp_path / "out" / "metrics.prom"
+    registry.configure(enabled=True, export_path=str(path), export_interval=3600)
+    registry.increment("texts_embedded", 5)
+    assert registry.flush() and path.exists()
+    registry.increment("texts_embedded", 5)
+    assert not registry.flush()
+    assert "pdf_pal_texts_embedded_total 5" in path.read_text()
+    assert registry.flush(force=True) and "pdf_pal_texts_embedded_total 10" in path.read_text()
+
+def test_ask_records_stages_and_keeps_payloads_out_of_info_logs(mocker):
+    """Verify a question records prompt, LLM and request latency plus provider tokens, without logging the answer at INFO."""
+    app = PDF_Pal_App()
+    metrics.reset()
+    app.build_context = mocker.MagicMock(return_value="Torque is 40 Nm.")
+    response = mocker.MagicMock()
+    response.choices = [mocker.MagicMock()]
+    response.choices[0].message.content = "The torque is 40 Nm."
+    response.usage.prompt_tokens = 120
+    response.usage.completion_tokens = 9
+    app.brain.client.chat.completions.create = mocker.MagicMock(return_value=response)
+
+    records = []
+    sink = logger.add(records.append, level="INFO", format="{message}")
+    try:
+        assert app.ask("What torque for the bolts?", session_id="s") == "The torque is 40 Nm."
+    finally:
+        logger.remove(sink)
+
+    stages = {entry["labels"]["stage"]: entry["count"] for entry in metrics.snapshot()["histograms"]["stage_seconds"]}
+    assert stages == {"prompt": 1, "llm": 1, "ask": 1}
+    text = app.export_metrics()
+    assert 'pdf_pal_llm_tokens_total{kind="prompt"} 120' in text
+    assert 'pdf_pal_llm_tokens_total{kind="completion"} 9' in text
+    assert "pdf_pal_history_messages 3" in text
+    assert not any("40 Nm" in record or "What torque" in record for record in records)
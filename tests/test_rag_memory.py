@@ -6,31 +6,42 @@ class FakeChunk:
         self.text = text
         self.token_count = len(text) // 4
 
-def test_index_attaches_metadata(mocker):
-    """Verify that RAG_Memory.index correctly injects session_id & file_name payload attributes."""
-    # Mock ChromaDB client collection
-    mock_coll = mocker.MagicMock()
-    mocker.patch("src.PDF_Pal.chromadb.Client")
-    
-    rag = RAG_Memory()
-    rag.collection = mock_coll  # Hijack with mock 
-    
+def test_index_attaches_metadata(tmp_path, make_embedder):
+    """Verify that RAG_Memory.index stores session_id & file_name payload attributes and the chunks are retrievable."""
+    rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=make_embedder(lambda text: [float("hello" in text.lower()), float("world" in text.lower()), 1.0]))
+
     chunks = [FakeChunk("Hello chunk"), FakeChunk("World chunk")]
     rag.index(chunks, session_id="test_session_123", file_name="sample.pdf")
-    
-    # Assert collection.add() was called with populated metadata matrices
-    called_args = mock_coll.add.call_args[1]
-    
-    assert len(called_args["documents"]) == 2
-    assert called_args["metadatas"][0]["session_id"] == "test_session_123"
-    assert called_args["metadatas"][0]["file_name"] == "sample.pdf"
-    assert called_args["metadatas"][0]["type"] == "content"
+
+    rows = rag.get_rows(["documents", "metadatas"], where={"session_id": "test_session_123"})
+    assert sorted(rows["documents"]) == ["Hello chunk", "World chunk"]
+    assert all(metadata["file_name"] == "sample.pdf" and metadata["type"] == "content" for metadata in rows["metadatas"])
+
+    results = rag.retrieve("hello", session_id="test_session_123", n_results=1, hybrid=False, rerank=False)
+    assert "Hello chunk" in results[0] and "sample.pdf" in results[0]
+    assert rag.retrieve("hello", session_id="other_session", n_results=1) == []
+
+def test_in_memory_backend_skips_hydration(mocker):
+    """Verify an in-memory collection isn't queried for rows of a previous process."""
+    mock_coll = mocker.MagicMock()
+    mock_coll.get.return_value = {"ids": [], "documents": [], "metadatas": []}
+    mocker.patch("src.PDF_Pal.chromadb.Client")
+
+    rag = RAG_Memory(persist_dir="")
+    rag.collection = mock_coll
+    rag.flat_collection = mock_coll
+    rag.embedder = mocker.MagicMock(side_effect=lambda texts: [[0.1, 0.2, 0.3] for _ in texts])
+    rag.index([FakeChunk("Hello chunk")], session_id="test_session_123", file_name="sample.pdf")
+
+    assert mock_coll.add.call_count == 1
+    assert all("where" not in call.kwargs for call in mock_coll.get.call_args_list)
 
 def test_retrieve_applies_session_and_type_filter(mocker):
     """Verify that RAG_Memory.retrieve restricts vector searches strictly within $and logical bounds."""
     mock_coll = mocker.MagicMock()
     # Stub dummy chroma dict output
     mock_coll.query.return_value = {
+        "ids": [["chunk_1"]],
         "documents": [["[Source: sample.pdf]\nFake Content"]],
         "metadatas": [[{"file_name": "sample.pdf"}]]
     }
@@ -38,6 +49,8 @@ def test_retrieve_applies_session_and_type_filter(mocker):
     mocker.patch("src.PDF_Pal.chromadb.Client")
     rag = RAG_Memory()
     rag.collection = mock_coll
+    rag.flat_collection = mock_coll
+    rag.embedder = mocker.MagicMock(return_value=[[0.1, 0.2, 0.3]])
     
     rag.retrieve("Who am I?", session_id="session_xyz", chunk_type="summary")
     
@@ -52,11 +65,12 @@ def test_retrieve_applies_session_and_type_filter(mocker):
 def test_dump_memory_creates_data_directory(mocker, tmp_path):
     """Verify that deep memory dumps safely generate local insulated /Data folders."""
     mock_coll = mocker.MagicMock()
-    mock_coll.get.return_value = {"documents": ["docs"], "metadatas": [{"session_id": "xyz"}]}
+    mock_coll.get.return_value = {"ids": ["chunk_1"], "documents": ["docs"], "metadatas": [{"session_id": "xyz"}]}
     
     mocker.patch("src.PDF_Pal.chromadb.Client")
     rag = RAG_Memory()
     rag.collection = mock_coll
+    rag.flat_collection = mocker.MagicMock(**{"get.return_value": {"ids": [], "documents": [], "metadatas": []}})
     
     # Mock Path.cwd() to return a temporary pytest directory to avoid cluttering local workspaces
     mocker.patch("src.PDF_Pal.Path.cwd", return_value=tmp_path)
@@ -67,3 +81,80 @@ def test_dump_memory_creates_data_directory(mocker, tmp_path):
     data_dir = tmp_path / "Data"
     assert data_dir.exists()
     assert (data_dir / "rag_memory_dump_test_session.json").exists()
+
+def test_known_document_attaches_without_reembedding(tmp_path, make_embedder):
+    """Verify a document re-uploaded after a restart is attached from the persistent store without embedding calls."""
+    rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=make_embedder())
+    rag.begin_document("doc123", "sample.pdf")
+    rag.index([FakeChunk("Alpha chunk"), FakeChunk("Beta chunk"), FakeChunk("Alpha chunk")],
+              session_id="session_a", file_name="sample.pdf", doc_hash="doc123")
+    rag.mark_document_complete("doc123")
+    # Identical chunks are stored once, in the flat tier's collection while the session is small
+    assert rag.flat_collection.count() == 2 and rag.collection.count() == 0
+
+    # Simulate a process restart with a fresh client over the same directory
+    second = make_embedder()
+    restarted = RAG_Memory(persist_dir=str(tmp_path), embedding_function=second)
+    manifest = restarted.attach_document("doc123", session_id="session_b", file_name="copy.pdf")
+
+    assert manifest is not None
+    assert second.texts == []
+    rows = restarted.get_rows(["documents"], where={"session_id": "session_b"})
+    assert sorted(rows["documents"]) == ["Alpha chunk", "Beta chunk"]
+    assert restarted.attach_document("unknown", session_id="session_b", file_name="x.pdf") is None
+
+def test_hybrid_retrieve_surfaces_exact_identifier(tmp_path, make_embedder):
+    """Verify BM25 fusion finds a chunk by part number even when its embedding is indistinguishable."""
+    rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=make_embedder(lambda text: [1.0, 0.0, 0.0]))
+    texts = [f"Filler paragraph {i} about maintenance schedules." for i in range(20)] + ["Replace seal kit SK-0042 every 500 hours."]
+    rag.index([FakeChunk(text) for text in texts], session_id="hybrid", file_name="manual.pdf")
+
+    results = rag.retrieve("When should SK-0042 be replaced?", session_id="hybrid", n_results=1, hybrid=True)
+    assert "SK-0042" in results[0]
+
+def test_retrieve_many_batches_queries_per_session(tmp_path, make_embedder):
+    """Verify retrieve_many embeds each distinct query once and answers per query across sessions and chunk types."""
+    embedder = make_embedder(lambda text: [float("seal" in text), float("pump" in text), 1.0])
+    rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=embedder)
+    rag.index([FakeChunk("Replace the seal yearly."), FakeChunk("Prime the pump first.")], session_id="a", file_name="a.pdf")
+    rag.index([FakeChunk("The pump manual, summarized.")], session_id="a", file_name="a.pdf", chunk_type="summary")
+    rag.index([FakeChunk("Session b has its own seal notes.")], session_id="b", file_name="b.pdf")
+    embedder.batches.clear()
+
+    results = rag.retrieve_many(["seal", "pump", "seal"], ["a", "a", "b"], n_results=1, chunk_types=["content", "summary", "content"])
+
+    assert embedder.batches == [["seal", "pump"]]
+    assert "Replace the seal" in results[0][0]
+    assert "summarized" in results[1][0]
+    assert "Session b" in results[2][0] and "b.pdf" in results[2][0]
+    assert rag.retrieve_many([], "a") == []
+
+def test_rerank_collapses_duplicate_chunks(tmp_path, make_embedder):
+    """Verify MMR reranking drops a re-uploaded copy of the top chunk in favour of the next distinct one."""
+    embedder = make_embedder(lambda text: [float(text.lower().count("seal")), float(text.lower().count("pump")), 0.3])
+    rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=embedder)
+    for file_name in ("manual.pdf", "manual_copy.pdf"):
+        rag.index([FakeChunk("Seal kit: replace the seal yearly."), FakeChunk("Pump: prime before start.")], session_id="s", file_name=file_name)
+
+    plain = rag.retrieve("seal seal pump", session_id="s", n_results=2, hybrid=False, rerank=False)
+    reranked = rag.retrieve("seal seal pump", session_id="s", n_results=2, hybrid=False, rerank=True)
+
+    assert all("Seal kit" in chunk for chunk in plain)
+    assert "Seal kit" in reranked[0] and "Pump" in reranked[1]
+
+def test_flat_session_rebuilds_after_restart_without_reembedding(tmp_path, make_embedder):
+    """Verify a flat-tier session's vectors are read back from the document store after a restart, not re-embedded."""
+    keywords = lambda text: [float("seal" in text), float("pump" in text), 1.0]
+    texts = ["Replace the seal yearly.", "Prime the pump first."]
+    rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=make_embedder(keywords))
+    rag.index([FakeChunk(text) for text in texts], session_id="s", file_name="manual.pdf")
+    rag.index([FakeChunk("Plain notes without a document.")], session_id="s", file_name="notes.pdf")
+    assert rag.vectors.serves("s")
+
+    embedder = make_embedder(keywords)
+    restarted = RAG_Memory(persist_dir=str(tmp_path), embedding_function=embedder)
+    results = restarted.retrieve("pump", session_id="s", n_results=1, hybrid=False, rerank=False)
+
+    assert "Prime the pump" in results[0]
+    assert restarted.vectors.serves("s")
+    assert embedder.texts == ["pump"]
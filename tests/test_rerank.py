@@ -0,0 +1,24 @@
+import pytest
+from src.rerank import maximal_marginal_relevance
+
+def test_mmr_collapses_duplicates_and_prefers_diverse_candidates():
+    """Verify near-duplicates of a picked chunk are dropped and the next pick covers something new."""
+    embeddings = [
+        [1.0, 0.0, 0.0],    # best match
+        [0.99, 0.01, 0.0],  # near-duplicate of the best match
+        [0.8, 0.6, 0.0],    # overlaps the best match
+        [0.1, 0.0, 1.0],    # different topic
+    ]
+    relevance = [1.0, 0.9, 0.8, 0.7]
+
+    assert maximal_marginal_relevance(embeddings, relevance, k=2, lambda_mult=0.5) == [0, 3]
+    assert maximal_marginal_relevance(embeddings, relevance, k=4, lambda_mult=1.0) == [0, 2, 3]
+
+def test_mmr_fills_k_unless_stopping_early():
+    """Verify all k slots are filled from non-duplicate candidates by default, early stopping is opt-in, and empty input."""
+    embeddings = [[1.0, 0.0], [0.9, 0.44], [0.6, 0.8]]
+    assert maximal_marginal_relevance(embeddings, [1.0, 0.3, 0.2], k=3, lambda_mult=0.5) == [0, 2, 1]
+    assert maximal_marginal_relevance(embeddings, [1.0, 0.3, 0.2], k=3, lambda_mult=0.5, stop_early=True) == [0]
+    # Duplicates are still dropped, so only they can leave slots empty
+    assert maximal_marginal_relevance([[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]], [1.0, 0.9, 0.1], k=3) == [0, 2]
+    assert maximal_marginal_relevance([], [], k=3) == []
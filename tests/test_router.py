@@ -0,0 +1,127 @@
+import json
+import pytest
+from src.router import Intent_Router, SUMMARY, LOOKUP, COMPARISON, FOLLOWUP
+from src.PDF_Pal import PDF_Pal_App
+
+KEYWORDS = ["overview", "torque", "compare", "thanks"]
+
+def keyword_vector(text):
+    return [float(keyword in text.lower()) for keyword in KEYWORDS] + [0.1]
+
+def keyword_embedder(calls):
+    """Embeds texts as keyword indicator vectors and records every batch it is given."""
+    def embed(texts):
+        calls.append(list(texts))
+        return [keyword_vector(text) for text in texts]
+    return embed
+
+PROTOTYPES = {
+    SUMMARY: ["Give me an overview"],
+    LOOKUP: ["What torque is needed?"],
+    COMPARISON: ["Compare the files"],
+    FOLLOWUP: ["Thanks!"],
+}
+
+def test_router_picks_nearest_allowed_route_and_logs(tmp_path):
+    """Verify routing by prototype similarity, the default route below threshold, allowed routes and the JSONL log."""
+    calls = []
+    embed = keyword_embedder(calls)
+    router = Intent_Router(embed, prototypes=PROTOTYPES, threshold=0.5, log_path=str(tmp_path / "routes.jsonl"))
+
+    assert router.route(embed(["An overview please"])[0], "An overview please", "s")[0] == SUMMARY
+    assert router.route(embed(["compare them"])[0], "compare them", "s")[0] == COMPARISON
+    assert router.route(embed(["compare them"])[0], "compare them", "s", allowed=[SUMMARY, LOOKUP])[0] == LOOKUP
+    assert router.route(embed(["xyz"])[0], "xyz", "s")[0] == LOOKUP
+
+    # Prototypes are embedded once, in a single batch
+    assert sum(len(batch) == len(PROTOTYPES) for batch in calls) == 1
+    decisions = [json.loads(line) for line in (tmp_path / "routes.jsonl").read_text().splitlines()]
+    assert [d["route"] for d in decisions] == [SUMMARY, COMPARISON, LOOKUP, LOOKUP]
+    assert router.counts == {SUMMARY: 1, COMPARISON: 1, LOOKUP: 2}
+
+def row(text, embedding, file_name="a.pdf"):
+    return {"id": text, "document": text, "metadata": {"file_name": file_name}, "embedding": embedding}
+
+def test_build_context_follows_route(mocker):
+    """Verify follow-ups skip retrieval, lookups reuse the query embedding and comparisons fetch both chunk types."""
+    app = PDF_Pal_App()
+    calls = []
+    app.rag.embedder = keyword_embedder(calls)
+    app.router.prototypes = PROTOTYPES
+    lookup = [[row("Torque is 40 Nm.", [0.0, 1.0, 0.0, 0.0, 0.1])]]
+    compare = [[row("A summary", [1.0, 0.0, 1.0, 0.0, 0.1])], [row("B excerpt", [0.0, 0.0, 1.0, 0.0, 0.1], "b.pdf")]]
+    app.rag.search_many = mocker.MagicMock(side_effect=[lookup, compare])
+    app.rag.document_summaries = mocker.MagicMock(return_value=[])
+
+    context = app.build_context("What torque for the bolts?", session_id="s", file_names=["a.pdf"])
+    assert "[Source File: a.pdf]\nTorque is 40 Nm." in context
+    assert app.rag.search_many.call_args[1]["query_embeddings"] == [[0.0, 1.0, 0.0, 0.0, 0.1]]
+    assert ["What torque for the bolts?"] in calls
+
+    context = app.build_context("Compare the manuals", session_id="s", file_names=["a.pdf", "b.pdf"])
+    assert "A summary" in context and "B excerpt" in context
+    assert app.rag.search_many.call_args[1]["chunk_types"] == ["summary", "content"]
+
+    app.brain.history["s"] = [{"role": "system", "content": "ctx"}, {"role": "user", "content": "q"}, {"role": "assistant", "content": "a"}]
+    assert app.build_context("Thanks, that helps", session_id="s", file_names=["a.pdf"]) is None
+    assert app.rag.search_many.call_count == 2
+
+def test_similar_followup_reuses_previous_context(mocker):
+    """Verify a close same-route question reuses the last chunks byte-for-byte, and new documents force a fresh search."""
+    app = PDF_Pal_App()
+    app.rag.embedder = keyword_embedder([])
+    app.router.prototypes = PROTOTYPES
+    chunks = [[row("Torque is 40 Nm.", [0.0, 1.0, 0.0, 0.0, 0.1])]]
+    app.rag.search_many = mocker.MagicMock(return_value=chunks)
+    app.brain.client = mocker.MagicMock()
+    app.brain.client.chat.completions.create.return_value.choices = [mocker.MagicMock(message=mocker.MagicMock(content="40 Nm."))]
+
+    context = app.build_context("What torque for the bolts?", session_id="s", file_names=["a.pdf"])
+    app.brain.chat("What torque for the bolts?", context=context, session_id="s")
+    system = app.brain.history["s"][0]["content"]
+
+    assert app.build_context("And the torque for the nuts?", session_id="s", file_names=["a.pdf"]) is None
+    app.brain.chat("And the torque for the nuts?", context=None, session_id="s")
+    assert app.rag.search_many.call_count == 1
+    assert app.brain.history["s"][0]["content"] == system
+    sent = app.brain.client.chat.completions.create.call_args[1]["messages"]
+    assert sent[0]["content"] == system and len(sent) == 4
+
+    # A new upload changes the document fingerprint, so the old chunks are no longer trusted
+    mocker.patch.object(app.rag, "document_fingerprint", return_value="changed")
+    assert "40 Nm" in app.build_context("And the torque for the nuts?", session_id="s", file_names=["a.pdf"])
+    assert app.rag.search_many.call_count == 2
+
+def test_followup_after_cache_hit_retrieves(mocker):
+    """Verify a follow-up whose previous turn retrieved nothing (an answer-cache hit) gets fresh context."""
+    app = PDF_Pal_App()
+    app.rag.embedder = keyword_embedder([])
+    app.router.prototypes = PROTOTYPES
+    app.rag.search_many = mocker.MagicMock(return_value=[[row("Torque is 40 Nm.", [0.0, 1.0, 0.0, 0.0, 0.1])]])
+    app.brain.record_turn("s", "What torque for the bolts?", "40 Nm.")
+
+    context = app.build_context("Thanks, that helps", session_id="s", file_names=["a.pdf"])
+    assert "40 Nm" in context
+    assert app.rag.search_many.call_count == 1
+
+def test_summary_questions_lead_with_each_document_root(tmp_path, make_embedder):
+    """Verify summary and comparison context starts with every file's root node even when a section scores higher."""
+    from src.PDF_Pal import RAG_Memory
+
+    app = PDF_Pal_App()
+    app.rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=make_embedder(keyword_vector))
+    app.router.prototypes = PROTOTYPES
+    for name in ("a.pdf", "b.pdf"):
+        sections = [f"{name} section {i}: torque overview for part {i}." for i in range(4)]
+        app.index_summary_levels([sections, [f"{name} chapter one.", f"{name} chapter two."], [f"{name} whole document."]], "s", name)
+
+    context = app.build_context("Give me an overview of the torque parts", session_id="s", file_names=["a.pdf"])
+    blocks = context.split("[Source File: ")[1:]
+    assert blocks[0].startswith("a.pdf]\n[GLOBAL DOCUMENT SUMMARY TARGET]\na.pdf whole document.")
+    assert len(blocks) == 3 and all("SECTION SUMMARY" in block or "CHAPTER SUMMARY" in block for block in blocks[1:])
+    assert "b.pdf" not in context
+
+    app.brain.history.pop("s", None)
+    context = app.build_context("Compare the files", session_id="s", file_names=["a.pdf", "b.pdf"])
+    assert "a.pdf whole document." in context and "b.pdf whole document." in context
+    assert "SECTION SUMMARY" not in context and "CHAPTER SUMMARY" not in context
@@ -0,0 +1,84 @@
+import threading
+import pytest
+from src.scheduler import Job_Scheduler, DONE, FAILED, CANCELLED
+
+def test_interactive_jobs_run_before_bulk_backfill():
+    """Verify queued interactive jobs are dequeued ahead of earlier-submitted bulk jobs."""
+    scheduler = Job_Scheduler(max_workers=1)
+    gate = threading.Event()
+    order = []
+    try:
+        # Occupy the single worker so the remaining jobs queue up
+        scheduler.submit(gate.wait, session_id="s0", name="blocker")
+        bulk = scheduler.submit(order.append, "bulk", session_id="s1", name="bulk", priority=Job_Scheduler.PRIORITY_BULK)
+        interactive = scheduler.submit(order.append, "interactive", session_id="s2", name="interactive")
+        gate.set()
+        assert scheduler.wait_idle(timeout=5)
+    finally:
+        gate.set()
+
+    assert order == ["interactive", "bulk"]
+    assert scheduler.status(bulk)["status"] == DONE
+    assert scheduler.status(interactive)["status"] == DONE
+
+def test_cancel_session_skips_queued_jobs_and_reports_status():
+    """Verify deleting a session cancels its queued jobs while other sessions keep running."""
+    scheduler = Job_Scheduler(max_workers=1)
+    gate = threading.Event()
+    ran = []
+    scheduler.submit(gate.wait, session_id="other", name="blocker")
+    doomed = scheduler.submit(ran.append, "doomed", session_id="deleted", name="summary:a.pdf")
+    kept = scheduler.submit(ran.append, "kept", session_id="other", name="summary:b.pdf")
+
+    assert scheduler.cancel_session("deleted") == 1
+    assert scheduler.is_cancelled("deleted")
+    gate.set()
+    assert scheduler.wait_idle(timeout=5)
+
+    assert ran == ["kept"]
+    assert scheduler.status(doomed)["status"] == CANCELLED
+    assert [job["name"] for job in scheduler.session_status("other")] == ["blocker", "summary:b.pdf"]
+
+def test_failed_job_records_error():
+    """Verify an exception inside a job is captured in its status instead of dying silently."""
+    scheduler = Job_Scheduler(max_workers=1)
+    def explode():
+        raise RuntimeError("boom")
+    job_id = scheduler.submit(explode, session_id="s", name="broken")
+    assert scheduler.wait_idle(timeout=5)
+
+    status = scheduler.status(job_id)
+    assert status["status"] == FAILED
+    assert status["error"] == "boom"
+
+def test_submit_refuses_cancelled_session_until_resumed():
+    """Verify a job submitted after its session was cancelled never runs, and doesn't clear the cancellation."""
+    scheduler = Job_Scheduler(max_workers=1)
+    ran = []
+    scheduler.cancel_session("deleted")
+    late = scheduler.submit(ran.append, "late", session_id="deleted", name="compact-history")
+    assert scheduler.wait_idle(timeout=5)
+
+    assert ran == []
+    assert scheduler.status(late)["status"] == CANCELLED
+    assert scheduler.is_cancelled("deleted")
+
+    scheduler.resume_session("deleted")
+    fresh = scheduler.submit(ran.append, "fresh", session_id="deleted", name="summary:a.pdf")
+    assert scheduler.wait_idle(timeout=5)
+    assert ran == ["fresh"] and scheduler.status(fresh)["status"] == DONE
+
+def test_finished_jobs_keep_only_the_latest_run_per_name():
+    """Verify recurring jobs don't accumulate bookkeeping and session status only sees its own session."""
+    scheduler = Job_Scheduler(max_workers=1)
+    for _ in range(50):
+        scheduler.submit(lambda: None, session_id="chat", name="compact-history")
+        assert scheduler.wait_idle(timeout=5)
+    scheduler.submit(lambda: None, session_id="chat", name="summary:a.pdf")
+    scheduler.submit(lambda: None, session_id="other", name="compact-history")
+    assert scheduler.wait_idle(timeout=5)
+
+    assert [job["name"] for job in scheduler.session_status("chat")] == ["compact-history", "summary:a.pdf"]
+    assert len(scheduler._jobs) == 3
+    scheduler.forget_session("chat")
+    assert scheduler.session_status("chat") == [] and len(scheduler._jobs) == 1
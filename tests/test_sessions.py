@@ -0,0 +1,98 @@
+import pytest
+from src.PDF_Pal import PDF_Pal_Brain, RAG_Memory, Text_Chunk
+from src.scheduler import Job_Scheduler
+from src.sessions import Session_Manager
+
+@pytest.fixture
+def manager(tmp_path, make_embedder):
+    rag = RAG_Memory(persist_dir=str(tmp_path / "store"), embedding_function=make_embedder())
+    manager = Session_Manager(rag, PDF_Pal_Brain(), Job_Scheduler(max_workers=1), spill_dir=str(tmp_path / "spill"))
+    yield manager
+    manager.scheduler.shutdown()
+
+def fill(manager, session_id, texts):
+    manager.touch(session_id)
+    manager.rag.index([Text_Chunk(text) for text in texts], session_id, file_name="doc.pdf")
+    manager.brain.history[session_id] = [{"role": "system", "content": "sys"}, {"role": "user", "content": f"hi from {session_id}"}]
+
+def test_delete_session_removes_vectors_and_history(manager):
+    """Verify deleting a chat frees its chunks, history and footprint while other sessions are untouched."""
+    fill(manager, "a", ["alpha one", "alpha two"])
+    fill(manager, "b", ["beta one"])
+
+    manager.delete_session("a")
+
+    assert manager.rag.get_rows([], where={"session_id": "a"})["ids"] == []
+    assert "a" not in manager.brain.history
+    assert "a" not in manager.metrics()["sessions"]
+    assert manager.metrics()["sessions"]["b"]["chunks"] == 1
+
+def test_idle_sessions_expire_after_ttl(manager, mocker):
+    """Verify the idle sweep spills only idle sessions without jobs in flight, and they come back on their next request."""
+    manager.idle_ttl = 60
+    fill(manager, "stale", ["old text"])
+    fill(manager, "fresh", ["new text"])
+    fill(manager, "busy", ["busy text"])
+    manager._last_used["stale"] -= 120
+    manager._last_used["busy"] -= 120
+    session_status = manager.scheduler.session_status
+    manager.scheduler.session_status = mocker.MagicMock(side_effect=lambda sid: [{"status": "running"}] if sid == "busy" else session_status(sid))
+
+    assert manager.expire_idle() == ["stale"]
+    assert manager.rag.session_footprint("stale")["chunks"] == 0
+    assert manager.rag.session_footprint("fresh")["chunks"] == 1
+    assert manager.rag.session_footprint("busy")["chunks"] == 1
+    assert manager.metrics()["sessions"]["stale"]["spilled"]
+    assert not manager.acknowledge_expiry("stale")
+
+    manager.touch("stale")
+    assert manager.rag.session_footprint("stale")["chunks"] == 1
+    assert manager.brain.history["stale"][1]["content"] == "hi from stale"
+
+def test_session_with_a_turn_in_flight_is_not_expired_or_evicted(manager):
+    """Verify a chat turn in progress keeps its session from being spilled, by expiry or by eviction, until it ends."""
+    manager.idle_ttl = 60
+    fill(manager, "chatting", ["turn text"])
+    manager._last_used["chatting"] -= 120
+
+    with manager.in_flight("chatting"):
+        assert manager.expire_idle() == []
+        assert manager._coldest(exclude="other") is None
+    assert manager.rag.session_footprint("chatting")["chunks"] == 1
+    assert manager.expire_idle() == ["chatting"]
+
+def test_idle_sessions_without_spill_dir_are_deleted_and_reported_once(manager):
+    """Verify expiry without a spill directory deletes the session and reports it to the frontend exactly once."""
+    manager.idle_ttl = 60
+    manager.spill_dir = None
+    fill(manager, "stale", ["old text"])
+    manager._last_used["stale"] -= 120
+
+    assert manager.expire_idle() == ["stale"]
+    assert manager.rag.session_footprint("stale")["chunks"] == 0
+    assert "stale" not in manager.brain.history
+    assert manager.acknowledge_expiry("stale")
+    assert not manager.acknowledge_expiry("stale")
+
+def test_global_cap_spills_coldest_session_and_restores_on_touch(manager):
+    """Verify hitting the global chunk cap spills the LRU session to disk and its next request brings it back."""
+    manager.max_total_chunks = 3
+    fill(manager, "cold", ["cold one", "cold two"])
+    fill(manager, "hot", ["hot one"])
+
+    assert manager.admit("hot", 1, 100)
+    assert manager.metrics()["sessions"]["cold"]["spilled"]
+    assert manager.rag.get_rows([], where={"session_id": "cold"})["ids"] == []
+    assert "cold" not in manager.brain.history
+
+    manager.touch("cold")
+    restored = manager.rag.get_rows(["documents"], where={"session_id": "cold"})
+    assert sorted(restored["documents"]) == ["cold one", "cold two"]
+    assert manager.brain.history["cold"][-1]["content"] == "hi from cold"
+
+def test_per_session_cap_rejects_oversized_uploads(manager):
+    """Verify a session can't index past its own chunk quota."""
+    manager.max_session_chunks = 2
+    fill(manager, "a", ["one", "two"])
+    assert not manager.admit("a", 1, 10)
+    assert manager.metrics()["counters"]["rejected"] == 1
@@ -0,0 +1,13 @@
+import pytest
+from src.streaming import Marker_Stripper, strip_markers
+
+def test_strip_markers_split_across_deltas():
+    """Verify chat tags are removed even when the model emits them one fragment at a time."""
+    deltas = ["Hello <|im", "_end|> wor", "ld<", "|im_start|>!"]
+    assert "".join(strip_markers(deltas)) == "Hello  world!"
+
+def test_stripper_releases_lookalike_text_at_end():
+    """Verify text that merely starts like a marker is emitted once the stream ends."""
+    stripper = Marker_Stripper()
+    assert stripper.feed("a <|im") == "a "
+    assert stripper.flush() == "<|im"
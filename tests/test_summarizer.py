@@ -0,0 +1,96 @@
+import httpx
+import groq
+import pytest
+from src.summarizer import Map_Reduce_Summarizer
+
+class FakeChunk:
+    def __init__(self, text, token_count):
+        self.text = text
+        self.token_count = token_count
+
+def make_response(mocker, content):
+    response = mocker.MagicMock()
+    response.choices = [mocker.MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+def test_pack_groups_chunks_within_token_budget(mocker):
+    """Verify consecutive chunks are packed into as few map requests as the token budget allows."""
+    summarizer = Map_Reduce_Summarizer(mocker.MagicMock(), model="m", pack_token_budget=100)
+    chunks = [FakeChunk(f"c{i}", 40) for i in range(5)]
+
+    payloads = summarizer.pack(chunks)
+
+    assert len(payloads) == 3
+    assert payloads[0] == "c0\n\n---\n\nc1"
+    assert payloads[-1] == "c4"
+
+def test_map_preserves_order_under_concurrency(mocker):
+    """Verify concurrent map requests return mini summaries in document order."""
+    client = mocker.MagicMock()
+    client.chat.completions.create.side_effect = lambda **kwargs: make_response(mocker, kwargs["messages"][0]["content"].split()[-1])
+    summarizer = Map_Reduce_Summarizer(client, model="m", concurrency=4, pack_token_budget=0)
+
+    summaries = summarizer.map([FakeChunk(f"c{i}", 1) for i in range(8)])
+
+    assert summaries == [f"c{i}" for i in range(8)]
+    assert client.chat.completions.create.call_count == 8
+
+def test_complete_retries_rate_limits_using_retry_after(mocker):
+    """Verify a 429 is retried after the provider's retry-after delay instead of failing the chunk."""
+    request = httpx.Request("POST", "http://fake/openai/v1/chat/completions")
+    throttled = groq.RateLimitError("slow down", response=httpx.Response(429, headers={"retry-after": "0.01"}, request=request), body=None)
+    client = mocker.MagicMock()
+    client.chat.completions.create.side_effect = [throttled, make_response(mocker, "ok")]
+    sleep = mocker.patch("src.summarizer.time.sleep")
+
+    summarizer = Map_Reduce_Summarizer(client, model="m", max_retries=2)
+
+    assert summarizer.complete("prompt") == "ok"
+    sleep.assert_called_once_with(0.01)
+
+def test_build_tree_reduces_level_by_level_to_single_root(mocker):
+    """Verify section summaries are reduced through intermediate levels until one document root remains."""
+    client = mocker.MagicMock()
+    client.chat.completions.create.side_effect = lambda **kwargs: make_response(mocker, "x" * 40)
+    summarizer = Map_Reduce_Summarizer(client, model="m", pack_token_budget=25)
+
+    levels = summarizer.build_tree(["s" * 40 for _ in range(8)])
+
+    assert [len(level) for level in levels] == [8, 4, 2, 1]
+
+def test_tree_rebuild_after_new_pages_reuses_unchanged_nodes(mocker):
+    """Verify appending chunks only pays for the new windows and their ancestors, not the whole tree."""
+    client = mocker.MagicMock()
+    client.chat.completions.create.side_effect = lambda **kwargs: make_response(mocker, kwargs["messages"][0]["content"][-12:])
+    summarizer = Map_Reduce_Summarizer(client, model="m", concurrency=2, pack_token_budget=100)
+    chunks = [FakeChunk(f"page text {i:03d}", 60) for i in range(6)]
+
+    summarizer.build_tree(summarizer.map(chunks))
+    first_pass = client.chat.completions.create.call_count
+    summarizer.build_tree(summarizer.map(chunks + [FakeChunk("page text 006", 60)]))
+
+    # One new window plus the re-reduced root; the six original windows come from the memo
+    assert first_pass == 7
+    assert client.chat.completions.create.call_count - first_pass == 2
+
+def test_streaming_map_defers_and_drops_cancelled_windows(mocker):
+    """Verify deferred windows are only sent from result(), and windows of a cancelled session never are."""
+    client = mocker.MagicMock()
+    client.chat.completions.create.side_effect = lambda **kwargs: make_response(mocker, "summary")
+    summarizer = Map_Reduce_Summarizer(client, model="m", pack_token_budget=50)
+
+    deferred = summarizer.stream(defer=True)
+    for i in range(4):
+        deferred.add(FakeChunk(f"déferred {i}", 30))
+    assert client.chat.completions.create.call_count == 0
+    assert deferred.result() == ["summary"] * 4
+    # Each window is read back from the spill file intact
+    prompts = " ".join(str(call.kwargs["messages"]) for call in client.chat.completions.create.call_args_list)
+    assert all(f"déferred {i}" in prompts for i in range(4))
+
+    cancelled = {"flag": True}
+    dropped = summarizer.stream(cancelled=lambda: cancelled["flag"])
+    for i in range(4):
+        dropped.add(FakeChunk(f"dropped {i}", 30))
+    assert dropped.result() == [] and client.chat.completions.create.call_count == 4
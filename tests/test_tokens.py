@@ -0,0 +1,23 @@
+import pytest
+from src.tokens import Token_Counter, Token_Budget
+
+def test_counter_falls_back_to_character_estimate():
+    """Verify an unavailable tokenizer degrades to the characters / 4 estimate instead of raising."""
+    counter = Token_Counter("definitely/not-a-real-tokenizer.json")
+    assert counter.count("a" * 40) == 10
+    assert counter.count("") == 0
+
+def test_truncate_prefers_paragraph_boundaries():
+    """Verify context is cut at a chunk boundary so the last kept chunk stays whole."""
+    counter = Token_Counter()
+    text = "\n\n".join(["x" * 40] * 5)
+    cut = counter.truncate(text, 25)
+    assert counter.count(cut) <= 25
+    assert cut == "\n\n".join(["x" * 40] * 2)
+
+def test_budget_gives_unused_context_share_to_history():
+    """Verify the history allowance absorbs whatever the retrieved context doesn't need."""
+    budget = Token_Budget(Token_Counter(), total=1000, context_share=0.5)
+    context_budget, history_budget = budget.split(template_tokens=100, context_tokens=50, query_tokens=20)
+    assert context_budget == 50
+    assert context_budget + history_budget == 1000 - 100 - 20 - 8
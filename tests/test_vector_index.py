@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+from src.vector_index import Flat_Vector_Index
+from src.logger import logger
+from src.PDF_Pal import RAG_Memory, Text_Chunk
+
+KEYWORDS = ["seal", "pump", "valve", "gear"]
+
+def keyword_counts(text):
+    return [float(text.lower().count(word)) for word in KEYWORDS] + [0.2]
+
+def test_flat_search_matches_brute_force_and_filters_type():
+    """Verify exact top-k per query, type filtering, duplicate IDs and float16 storage."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    queries = rng.normal(size=(3, 16)).astype(np.float32)
+    ids = [f"c{i}" for i in range(200)]
+    index = Flat_Vector_Index(max_vectors=1000)
+    index.add("s", "content", ids[:150], vectors[:150])
+    index.add("s", "content", ids[100:150], vectors[100:150])
+    index.add("s", "summary", ids[150:], vectors[150:])
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for query, hits in zip(queries, index.search("s", queries, "content", k=5)):
+        expected = np.argsort(-(unit[:150] @ (query / np.linalg.norm(query))))[:5]
+        assert [chunk_id for chunk_id, _ in hits] == [ids[i] for i in expected]
+    assert all(chunk_id in ids[150:] for chunk_id, _ in index.search("s", queries[:1], "summary", k=5)[0])
+    assert index.stats()["vectors"] == 200 and index.search("other", queries[:1])[0] == []
+
+    half = Flat_Vector_Index(dtype="float16")
+    half.add("s", "content", ids, vectors)
+    assert half.stats()["bytes"] < index.stats()["bytes"]
+    assert [c for c, _ in half.search("s", queries[:1], k=3)[0]] == [c for c, _ in index.search("s", queries[:1], k=3)[0]]
+
+def test_small_session_skips_hnsw_and_large_session_is_promoted(tmp_path, mocker, make_embedder):
+    """Verify a small session is answered without a filtered HNSW query and one past the limit goes back to HNSW."""
+    rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=make_embedder(keyword_counts))
+    rag.vectors.max_vectors = 4
+    rag.index([Text_Chunk("Replace the seal yearly."), Text_Chunk("Prime the pump first.")], session_id="small", file_name="a.pdf")
+    rag.index([Text_Chunk(f"Gear {i} needs valve checks.") for i in range(5)], session_id="large", file_name="b.pdf")
+    query = mocker.spy(rag.collection, "query")
+
+    results = rag.retrieve("seal seal", session_id="small", n_results=1, hybrid=False, rerank=False)
+    assert "Replace the seal" in results[0] and "a.pdf" in results[0]
+    assert query.call_count == 0
+    assert rag.vectors.serves("small") and not rag.vectors.serves("large")
+
+    assert "valve" in rag.retrieve("valve", session_id="large", n_results=1, hybrid=False, rerank=False)[0]
+    assert query.call_count == 1
+    stats = rag.vectors.stats()
+    assert (stats["sessions"], stats["promoted"], stats["vectors"]) == (1, 1, 2)
+
+    # A restarted process rebuilds the small session's matrix from the persistent collection
+    restarted = RAG_Memory(persist_dir=str(tmp_path), embedding_function=make_embedder(keyword_counts))
+    assert "Prime the pump" in restarted.retrieve("pump", session_id="small", n_results=1, hybrid=False, rerank=False)[0]
+    assert restarted.vectors.serves("small")
+    assert "valve" in restarted.retrieve("valve", session_id="large", n_results=1, hybrid=False, rerank=False)[0]
+    assert not restarted.vectors.accepts("large")
+    rag.delete_session("small")
+    assert not rag.vectors.serves("small")
+
+def test_flat_rows_keep_one_vector_copy_until_promotion(tmp_path, make_embedder):
+    """Verify flat-tier vectors live only in the flat index, and promotion moves them into the HNSW collection."""
+    rag = RAG_Memory(persist_dir=str(tmp_path), embedding_function=make_embedder(keyword_counts))
+    rag.vectors.max_vectors = 3
+    texts = [f"Seal {i} fits the pump." for i in range(4)]
+    text_bytes = sum(len(text.encode("utf-8")) for text in texts)
+
+    rag.index([Text_Chunk(text) for text in texts[:2]], session_id="s", file_name="a.pdf")
+    assert rag.vector_bytes("s") == rag.vectors.vector_bytes(len(KEYWORDS) + 1) + 4
+    assert rag.session_footprint("s")["bytes"] == rag.estimate_bytes(texts[:2], "s")
+    assert (rag.flat_collection.count(), rag.collection.count()) == (2, 0)
+    assert len(rag.export_session("s")["embeddings"]) == 2
+
+    rag.index([Text_Chunk(text) for text in texts[2:]], session_id="s", file_name="a.pdf")
+    assert not rag.vectors.serves("s")
+    assert (rag.flat_collection.count(), rag.collection.count()) == (0, 4)
+    assert rag.session_footprint("s")["bytes"] == text_bytes + 4 * rag.embedding_bytes
+    stored = rag.collection.get(where={"session_id": "s"}, include=["documents", "embeddings"])
+    for text, embedding in zip(stored["documents"], stored["embeddings"]):
+        original, embedding = np.asarray(keyword_counts(text)), np.asarray(embedding)
+        assert embedding / np.linalg.norm(embedding) == pytest.approx(original / np.linalg.norm(original), abs=1e-6)
+
+def test_int8_storage_rescores_from_a_finer_copy(tmp_path):
+    """Verify int8 storage keeps exact rankings by rescoring from a float16 copy in RAM or memory-mapped originals."""
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(300, 32)).astype(np.float32)
+    queries = rng.normal(size=(4, 32)).astype(np.float32)
+    ids = [f"c{i}" for i in range(300)]
+    exact = Flat_Vector_Index()
+    exact.add("s", "content", ids, vectors)
+    expected = [[c for c, _ in hits] for hits in exact.search("s", queries, k=5)]
+
+    compact = Flat_Vector_Index(dtype="int8", rescore=4, max_vectors=300)
+    compact.add("s", "content", ids, vectors)
+    assert [[c for c, _ in hits] for hits in compact.search("s", queries, k=5)] == expected
+    # int8 codes plus the float16 rescoring copy: 3 of float32's 4 bytes per dimension, plus a scale per row
+    assert exact.stats()["bytes"] * 0.75 <= compact.stats()["bytes"] < exact.stats()["bytes"] * 0.8
+    warnings = []
+    sink = logger.add(warnings.append, level="WARNING", format="{message}")
+    try:
+        assert Flat_Vector_Index(dtype="float16").rescore == 0
+        assert Flat_Vector_Index(dtype="float16", rescore=0).rescore == 0
+    finally:
+        logger.remove(sink)
+    assert len(warnings) == 1 and "rescore=4" in warnings[0]
+    # A full session refuses more vectors; promotion hands them back for the ANN index
+    assert compact.room("s") == 0
+    with pytest.raises(ValueError):
+        compact.add("s", "content", ["extra"], vectors[:1])
+    promoted = compact.promote("s")
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    assert np.stack([promoted[c] for c in ids]) == pytest.approx(unit, abs=1e-3)
+    assert not compact.accepts("s") and compact.stats()["vectors"] == 0
+
+    mapped = Flat_Vector_Index(dtype="int8", rescore=4, storage_dir=str(tmp_path))
+    mapped.add("s", "content", ids, vectors)
+    hits = mapped.search("s", queries, k=5)
+    assert [[c for c, _ in row] for row in hits] == expected
+    assert hits[0][0][1] == pytest.approx(exact.search("s", queries[:1], k=1)[0][0][1], abs=1e-5)
+    stats = mapped.stats()
+    assert stats["mapped_bytes"] > 0 and stats["bytes"] < stats["mapped_bytes"]
+    scratch = mapped.storage_dir
+    assert any(scratch.iterdir())
+    # The scratch directory goes with the last session, and comes back for the next one
+    mapped.delete_session("s")
+    assert not scratch.exists() and mapped.storage_dir is None
+    mapped.add("t", "content", ids[:2], vectors[:2])
+    assert any(mapped.storage_dir.iterdir())
+    mapped.close()
+    assert not any(tmp_path.iterdir())
+
+    with pytest.raises(ValueError):
+        Flat_Vector_Index(dtype="int4")